@@ -47,6 +47,10 @@ const MeetingDetail: React.FC<{ meeting: Meeting; onBack: () => void; currentUse
     const [aiTasks, setAiTasks] = useState<Task[]>([]);
     const [loadingAI, setLoadingAI] = useState(false);
     const [isAnalyzed, setIsAnalyzed] = useState(false);
+    // Endpoint stream file ghi hình cần token; thẻ <video> / link tải không gửi được header -> ?access_token=
+    const recordingSrc = meeting.recordingUrl
+        ? `${meeting.recordingUrl}?access_token=${encodeURIComponent(localStorage.getItem('access_token') || '')}`
+        : '';
 
     // Giả lập Transcript (Nếu meeting chưa có)
     const transcriptText = meeting.transcript || `
@@ -215,7 +219,7 @@ const handleRunAI = async () => {
                                     <video 
                                         controls 
                                         className="w-full aspect-video"
-                                        src={meeting.recordingUrl} 
+                                        src={recordingSrc} 
                                         poster="https://via.placeholder.com/800x450/000000/FFFFFF?text=Meeting+Recording"
                                     >
                                         Your browser does not support the video tag.
@@ -226,7 +230,7 @@ const handleRunAI = async () => {
                                             <p className="text-xs text-slate-400">Duration: Auto-detected</p>
                                         </div>
                                         <a 
-                                            href={meeting.recordingUrl} 
+                                            href={recordingSrc} 
                                             download 
                                             className="bg-indigo-600 hover:bg-indigo-700 text-white px-4 py-2 rounded-lg text-sm font-bold transition"
                                         >
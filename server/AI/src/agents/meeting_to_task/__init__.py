@@ -3,5 +3,6 @@ Meeting-to-Task Agent Module
 """
 from .agent import MeetingToTaskAgent
 from .schemas import AgentState, ActionItem, MeetingOutput
+from .quality import check_draft, reflection_stats
 
-__all__ = ['MeetingToTaskAgent', 'AgentState', 'ActionItem', 'MeetingOutput']
\ No newline at end of file
+__all__ = ['MeetingToTaskAgent', 'AgentState', 'ActionItem', 'MeetingOutput', 'check_draft', 'reflection_stats']
\ No newline at end of file
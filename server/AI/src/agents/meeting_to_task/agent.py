@@ -1,9 +1,11 @@
 from dotenv import load_dotenv
+import asyncio
 import json
+import os
 from typing import List, Optional
 
 # --- Cần thêm dòng import này ở đầu file ---
-from sqlalchemy.orm import joinedload 
+from sqlalchemy.orm import joinedload
 from src.models.meeting import Meeting # Đảm bảo import đúng model
 
 # LangGraph và LangChain
@@ -13,12 +15,22 @@ from langchain_core.messages import HumanMessage
 
 # Import từ module này
 from .schemas import AgentState, MeetingOutput, ReflectionOutput
-from .prompts import ANALYSIS_PROMPT, REFLECTION_PROMPT, REFINEMENT_PROMPT
+from .prompts import ANALYSIS_PROMPT, REFLECTION_PROMPT, REFINEMENT_PROMPT, MAP_PROMPT, REDUCE_PROMPT
+from .chunking import split_transcript, dedupe_action_items
+from .quality import (
+    check_draft,
+    record_reflection_path,
+    PATH_LOCAL_ACCEPT,
+    PATH_LOCAL_REVISE,
+    PATH_LLM_ACCEPT,
+    PATH_LLM_REVISE,
+)
 from .tools import (
-    format_email_body_for_assignee, 
-    get_emails_from_participants, 
-    transcribe_audio, 
-    create_tasks, 
+    format_email_body_for_assignee,
+    get_emails_from_participants,
+    transcribe_audio,
+    create_tasks,
+    acreate_tasks,
     send_notification
 )
 from ...models.models import call_llm
@@ -26,12 +38,24 @@ from ...models.models import call_llm
 # Load environment variables
 load_dotenv()
 
+# Map-reduce cho transcript dài: chia theo cửa sổ ký tự, map song song, reduce theo nhóm
+ANALYSIS_CHUNK_CHARS = int(os.environ.get('ANALYSIS_CHUNK_CHARS', '24000'))
+ANALYSIS_CHUNK_OVERLAP = int(os.environ.get('ANALYSIS_CHUNK_OVERLAP', '1000'))
+ANALYSIS_MAP_CONCURRENCY = int(os.environ.get('ANALYSIS_MAP_CONCURRENCY', '4'))
+ANALYSIS_REDUCE_FANOUT = int(os.environ.get('ANALYSIS_REDUCE_FANOUT', '8'))  # số phần tối đa gộp trong một lần reduce
+
+# Số request I/O (tạo task, gửi email) chạy song song trong đường async
+AGENT_IO_CONCURRENCY = int(os.environ.get('AGENT_IO_CONCURRENCY', '8'))
+
+# Kiểm tra chất lượng bằng rule trước, chỉ gọi LLM reflection khi tắt chế độ này
+AGENT_LOCAL_REFLECTION = os.environ.get('AGENT_LOCAL_REFLECTION', 'true').lower() in ('1', 'true', 'yes')
+
 
 def _extract_participant_names(participants: List[dict]) -> str:
     """Trích xuất danh sách tên participants để đưa vào prompt."""
     if not participants:
         return "Không có thông tin participants"
-    
+
     names = [p.get('username', 'Unknown') for p in participants]
     return ", ".join(names)
 
@@ -39,43 +63,55 @@ def _extract_participant_names(participants: List[dict]) -> str:
 class MeetingToTaskAgent:
     """
     Agent xử lý meeting recordings và tạo tasks tự động
+
+    Có hai đường chạy dùng chung checkpointer (cùng thread_id):
+        - run() / continue_after_review(): đồng bộ (self.graph)
+        - arun() / acontinue_after_review(): async (self.agraph) - LLM gọi bằng ainvoke/abatch,
+          tạo task và gửi email chạy song song -> một process xử lý được nhiều cuộc họp cùng lúc
     """
-    
-    def __init__(self):
+
+    def __init__(self, checkpointer=None):
         """
         Khởi tạo agent
-        
+
         Args:
-            provider_name: Tên provider LLM để sử dụng
+            checkpointer: LangGraph checkpointer lưu state của các thread đang chờ human review
+                (mặc định MemorySaver - chỉ nằm trong RAM của process)
         """
         self.model = call_llm(
             model_provider='gemini',
             model_name='gemini-2.5-flash-lite-preview-09-2025',
             temperature=0.1,
             top_p=0.5,
+            # Không dùng LLM cache: kết quả đã được dùng lại theo checksum file ghi hình (AnalysisJob),
+            # phân tích lại (force=true) phải chạy LLM thật
+            use_cache=False,
         )
-        self.memory = MemorySaver()
+        # Provider STT: 'gemini' hoặc 'faster-whisper' (local)
+        self.stt_provider = os.environ.get('STT_PROVIDER', 'gemini')
+        self.memory = checkpointer or MemorySaver()
         self.graph = self._build_graph()
-    
-    def _build_graph(self) -> StateGraph:
-        """Xây dựng workflow graph"""
+        self.agraph = self._build_graph(use_async=True)
+
+    def _build_graph(self, use_async: bool = False) -> StateGraph:
+        """Xây dựng workflow graph (node đồng bộ hoặc async)"""
         builder = StateGraph(AgentState)
-        
+
         # Thêm các nodes
-        builder.add_node('stt', self._stt)
-        builder.add_node('analysis', self._analysis)
-        builder.add_node('reflection', self._reflection)
-        builder.add_node('refinement', self._refinement)
-        builder.add_node('create_tasks', self._create_tasks)
-        builder.add_node('notification', self._notification)
-        
+        builder.add_node('stt', self._astt if use_async else self._stt)
+        builder.add_node('analysis', self._aanalysis if use_async else self._analysis)
+        builder.add_node('reflection', self._areflection if use_async else self._reflection)
+        builder.add_node('refinement', self._arefinement if use_async else self._refinement)
+        builder.add_node('create_tasks', self._acreate_tasks if use_async else self._create_tasks)
+        builder.add_node('notification', self._anotification if use_async else self._notification)
+
         # Thiết lập entry point
         builder.set_entry_point('stt')
-        
+
         # Thêm các edges
         builder.add_edge('stt', 'analysis')
         builder.add_edge('analysis', 'reflection')
-        
+
         # Conditional edge: reflection -> refine hoặc create_tasks
         builder.add_conditional_edges(
             'reflection',
@@ -85,147 +121,184 @@ class MeetingToTaskAgent:
                 True: 'create_tasks'
             }
         )
-        
+
         # Edge: refinement quay lại reflection để kiểm tra lại
         builder.add_edge('refinement', 'reflection')
-        
+
         # Edge: create_tasks -> notification -> END
         builder.add_edge('create_tasks', 'notification')
         builder.add_edge('notification', END)
-        
+
         # Compile graph với memory và interrupt_before
         return builder.compile(
             checkpointer=self.memory,
             interrupt_before=['create_tasks']
         )
-    
-    # ==================== NODES ====================
-    
-    def _stt(self, state: AgentState):
-        """Node 1: Chuyển đổi âm thanh thành văn bản"""
-        print("\n[NODE 1] Đang chuyển đổi âm thanh thành văn bản...")
-        print('='*100)
-        
-        transcript = transcribe_audio(
-            state['audio_file_path'], 
-            provider='gemini', 
-            use_mock=False
-        )
-        
-        print(f"  ✅ Transcript: {len(transcript)} ký tự")
-        return {'transcript': transcript}
-    
-    def _analysis(self, state: AgentState):
-        """Node 2: Phân tích và tạo MoM + Action Items"""
-        print("\n[NODE 2] Đang phân tích và tạo MoM...")
-        print('='*100)
-        
+
+    # ==================== PROMPT BUILDERS (dùng chung cho sync/async) ====================
+
+    def _prompt_context(self, state: AgentState):
+        """(participants_str, metadata_str) cho các prompt."""
         metadata = state.get('meeting_metadata', {})
         participants = metadata.get('participants', [])
-        
+
         # Tạo metadata string (không bao gồm participants để tránh trùng lặp)
         metadata_display = {k: v for k, v in metadata.items() if k != 'participants'}
         metadata_str = json.dumps(metadata_display, indent=2, ensure_ascii=False)
-        
+
         # Tạo danh sách participants
-        participants_str = _extract_participant_names(participants)
-        
-        messages = [
+        return _extract_participant_names(participants), metadata_str
+
+    def _analysis_messages(self, state: AgentState, participants_str: str, metadata_str: str) -> list:
+        return [
             HumanMessage(content=ANALYSIS_PROMPT.format(
                 participants=participants_str,
                 metadata=metadata_str,
                 transcript=state['transcript']
             ))
         ]
-        
-        response = self.model.with_structured_output(MeetingOutput).invoke(messages)
-        
-        # Chuyển đổi action items sang dict
-        action_items_list = [item.dict() for item in response.action_items]
-        
-        print(f"  ✅ Summary: {len(response.summary)} ký tự")
-        print(f"  ✅ Action Items: {len(action_items_list)} items")
-        for item in action_items_list:
-            print(f"     - {item.get('assignee', 'N/A')}: {item.get('title', '')[:40]}...")
-        
-        return {
-            'mom': response.summary,
-            'action_items': action_items_list,
-        }
-    
-    def _reflection(self, state: AgentState):
-        """Node 3: Tự kiểm tra và phát hiện lỗi"""
-        print("\n[NODE 3] Đang tự kiểm tra chất lượng...")
-        print('='*100)
-        
+
+    def _map_messages(self, chunks: List[str], participants_str: str, metadata_str: str) -> List[list]:
+        total = len(chunks)
+        return [
+            [HumanMessage(content=MAP_PROMPT.format(
+                part=i + 1,
+                total_parts=total,
+                participants=participants_str,
+                metadata=metadata_str,
+                transcript=chunk
+            ))]
+            for i, chunk in enumerate(chunks)
+        ]
+
+    def _reduce_messages(self, summaries: List[str], action_items: List[dict],
+                         participants_str: str, metadata_str: str) -> list:
+        return [
+            HumanMessage(content=REDUCE_PROMPT.format(
+                participants=participants_str,
+                metadata=metadata_str,
+                partial_summaries="\n\n".join(summaries),
+                partial_action_items=json.dumps(action_items, indent=2, ensure_ascii=False)
+            ))
+        ]
+
+    def _reflection_messages(self, state: AgentState) -> list:
         metadata = state.get('meeting_metadata', {})
-        participants = metadata.get('participants', [])
-        participants_str = _extract_participant_names(participants)
-        
+        participants_str = _extract_participant_names(metadata.get('participants', []))
         action_items_str = json.dumps(state['action_items'], indent=2, ensure_ascii=False)
-        
-        messages = [
+
+        return [
             HumanMessage(content=REFLECTION_PROMPT.format(
                 participants=participants_str,
                 mom=state['mom'],
                 action_items=action_items_str
             ))
         ]
-        
-        response = self.model.with_structured_output(ReflectionOutput).invoke(messages)
-        
-        print(f"  📝 Critique: {response.critique[:100]}...")
-        print(f"  🎯 Decision: {response.decision}")
-        
-        return {'critique': response.critique, 'reflect_decision': response.decision}
-    
-    def _refinement(self, state: AgentState):
-        """Node 4: Tinh chỉnh dựa trên phản hồi"""
-        print("\n[NODE 4] Tinh chỉnh MoM...")
-        print('='*100)
-        
+
+    def _refinement_messages(self, state: AgentState) -> list:
         metadata = state.get('meeting_metadata', {})
-        participants = metadata.get('participants', [])
-        participants_str = _extract_participant_names(participants)
-        
+        participants_str = _extract_participant_names(metadata.get('participants', []))
         action_items_str = json.dumps(state['action_items'], indent=2, ensure_ascii=False)
-        
-        messages = [
+
+        return [
             HumanMessage(content=REFINEMENT_PROMPT.format(
                 participants=participants_str,
                 draft_mom=state['mom'],
                 draft_action_items=action_items_str,
                 critique=state['critique'],
-                transcript=state['transcript']
+                transcript=self._transcript_context(state)
             ))
         ]
-        
-        response = self.model.with_structured_output(MeetingOutput).invoke(messages)
-        
+
+    def _transcript_context(self, state: AgentState) -> str:
+        """Transcript đưa vào prompt tinh chỉnh: transcript dài được thay bằng tóm tắt từng phần."""
+        transcript = state['transcript']
+        chunk_summaries = state.get('chunk_summaries') or []
+        if len(transcript) <= ANALYSIS_CHUNK_CHARS or not chunk_summaries:
+            return transcript
+        return "(Transcript quá dài, dưới đây là tóm tắt từng phần theo thứ tự thời gian)\n\n" + "\n\n".join(chunk_summaries)
+
+    # ==================== RESULT HANDLERS (dùng chung cho sync/async) ====================
+
+    def _analysis_result(self, response: MeetingOutput, chunk_summaries: Optional[List[str]] = None) -> dict:
+        # Chuyển đổi action items sang dict
+        action_items_list = [item.dict() for item in response.action_items]
+        if chunk_summaries:
+            action_items_list = dedupe_action_items(action_items_list)
+
+        print(f"  ✅ Summary: {len(response.summary)} ký tự")
+        print(f"  ✅ Action Items: {len(action_items_list)} items")
+        for item in action_items_list:
+            print(f"     - {item.get('assignee', 'N/A')}: {item.get('title', '')[:40]}...")
+
+        return {
+            'mom': response.summary,
+            'action_items': action_items_list,
+            'chunk_summaries': chunk_summaries or [],
+        }
+
+    def _collect_partials(self, partials: List[MeetingOutput]):
+        """Kết quả map -> (tóm tắt từng phần, action items đã loại trùng)."""
+        total = len(partials)
+        chunk_summaries = [f"[Phần {i + 1}/{total}] {p.summary}" for i, p in enumerate(partials)]
+        action_items = dedupe_action_items([item.dict() for p in partials for item in p.action_items])
+        print(f"  ✅ Map xong: {len(action_items)} action items (sau khi loại trùng)")
+        return chunk_summaries, action_items
+
+    def _reduce_groups(self, summaries: List[str]) -> List[List[str]]:
+        """Chia tóm tắt thành các nhóm để reduce phân cấp (rỗng nếu đã đủ nhỏ cho lần reduce cuối)."""
+        fanout = max(2, ANALYSIS_REDUCE_FANOUT)
+        if len(summaries) <= fanout:
+            return []
+        return [summaries[i:i + fanout] for i in range(0, len(summaries), fanout)]
+
+    def _reflection_result(self, state: AgentState, critique: str, decision: str, path: str) -> dict:
+        record_reflection_path(path)
+        print(f"  📝 Critique: {critique[:100]}...")
+        print(f"  🎯 Decision: {decision} ({path})")
+
+        return {
+            'critique': critique,
+            'reflect_decision': decision,
+            'reflection_path': (state.get('reflection_path') or []) + [path],
+        }
+
+    def _local_reflection(self, state: AgentState) -> Optional[dict]:
+        """
+        Kiểm tra bản nháp bằng rule (không gọi LLM).
+        Đạt -> accept luôn; không đạt -> revise với critique liệt kê lỗi. None nếu chế độ này bị tắt.
+        """
+        if not AGENT_LOCAL_REFLECTION:
+            return None
+
+        participants = state.get('meeting_metadata', {}).get('participants', [])
+        report = check_draft(state.get('mom', ''), state.get('action_items', []), participants)
+        if report.passed:
+            return self._reflection_result(state, '', 'accept', PATH_LOCAL_ACCEPT)
+        return self._reflection_result(state, report.critique(), 'revise', PATH_LOCAL_REVISE)
+
+    def _refinement_result(self, state: AgentState, response: MeetingOutput) -> dict:
         refined_action_items = [item.dict() for item in response.action_items]
         revision_count = state.get('revision_count', 0) + 1
-        
+
         print(f"  🔄 Revision #{revision_count}")
-        
+
         return {
             'mom': response.summary,
             'action_items': refined_action_items,
             'revision_count': revision_count
         }
-    
-    def _create_tasks(self, state: AgentState):
-        """Node 5: Tạo tasks trong hệ thống backend"""
-        print("\n[NODE 5] Tạo tasks...")
-        print('='*100)
-        
+
+    def _task_context(self, state: AgentState):
+        """(action_items, project_id, author_user_id, user_mapping) cho node tạo task."""
         action_items = state.get('action_items', [])
         meeting_metadata = state.get('meeting_metadata', {})
         participants = meeting_metadata.get('participants', [])
-        
+
         # Extract project_id and author_user_id from meeting metadata
         project_id = meeting_metadata.get('projectId')
         author_user_id = meeting_metadata.get('authorUserId')
-        
+
         # Build user_mapping: assignee name (lowercase) -> userId
         user_mapping = {}
         for p in participants:
@@ -233,48 +306,40 @@ class MeetingToTaskAgent:
             user_id = p.get('userId')
             if username and user_id:
                 user_mapping[username.lower()] = user_id
-        
-        # Call API to create tasks
-        tasks = create_tasks(
-            action_items=action_items,
-            project_id=project_id,
-            author_user_id=author_user_id,
-            user_mapping=user_mapping
-        )
-        
-        print(f"  📊 Created {len(tasks)} tasks")
-        return {'tasks_created': tasks}
-    
-    def _notification(self, state: AgentState):
-        """Node 6: Gửi thông báo tới từng assignee"""
-        print("\n[NODE 6] Gửi notification...")
-        print('='*100)
-        
+
+        return action_items, project_id, author_user_id, user_mapping
+
+    def _plan_notifications(self, state: AgentState):
+        """
+        Chuẩn bị email cho từng assignee.
+
+        Returns:
+            (skipped_results, jobs): jobs là list dict {assignee, email, title, body, subject}
+        """
         mom = state.get('mom')
         action_items = state.get('action_items', [])
         meeting_metadata = state.get('meeting_metadata', {})
         participants = meeting_metadata.get('participants', [])
-        
+
         # Lấy email mapping từ participants
         email_map = get_emails_from_participants(participants)
-        
+
         print(f"  👥 Participants với email: {list(email_map.keys())}")
-        
-        # Gửi email cho từng task
-        results = []
+
+        skipped, jobs = [], []
         for task in action_items:
             assignee = task.get('assignee', '').lower()
-            
+
             # Skip nếu là Unassigned
             if assignee == 'unassigned' or not assignee:
                 print(f"  ⏭️ Skip task không có assignee: {task.get('title', '')[:30]}...")
                 continue
-            
+
             email = email_map.get(assignee)
-            
+
             if not email:
                 print(f"  ⚠️ Không tìm thấy email cho: {assignee}")
-                results.append({
+                skipped.append({
                     "assignee": assignee,
                     "email": None,
                     "title": task.get('title', ''),
@@ -282,41 +347,280 @@ class MeetingToTaskAgent:
                     "reason": "Email not found in participants"
                 })
                 continue
-            
+
             # Format email riêng cho task này
-            email_body = format_email_body_for_assignee(
-                assignee_name=assignee.title(),
-                assignee_task=task,
-                mom=mom,
-                meeting_metadata=meeting_metadata
-            )
-            
-            result = send_notification(
-                email_body=email_body,
-                receiver_email=email,
-                subject=f"[Action Required] {meeting_metadata.get('title', 'Meeting')} - Công việc cho {assignee.title()}"
-            )
-            
-            results.append({
+            jobs.append({
                 "assignee": assignee,
                 "email": email,
                 "title": task.get('title', ''),
-                "status": "sent" if result else "failed"
+                "body": format_email_body_for_assignee(
+                    assignee_name=assignee.title(),
+                    assignee_task=task,
+                    mom=mom,
+                    meeting_metadata=meeting_metadata
+                ),
+                "subject": f"[Action Required] {meeting_metadata.get('title', 'Meeting')} - Công việc cho {assignee.title()}",
             })
-        
+
+        return skipped, jobs
+
+    def _notification_result(self, skipped: List[dict], jobs: List[dict], sent: List[bool]) -> dict:
+        results = skipped + [
+            {
+                "assignee": job['assignee'],
+                "email": job['email'],
+                "title": job['title'],
+                "status": "sent" if ok else "failed"
+            }
+            for job, ok in zip(jobs, sent)
+        ]
+
         sent_count = len([r for r in results if r['status'] == 'sent'])
         print(f"\n  📊 Đã gửi {sent_count}/{len(results)} email")
-        
+
         return {'notification_sent': results}
-    
+
+    # ==================== NODES ====================
+
+    def _stt(self, state: AgentState):
+        """Node 1: Chuyển đổi âm thanh thành văn bản"""
+        print("\n[NODE 1] Đang chuyển đổi âm thanh thành văn bản...")
+        print('='*100)
+
+        # Đã có transcript (ví dụ transcribe trực tiếp trong lúc họp) -> bỏ qua STT
+        if state.get('transcript'):
+            print(f"  ⏭️ Dùng transcript có sẵn: {len(state['transcript'])} ký tự")
+            return {'transcript': state['transcript']}
+
+        transcript = transcribe_audio(
+            state['audio_file_path'],
+            provider=self.stt_provider,
+            use_mock=False
+        )
+
+        print(f"  ✅ Transcript: {len(transcript)} ký tự")
+        return {'transcript': transcript}
+
+    def _analysis(self, state: AgentState):
+        """Node 2: Phân tích và tạo MoM + Action Items"""
+        print("\n[NODE 2] Đang phân tích và tạo MoM...")
+        print('='*100)
+
+        participants_str, metadata_str = self._prompt_context(state)
+
+        # Transcript dài -> map-reduce theo từng cửa sổ
+        chunks = split_transcript(state['transcript'], ANALYSIS_CHUNK_CHARS, ANALYSIS_CHUNK_OVERLAP)
+        if len(chunks) > 1:
+            return self._map_reduce_analysis(chunks, participants_str, metadata_str)
+
+        messages = self._analysis_messages(state, participants_str, metadata_str)
+        response = self.model.with_structured_output(MeetingOutput).invoke(messages)
+        return self._analysis_result(response)
+
+    def _batch_structured(self, message_batches: List[list]) -> List[MeetingOutput]:
+        """Gọi LLM song song (giới hạn ANALYSIS_MAP_CONCURRENCY), thử lại một lần các lời gọi lỗi."""
+        structured = self.model.with_structured_output(MeetingOutput)
+        config = {'max_concurrency': ANALYSIS_MAP_CONCURRENCY}
+
+        results = structured.batch(message_batches, config=config, return_exceptions=True)
+        failed = [i for i, r in enumerate(results) if isinstance(r, Exception)]
+        if failed:
+            print(f"  ⚠️ {len(failed)} lời gọi lỗi, thử lại...")
+            retried = structured.batch([message_batches[i] for i in failed], config=config)
+            for i, result in zip(failed, retried):
+                results[i] = result
+        return results
+
+    def _map_reduce_analysis(self, chunks: List[str], participants_str: str, metadata_str: str):
+        """Map: phân tích từng phần song song. Reduce: gộp tóm tắt theo nhóm và loại trùng action items."""
+        print(f"  🔀 Transcript dài -> {len(chunks)} phần (map song song tối đa {ANALYSIS_MAP_CONCURRENCY})")
+
+        # ---- MAP ----
+        partials = self._batch_structured(self._map_messages(chunks, participants_str, metadata_str))
+        chunk_summaries, action_items = self._collect_partials(partials)
+
+        # ---- REDUCE (phân cấp: gộp tóm tắt theo nhóm đến khi còn <= fanout phần) ----
+        summaries = chunk_summaries
+        while groups := self._reduce_groups(summaries):
+            merged = self._batch_structured([
+                self._reduce_messages(group, [], participants_str, metadata_str) for group in groups
+            ])
+            summaries = [m.summary for m in merged]
+
+        response = self.model.with_structured_output(MeetingOutput).invoke(
+            self._reduce_messages(summaries, action_items, participants_str, metadata_str)
+        )
+        return self._analysis_result(response, chunk_summaries)
+
+    def _reflection(self, state: AgentState):
+        """Node 3: Tự kiểm tra và phát hiện lỗi"""
+        print("\n[NODE 3] Đang tự kiểm tra chất lượng...")
+        print('='*100)
+
+        local_result = self._local_reflection(state)
+        if local_result is not None:
+            return local_result
+
+        response = self.model.with_structured_output(ReflectionOutput).invoke(self._reflection_messages(state))
+        path = PATH_LLM_ACCEPT if response.decision == 'accept' else PATH_LLM_REVISE
+        return self._reflection_result(state, response.critique, response.decision, path)
+
+    def _refinement(self, state: AgentState):
+        """Node 4: Tinh chỉnh dựa trên phản hồi"""
+        print("\n[NODE 4] Tinh chỉnh MoM...")
+        print('='*100)
+
+        response = self.model.with_structured_output(MeetingOutput).invoke(self._refinement_messages(state))
+        return self._refinement_result(state, response)
+
+    def _create_tasks(self, state: AgentState):
+        """Node 5: Tạo tasks trong hệ thống backend"""
+        print("\n[NODE 5] Tạo tasks...")
+        print('='*100)
+
+        action_items, project_id, author_user_id, user_mapping = self._task_context(state)
+
+        # Call API to create tasks
+        tasks = create_tasks(
+            action_items=action_items,
+            project_id=project_id,
+            author_user_id=author_user_id,
+            user_mapping=user_mapping
+        )
+
+        print(f"  📊 Created {len(tasks)} tasks")
+        return {'tasks_created': tasks}
+
+    def _notification(self, state: AgentState):
+        """Node 6: Gửi thông báo tới từng assignee"""
+        print("\n[NODE 6] Gửi notification...")
+        print('='*100)
+
+        skipped, jobs = self._plan_notifications(state)
+        sent = [
+            send_notification(email_body=job['body'], receiver_email=job['email'], subject=job['subject'])
+            for job in jobs
+        ]
+        return self._notification_result(skipped, jobs, sent)
+
+    # ==================== ASYNC NODES ====================
+
+    async def _astt(self, state: AgentState):
+        """Node 1 (async): STT chạy trong thread, không chặn event loop"""
+        return await asyncio.to_thread(self._stt, state)
+
+    async def _aanalysis(self, state: AgentState):
+        """Node 2 (async): Phân tích và tạo MoM + Action Items"""
+        print("\n[NODE 2] Đang phân tích và tạo MoM...")
+        print('='*100)
+
+        participants_str, metadata_str = self._prompt_context(state)
+
+        chunks = split_transcript(state['transcript'], ANALYSIS_CHUNK_CHARS, ANALYSIS_CHUNK_OVERLAP)
+        if len(chunks) > 1:
+            return await self._amap_reduce_analysis(chunks, participants_str, metadata_str)
+
+        messages = self._analysis_messages(state, participants_str, metadata_str)
+        response = await self.model.with_structured_output(MeetingOutput).ainvoke(messages)
+        return self._analysis_result(response)
+
+    async def _abatch_structured(self, message_batches: List[list]) -> List[MeetingOutput]:
+        """Bản async của _batch_structured."""
+        structured = self.model.with_structured_output(MeetingOutput)
+        config = {'max_concurrency': ANALYSIS_MAP_CONCURRENCY}
+
+        results = await structured.abatch(message_batches, config=config, return_exceptions=True)
+        failed = [i for i, r in enumerate(results) if isinstance(r, Exception)]
+        if failed:
+            print(f"  ⚠️ {len(failed)} lời gọi lỗi, thử lại...")
+            retried = await structured.abatch([message_batches[i] for i in failed], config=config)
+            for i, result in zip(failed, retried):
+                results[i] = result
+        return results
+
+    async def _amap_reduce_analysis(self, chunks: List[str], participants_str: str, metadata_str: str):
+        """Bản async của _map_reduce_analysis."""
+        print(f"  🔀 Transcript dài -> {len(chunks)} phần (map song song tối đa {ANALYSIS_MAP_CONCURRENCY})")
+
+        partials = await self._abatch_structured(self._map_messages(chunks, participants_str, metadata_str))
+        chunk_summaries, action_items = self._collect_partials(partials)
+
+        summaries = chunk_summaries
+        while groups := self._reduce_groups(summaries):
+            merged = await self._abatch_structured([
+                self._reduce_messages(group, [], participants_str, metadata_str) for group in groups
+            ])
+            summaries = [m.summary for m in merged]
+
+        response = await self.model.with_structured_output(MeetingOutput).ainvoke(
+            self._reduce_messages(summaries, action_items, participants_str, metadata_str)
+        )
+        return self._analysis_result(response, chunk_summaries)
+
+    async def _areflection(self, state: AgentState):
+        """Node 3 (async): Tự kiểm tra và phát hiện lỗi"""
+        print("\n[NODE 3] Đang tự kiểm tra chất lượng...")
+        print('='*100)
+
+        local_result = self._local_reflection(state)
+        if local_result is not None:
+            return local_result
+
+        response = await self.model.with_structured_output(ReflectionOutput).ainvoke(self._reflection_messages(state))
+        path = PATH_LLM_ACCEPT if response.decision == 'accept' else PATH_LLM_REVISE
+        return self._reflection_result(state, response.critique, response.decision, path)
+
+    async def _arefinement(self, state: AgentState):
+        """Node 4 (async): Tinh chỉnh dựa trên phản hồi"""
+        print("\n[NODE 4] Tinh chỉnh MoM...")
+        print('='*100)
+
+        response = await self.model.with_structured_output(MeetingOutput).ainvoke(self._refinement_messages(state))
+        return self._refinement_result(state, response)
+
+    async def _acreate_tasks(self, state: AgentState):
+        """Node 5 (async): Tạo tasks song song"""
+        print("\n[NODE 5] Tạo tasks...")
+        print('='*100)
+
+        action_items, project_id, author_user_id, user_mapping = self._task_context(state)
+
+        tasks = await acreate_tasks(
+            action_items=action_items,
+            project_id=project_id,
+            author_user_id=author_user_id,
+            user_mapping=user_mapping,
+            concurrency=AGENT_IO_CONCURRENCY
+        )
+
+        print(f"  📊 Created {len(tasks)} tasks")
+        return {'tasks_created': tasks}
+
+    async def _anotification(self, state: AgentState):
+        """Node 6 (async): Gửi email cho các assignee song song"""
+        print("\n[NODE 6] Gửi notification...")
+        print('='*100)
+
+        skipped, jobs = self._plan_notifications(state)
+        semaphore = asyncio.Semaphore(max(1, AGENT_IO_CONCURRENCY))
+
+        async def _send(job: dict) -> bool:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    send_notification, email_body=job['body'], receiver_email=job['email'], subject=job['subject']
+                )
+
+        sent = await asyncio.gather(*[_send(job) for job in jobs])
+        return self._notification_result(skipped, jobs, sent)
+
     # ==================== CONDITIONAL LOGIC ====================
-    
+
     def _should_create_tasks(self, state: AgentState) -> bool:
         """Quyết định có cần tinh chỉnh dựa trên critique không."""
         decision = state.get('reflect_decision', '')
         max_revisions = state.get('max_revisions', 2)
         revision_count = state.get('revision_count', 0)
-        
+
         # Accept nếu decision là accept HOẶC đã đạt max revisions
         if decision == 'accept':
             return True
@@ -324,70 +628,111 @@ class MeetingToTaskAgent:
             print(f"  ⚠️ Đạt max revisions ({max_revisions}), tiếp tục...")
             return True
         return False
-    
+
     # ==================== PUBLIC METHODS ====================
-    
-    def run(self, audio_file_path: str, meeting_metadata: Optional[dict] = None, 
-            max_revisions: int = 2, thread_id: str = '1'):
-        """
-        Chạy workflow đến điểm Human Review
-        
-        Args:
-            audio_file_path: Đường dẫn đến file âm thanh
-            meeting_metadata: Metadata của cuộc họp (bao gồm participants)
-            max_revisions: Số lần tối đa cho phép tinh chỉnh
-            thread_id: ID của thread cho memory
-            
-        Returns:
-            Tuple[dict, dict]: (current_state, thread_config)
-        """
+
+    def _start(self, audio_file_path: str, meeting_metadata: Optional[dict],
+               max_revisions: int, thread_id: str, transcript: Optional[str]):
+        """Tạo (initial_state, thread_config) cho một lần chạy."""
         initial_state = {
             'audio_file_path': audio_file_path,
             'meeting_metadata': meeting_metadata or {},
             'max_revisions': max_revisions,
             'revision_count': 0,
+            # Luôn ghi đè: thread_id có thể được dùng lại (phân tích lại cùng cuộc họp),
+            # không được dùng transcript cũ còn trong checkpoint
+            'transcript': transcript or '',
+            'reflection_path': [],
         }
-        
-        thread = {'configurable': {'thread_id': thread_id}}
-        
+
         print("\n🚀 Starting Meeting-to-Task Agent...")
         print("="*100)
-        
+
         # Hiển thị participants
         participants = (meeting_metadata or {}).get('participants', [])
         if participants:
             print(f"👥 Participants: {_extract_participant_names(participants)}")
-        
+
+        return initial_state, {'configurable': {'thread_id': thread_id}}
+
+    def _review_updates(self, updated_mom: Optional[str], updated_action_items: Optional[list]) -> dict:
+        updates = {}
+        if updated_mom:
+            updates['mom'] = updated_mom
+        if updated_action_items:
+            updates['action_items'] = updated_action_items
+        return updates
+
+    def run(self, audio_file_path: str, meeting_metadata: Optional[dict] = None,
+            max_revisions: int = 2, thread_id: str = '1', transcript: Optional[str] = None):
+        """
+        Chạy workflow đến điểm Human Review
+
+        Args:
+            audio_file_path: Đường dẫn đến file âm thanh
+            meeting_metadata: Metadata của cuộc họp (bao gồm participants)
+            max_revisions: Số lần tối đa cho phép tinh chỉnh
+            thread_id: ID của thread cho memory
+            transcript: Transcript có sẵn (nếu có thì node STT được bỏ qua)
+
+        Returns:
+            Tuple[dict, dict]: (current_state, thread_config)
+        """
+        initial_state, thread = self._start(audio_file_path, meeting_metadata, max_revisions, thread_id, transcript)
+
         # Chạy đến điểm interrupt
         for event in self.graph.stream(initial_state, thread):
             pass  # Events đã được print trong nodes
 
         current_state = self.graph.get_state(thread)
         return current_state.values, thread
-    
-    def continue_after_review(self, thread, updated_mom: str = None, 
+
+    async def arun(self, audio_file_path: str, meeting_metadata: Optional[dict] = None,
+                   max_revisions: int = 2, thread_id: str = '1', transcript: Optional[str] = None):
+        """Bản async của run() (cùng tham số và giá trị trả về)."""
+        initial_state, thread = self._start(audio_file_path, meeting_metadata, max_revisions, thread_id, transcript)
+
+        async for event in self.agraph.astream(initial_state, thread):
+            pass
+
+        current_state = await self.agraph.aget_state(thread)
+        return current_state.values, thread
+
+    def continue_after_review(self, thread, updated_mom: str = None,
                               updated_action_items: list = None):
         """Cập nhật state và tiếp tục workflow sau human review"""
-        if updated_mom or updated_action_items:
-            updates = {}
-            if updated_mom:
-                updates['mom'] = updated_mom
-            if updated_action_items:
-                updates['action_items'] = updated_action_items
+        updates = self._review_updates(updated_mom, updated_action_items)
+        if updates:
             self.graph.update_state(thread, updates)
-        
+
         print("\n▶️ Continuing after human review...")
         print("="*100)
-        
+
         for event in self.graph.stream(None, thread):
             pass
-        
+
         final_state = self.graph.get_state(thread)
         return final_state.values
-    
+
+    async def acontinue_after_review(self, thread, updated_mom: str = None,
+                                     updated_action_items: list = None):
+        """Bản async của continue_after_review()."""
+        updates = self._review_updates(updated_mom, updated_action_items)
+        if updates:
+            await self.agraph.aupdate_state(thread, updates)
+
+        print("\n▶️ Continuing after human review...")
+        print("="*100)
+
+        async for event in self.agraph.astream(None, thread):
+            pass
+
+        final_state = await self.agraph.aget_state(thread)
+        return final_state.values
+
     def get_graph(self):
         """Hiển thị graph dưới dạng hình ảnh"""
         from IPython.display import Image, display
-        
+
         img = self.graph.get_graph().draw_mermaid_png()
-        return display(Image(img))
\ No newline at end of file
+        return display(Image(img))
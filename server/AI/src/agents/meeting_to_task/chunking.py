@@ -0,0 +1,70 @@
+"""
+Chia transcript dài thành các cửa sổ cho map-reduce analysis
+"""
+import re
+from typing import Dict, List
+
+# Ranh giới cắt ưu tiên: xuống dòng (đổi người nói) -> hết câu -> khoảng trắng
+_BOUNDARIES = ['\n', '. ', '? ', '! ', ' ']
+
+
+def _find_cut(text: str, start: int, end: int) -> int:
+    """Tìm vị trí cắt đẹp nhất trong nửa sau của [start, end)."""
+    floor = start + (end - start) // 2
+    for boundary in _BOUNDARIES:
+        cut = text.rfind(boundary, floor, end)
+        if cut != -1:
+            return cut + len(boundary)
+    return end
+
+
+def split_transcript(transcript: str, chunk_chars: int, overlap_chars: int = 0) -> List[str]:
+    """
+    Chia transcript thành các đoạn dài tối đa `chunk_chars` ký tự, cắt tại ranh giới dòng/câu.
+    Các đoạn liền kề chồng lên nhau `overlap_chars` ký tự để không mất ngữ cảnh ở chỗ cắt.
+    """
+    transcript = transcript.strip()
+    if len(transcript) <= chunk_chars:
+        return [transcript] if transcript else []
+
+    overlap_chars = max(0, min(overlap_chars, chunk_chars // 4))
+    chunks = []
+    start = 0
+    while start < len(transcript):
+        end = min(start + chunk_chars, len(transcript))
+        if end < len(transcript):
+            end = _find_cut(transcript, start, end)
+        chunks.append(transcript[start:end].strip())
+        if end >= len(transcript):
+            break
+        # Lùi lại một đoạn overlap, bắt đầu ở đầu dòng/câu
+        next_start = end - overlap_chars
+        if overlap_chars:
+            next_start = _find_cut(transcript, next_start - overlap_chars, next_start)
+        start = max(next_start, start + 1)
+    return [c for c in chunks if c]
+
+
+def normalize_title(title: str) -> str:
+    """Chuẩn hoá title để so sánh trùng lặp (bỏ hoa/thường, dấu câu)."""
+    return re.sub(r'\W+', ' ', (title or '').lower()).strip()
+
+
+def dedupe_action_items(action_items: List[dict]) -> List[dict]:
+    """
+    Loại bỏ action item trùng (cùng title sau khi chuẩn hoá) giữa các đoạn.
+    Giữ item đầu tiên, bổ sung các trường còn thiếu từ các bản trùng.
+    """
+    merged: Dict[str, dict] = {}
+    for item in action_items:
+        key = normalize_title(item.get('title', ''))
+        if not key:
+            continue
+        if key not in merged:
+            merged[key] = dict(item)
+            continue
+        existing = merged[key]
+        for field, value in item.items():
+            if value and (not existing.get(field) or (field == 'assignee' and existing.get(field) == 'Unassigned')):
+                existing[field] = value
+    return list(merged.values())
@@ -82,4 +82,52 @@ REFINEMENT_PROMPT = """Bạn cần cải thiện Minutes of Meeting và Action I
 ## TRANSCRIPT GỐC (tham khảo):
 {transcript}
 
-Hãy output bản cải thiện với các sửa đổi theo phản hồi."""
\ No newline at end of file
+Hãy output bản cải thiện với các sửa đổi theo phản hồi."""
+
+MAP_PROMPT = """Bạn đang phân tích **phần {part}/{total_parts}** của transcript một cuộc họp dài.
+Chỉ trích xuất thông tin có trong phần này; các phần khác sẽ được tổng hợp sau.
+
+## NHIỆM VỤ:
+1. **summary**: Tóm tắt ngắn gọn nội dung thảo luận và các quyết định TRONG PHẦN NÀY
+2. **action_items**: Các công việc được giao/đề cập TRONG PHẦN NÀY (không suy đoán từ phần khác)
+
+## QUY TẮC:
+1. **Assignee** CHỈ ĐƯỢC chọn từ danh sách participants. Không xác định được → "Unassigned"
+2. **dueDate** định dạng YYYY-MM-DD, tính từ ngày cuộc họp trong metadata
+3. Nếu phần này không có công việc nào → action_items rỗng
+
+## DANH SÁCH PARTICIPANTS:
+{participants}
+
+## THÔNG TIN CUỘC HỌP:
+{metadata}
+
+## TRANSCRIPT (PHẦN {part}/{total_parts}):
+{transcript}
+"""
+
+
+REDUCE_PROMPT = """Bạn nhận được kết quả phân tích của từng phần trong một cuộc họp dài (theo thứ tự thời gian).
+Hãy tổng hợp thành một Minutes of Meeting và danh sách Action Items hoàn chỉnh.
+
+## NHIỆM VỤ:
+1. **summary**: Gộp các bản tóm tắt thành một bản thống nhất (mục đích, nội dung chính, các quyết định), không lặp ý
+2. **action_items**: Gộp và **loại bỏ trùng lặp** - cùng một công việc được nhắc ở nhiều phần chỉ giữ một item,
+   ưu tiên thông tin đầy đủ/mới nhất (assignee, dueDate, priority)
+
+## QUY TẮC:
+1. **Assignee** CHỈ ĐƯỢC chọn từ danh sách participants. Không xác định được → "Unassigned"
+2. **dueDate** định dạng YYYY-MM-DD
+
+## DANH SÁCH PARTICIPANTS:
+{participants}
+
+## THÔNG TIN CUỘC HỌP:
+{metadata}
+
+## TÓM TẮT TỪNG PHẦN:
+{partial_summaries}
+
+## ACTION ITEMS TỪNG PHẦN:
+{partial_action_items}
+"""
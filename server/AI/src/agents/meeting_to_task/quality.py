@@ -0,0 +1,107 @@
+"""
+Kiểm tra chất lượng MoM + Action Items bằng rule (không gọi LLM).
+Bản nháp đạt mọi rule thì bỏ qua bước reflection bằng LLM.
+"""
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List
+
+from .chunking import normalize_title
+
+VALID_PRIORITIES = {'low', 'medium', 'high', 'urgent'}
+UNASSIGNED = 'unassigned'
+MIN_TITLE_CHARS = 5
+MIN_SUMMARY_CHARS = 30
+
+# Title quá chung chung (REFLECTION_PROMPT cũng coi đây là lỗi nghiêm trọng)
+GENERIC_TITLES = {'làm việc', 'công việc', 'task', 'todo', 'việc cần làm', 'follow up', 'theo dõi'}
+
+# Các nhánh của node reflection
+PATH_LOCAL_ACCEPT = 'local_accept'   # rule đạt -> accept, không gọi LLM
+PATH_LOCAL_REVISE = 'local_revise'   # rule không đạt -> refinement với critique từ rule
+PATH_LLM_ACCEPT = 'llm_accept'
+PATH_LLM_REVISE = 'llm_revise'
+
+
+@dataclass
+class QualityReport:
+    """Kết quả kiểm tra: passed=True khi không có lỗi nào."""
+    issues: List[str] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.issues
+
+    def critique(self) -> str:
+        return "Các lỗi cần sửa:\n" + "\n".join(f"- {issue}" for issue in self.issues)
+
+
+def check_draft(mom: str, action_items: List[dict], participants: List[dict]) -> QualityReport:
+    """Kiểm tra bản nháp theo các tiêu chí 'lỗi nghiêm trọng' của REFLECTION_PROMPT mà rule kiểm được."""
+    report = QualityReport()
+    valid_assignees = {(p.get('username') or '').lower() for p in participants or []} - {''}
+
+    if len((mom or '').strip()) < MIN_SUMMARY_CHARS:
+        report.issues.append("Summary trống hoặc quá ngắn, cần tóm tắt mục đích, nội dung chính và quyết định")
+
+    seen = {}
+    for i, item in enumerate(action_items or [], start=1):
+        title = (item.get('title') or '').strip()
+        label = f"Action item #{i}" + (f" ('{title[:40]}')" if title else '')
+
+        if not title:
+            report.issues.append(f"{label}: thiếu title")
+        elif len(title) < MIN_TITLE_CHARS or title.lower() in GENERIC_TITLES:
+            report.issues.append(f"{label}: title quá chung chung, cần cụ thể hơn")
+
+        # Không có participants -> mọi assignee khác 'Unassigned' đều là bịa
+        assignee = (item.get('assignee') or '').strip().lower()
+        if assignee and assignee != UNASSIGNED and assignee not in valid_assignees:
+            if valid_assignees:
+                report.issues.append(f"{label}: assignee '{item.get('assignee')}' không có trong danh sách participants (dùng 'Unassigned' nếu không rõ)")
+            else:
+                report.issues.append(f"{label}: cuộc họp không có danh sách participants, assignee phải là 'Unassigned'")
+
+        due_date = item.get('dueDate')
+        if due_date:
+            try:
+                datetime.strptime(due_date, '%Y-%m-%d')
+            except (TypeError, ValueError):
+                report.issues.append(f"{label}: dueDate '{due_date}' không đúng định dạng YYYY-MM-DD")
+
+        priority = item.get('priority')
+        if priority and priority.lower() not in VALID_PRIORITIES:
+            report.issues.append(f"{label}: priority '{priority}' không hợp lệ (Low/Medium/High/Urgent)")
+
+        key = normalize_title(title)
+        if key and key in seen:
+            report.issues.append(f"{label}: trùng với action item #{seen[key]}, cần gộp lại")
+        elif key:
+            seen[key] = i
+
+    return report
+
+
+# ==================== THỐNG KÊ ====================
+
+_path_counts = Counter()
+_path_lock = threading.Lock()
+
+
+def record_reflection_path(path: str):
+    with _path_lock:
+        _path_counts[path] += 1
+
+
+def reflection_stats() -> dict:
+    """Số lần mỗi nhánh reflection được chọn (trong process hiện tại)."""
+    with _path_lock:
+        total = sum(_path_counts.values())
+        local = _path_counts[PATH_LOCAL_ACCEPT] + _path_counts[PATH_LOCAL_REVISE]
+        return {
+            **dict(_path_counts),
+            "total": total,
+            "llm_calls_saved_rate": round(local / total, 4) if total else 0.0,
+        }
@@ -47,10 +47,12 @@ class AgentState(TypedDict):
     transcript: str  # Văn bản transcript từ STT
     mom: str  # Minutes of Meeting - tóm tắt cuộc họp
     action_items: List[dict]  # Danh sách action items dạng dict
+    chunk_summaries: List[str]  # Tóm tắt từng phần (chỉ có khi transcript dài được map-reduce)
     
     # Reflection - Kết quả kiểm tra chất lượng
     reflect_decision: str  # Quyết định từ reflection: 'accept' hoặc 'revise'
     critique: str  # Nội dung đánh giá và đề xuất cải thiện
+    reflection_path: List[str]  # Nhánh reflection đã chạy mỗi vòng: local_accept/local_revise/llm_accept/llm_revise
     
     # Completion - Kết quả cuối cùng
     tasks_created: List[dict]  # Danh sách tasks đã tạo trong backend (với id từ API)
@@ -3,10 +3,10 @@ Tools for Meeting-to-Task Agent
 """
 from typing import Dict, List, Optional
 from datetime import datetime
+import asyncio
 import os
 from pathlib import Path
 import smtplib
-import requests
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
 
@@ -14,10 +14,21 @@ from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+from ...shared import sha256_file, SqliteCache, AI_CACHE_DIR
+from ...models.whisper_pool import WHISPER_MODEL_SIZE
+from ...models.parallel_stt import transcribe_segments
+from ..tool_backend import get_tool_backend
+
 load_dotenv()
 
-API_BASE_URL = os.environ.get('API_BASE_URL', 'http://localhost:3000')
-_stt_model_cache = {}
+# Transcript cache lưu trên disk, key = provider + SHA-256 nội dung file âm thanh
+# (upload lại file khác vào cùng path sẽ không dùng nhầm transcript cũ)
+_transcript_cache = SqliteCache(
+    os.path.join(AI_CACHE_DIR, 'transcripts.sqlite'),
+    max_entries=int(os.environ.get('TRANSCRIPT_CACHE_MAX_ENTRIES', '500')),
+    max_bytes=int(os.environ.get('TRANSCRIPT_CACHE_MAX_BYTES', str(200 * 1024 * 1024))),
+    name='transcripts',
+)
 
 # Khởi tạo Client (Dùng chung)
 try:
@@ -27,6 +38,23 @@ except Exception as e:
     ai_client = None
 
 
+def _transcript_cache_key(audio_file_path: str, provider: str) -> str:
+    """
+    Key cache theo nội dung file (không theo path).
+    Một entry chứa cả văn bản và segment ({"transcript", "segments"}) để hai phần không bị evict lệch nhau.
+    """
+    provider_key = f"{provider}/{WHISPER_MODEL_SIZE}" if provider == "faster-whisper" else provider
+    return f"stt:{provider_key}:{sha256_file(audio_file_path)}"
+
+
+def _lines_to_segments(transcript: str) -> List[dict]:
+    """Gemini chỉ trả văn bản: mỗi dòng là một segment (timestamp 0)."""
+    return [
+        {"start_ms": 0, "end_ms": 0, "text": line.strip()}
+        for line in transcript.splitlines() if line.strip()
+    ]
+
+
 def transcribe_audio(audio_file_path: str, use_mock: bool = False, provider: str = 'gemini') -> str:
     """
     Chuyển đổi file âm thanh thành văn bản dùng Google GenAI SDK mới.
@@ -44,12 +72,15 @@ def transcribe_audio(audio_file_path: str, use_mock: bool = False, provider: str
         if not Path(audio_file_path).exists():
             raise FileNotFoundError(f"File âm thanh không tồn tại: {audio_file_path}")
         
-        # 2. Check Cache
-        cache_key = f"{provider}:{audio_file_path}"
-        if cache_key in _stt_model_cache:
-            return _stt_model_cache[cache_key]
+        # 2. Check Cache (theo nội dung file, không theo path)
+        cache_key = _transcript_cache_key(audio_file_path, provider)
+        cached = _transcript_cache.get_json(cache_key)
+        if cached is not None:
+            print(f"  ♻️ Transcript cache hit ({len(cached['transcript'])} ký tự)")
+            return cached['transcript']
         
         transcript = ""
+        segments = []
         
         if provider == "gemini":
             if not ai_client:
@@ -75,17 +106,22 @@ def transcribe_audio(audio_file_path: str, use_mock: bool = False, provider: str
                 contents=[prompt, upload_file]
             )
             transcript = response.text
+            segments = _lines_to_segments(transcript)
 
         elif provider == "faster-whisper":
-            from faster_whisper import WhisperModel
-            model = WhisperModel("base", device="cpu", compute_type="int8")
-            segments, _ = model.transcribe(audio_file_path, language="vi", beam_size=3)
-            transcript = " ".join([segment.text for segment in segments])
+            # Audio dài: cắt theo VAD và transcribe song song; audio ngắn: dùng model trong pool
+            raw_segments = transcribe_segments(audio_file_path, language="vi", beam_size=3)
+            transcript = " ".join([segment['text'] for segment in raw_segments])
+            # Giữ cả timestamp để lưu vào bảng transcript_segments
+            segments = [
+                {"start_ms": int(seg['start'] * 1000), "end_ms": int(seg['end'] * 1000), "text": seg['text']}
+                for seg in raw_segments
+            ]
             
         else:
             raise ValueError(f"Unsupported provider: {provider}")
         
-        _stt_model_cache[cache_key] = transcript
+        _transcript_cache.set_json(cache_key, {"transcript": transcript, "segments": segments})
         print(f"  ✅ Transcribe hoàn tất! ({len(transcript)} ký tự)")
         return transcript
         
@@ -94,6 +130,30 @@ def transcribe_audio(audio_file_path: str, use_mock: bool = False, provider: str
         return "Lỗi khi xử lý âm thanh. (Nội dung giả lập: Cuộc họp bắt đầu...)"
 
 
+def transcribe_audio_segments(audio_file_path: str, provider: str = 'gemini',
+                              transcript: Optional[str] = None) -> List[dict]:
+    """
+    Transcript dạng segment [{start_ms, end_ms, text}] (dùng cache của transcribe_audio).
+    faster-whisper có timestamp thật; Gemini chỉ trả văn bản nên mỗi dòng là một segment (timestamp 0).
+    transcript: văn bản đã có (ví dụ kết quả của agent) -> Gemini không cần STT lại khi cache miss.
+    Trả về [] nếu không có segment (STT lỗi).
+    """
+    cache_key = _transcript_cache_key(audio_file_path, provider)
+    cached = _transcript_cache.get_json(cache_key)
+    if cached is None:
+        if transcript and provider != "faster-whisper":
+            return _lines_to_segments(transcript)
+        # Cache miss: transcribe lại (kết quả được ghi vào cache cùng văn bản)
+        transcribe_audio(audio_file_path, provider=provider)
+        cached = _transcript_cache.get_json(cache_key)
+    return cached["segments"] if cached else []
+
+
+def transcript_cache_stats() -> dict:
+    """Thống kê hit/miss của transcript cache."""
+    return _transcript_cache.stats()
+
+
 def get_emails_from_participants(participants: List[dict]) -> Dict[str, str]:
     """Lấy email từ danh sách participants."""
     emails = {}
@@ -157,23 +217,30 @@ Bạn có công việc được giao từ cuộc họp "{meeting_title}" (ngày
 
 def create_task(title: str, project_id: int, author_user_id: int, description: Optional[str] = None, status: Optional[str] = None, priority: Optional[str] = None, tags: Optional[str] = None, start_date: Optional[str] = None, due_date: Optional[str] = None, points: Optional[int] = None, assigned_user_id: Optional[int] = None) -> dict:
     """Tạo một task trong hệ thống backend."""
-    payload = {
-        "title": title, "projectId": project_id, "authorUserId": author_user_id,
-        "description": description, "status": status, "priority": priority,
-        "tags": tags, "startDate": start_date, "dueDate": due_date,
-        "points": points, "assignedUserId": assigned_user_id
-    }
-    # Clean None values
-    payload = {k: v for k, v in payload.items() if v is not None}
+    fields = dict(
+        description=description, status=status, priority=priority, tags=tags,
+        start_date=start_date, due_date=due_date, points=points, assignee_id=assigned_user_id
+    )
     
-    try:
-        response = requests.post(f"{API_BASE_URL}/tasks", json=payload, headers={"Content-Type": "application/json"}, timeout=30)
-        if response.status_code == 201:
-            return response.json()
-        raise Exception(f"API error: {response.text}")
-    except Exception as e:
-        print(f"  ⚠️ Mock task created: {title}")
-        return {"id": 999, **payload}
+    # In-process khi chạy trong server, HTTP khi agent chạy tách rời (AGENT_TOOL_BACKEND)
+    result = get_tool_backend().create_task(title, project_id, author_user_id, **fields)
+    if result["success"]:
+        return result["data"]
+    print(f"  ⚠️ Mock task created: {title} ({result['error']})")
+    return {"id": 999, "title": title, "projectId": project_id, "authorUserId": author_user_id,
+            **{k: v for k, v in fields.items() if v is not None}}
+
+
+def _task_kwargs(item: dict, project_id: int, author_user_id: int, user_mapping: Dict[str, int]) -> dict:
+    """Chuyển action item -> tham số của create_task."""
+    assignee_name = item.get("assignee", "").strip()
+    assigned_user_id = user_mapping.get(assignee_name.lower()) if assignee_name else None
+    return dict(
+        title=item.get("title"), project_id=project_id, author_user_id=author_user_id,
+        description=item.get("description"), status=item.get("status", "To Do"),
+        priority=item.get("priority", "Medium"), due_date=item.get("dueDate"),
+        assigned_user_id=assigned_user_id
+    )
 
 
 def create_tasks(action_items: List[dict], project_id: int, author_user_id: int, user_mapping: Optional[Dict[str, int]] = None) -> List[dict]:
@@ -184,18 +251,29 @@ def create_tasks(action_items: List[dict], project_id: int, author_user_id: int,
     
     for item in action_items:
         if not isinstance(item, dict) or 'title' not in item: continue
-        assignee_name = item.get("assignee", "").strip()
-        assigned_user_id = user_mapping.get(assignee_name.lower()) if assignee_name else None
-        
         try:
-            task = create_task(
-                title=item.get("title"), project_id=project_id, author_user_id=author_user_id,
-                description=item.get("description"), status=item.get("status", "To Do"),
-                priority=item.get("priority", "Medium"), due_date=item.get("dueDate"),
-                assigned_user_id=assigned_user_id
-            )
+            task = create_task(**_task_kwargs(item, project_id, author_user_id, user_mapping))
             created_tasks.append(task)
         except Exception as e:
             print(f"  ❌ Failed task: {e}")
             
-    return created_tasks
\ No newline at end of file
+    return created_tasks
+
+
+async def acreate_tasks(action_items: List[dict], project_id: int, author_user_id: int, user_mapping: Optional[Dict[str, int]] = None, concurrency: int = 8) -> List[dict]:
+    """Tạo nhiều tasks song song (tối đa `concurrency` request cùng lúc), giữ thứ tự action items."""
+    if not action_items: return []
+    user_mapping = user_mapping or {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def _create(item: dict):
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(create_task, **_task_kwargs(item, project_id, author_user_id, user_mapping))
+            except Exception as e:
+                print(f"  ❌ Failed task: {e}")
+                return None
+    
+    items = [item for item in action_items if isinstance(item, dict) and 'title' in item]
+    results = await asyncio.gather(*[_create(item) for item in items])
+    return [task for task in results if task is not None]
@@ -1,18 +1,25 @@
 # server/AI/src/agents/project_manager/agent.py
 
+import asyncio
 import json
 import operator
+import os
+import threading
 from typing import TypedDict, Annotated, Literal, List, Optional
 from pydantic import BaseModel, Field
 
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage, AnyMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
 # --- FIX IMPORTS CHO SERVER ---
 try:
     # Import từ cấu trúc thư mục của Server
     from AI.src.models.models import call_llm
-    from AI.src.rag.retriever import retrieve, format_retrieved_documents
+    from AI.src.models.embeddings import get_embedding_service
+    from AI.src.rag.retriever import retrieve, aretrieve, format_retrieved_documents, merge_results, NO_DOCUMENTS_FOUND
+    from AI.src.rag.versions import get_collection_version
+    from AI.src.rag.knowledge import project_collection_name
     from .api_tools import ALL_API_TOOLS
 except ImportError:
     # Fallback nếu chạy test local
@@ -21,6 +28,10 @@ except ImportError:
     # sys.path.append(...) 
     pass
 
+from .memory import ConversationMemory
+from .intent import LocalIntentClassifier
+from .semantic_cache import SemanticAnswerCache, PM_SEMANTIC_CACHE_ENABLED, NO_VERSION
+
 # --- CONFIGURATION ---
 # --- SỬA CẤU HÌNH MODEL ---
 param_dict = {
@@ -53,11 +64,36 @@ param_dict = {
     },
 }
 
+# Các node sinh câu trả lời cho user (token của chúng được stream ra client)
+GENERATOR_NODES = {'semantic_cache', 'rag_generator', 'tool_generator', 'direct_generator'}
+
+RAG_COLLECTION = 'ProjectDocuments'
+# Số chunk lấy từ knowledge của project (biên bản họp, transcript, task)
+PM_KNOWLEDGE_TOP_K = int(os.environ.get('PM_KNOWLEDGE_TOP_K', '5'))
+# Chỉ cache câu trả lời không phụ thuộc user/dữ liệu task (TOOL_CALL luôn chạy lại)
+CACHEABLE_INTENTS = {'RAG', 'DIRECT'}
+
+
+def _content_text(content) -> str:
+    """Nội dung message -> text (Gemini có thể trả list các part)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return ""
+
 # --- STATE & SCHEMAS ---
 class AgentState(TypedDict):
     messages: Annotated[list[AnyMessage], operator.add]
     query: str
+    current_user_id: str  # User đang chat (truyền theo từng request, agent dùng chung cho mọi user)
+    project_id: Optional[str]
+    conversation_summary: str  # Tóm tắt các lượt cũ của thread
+    history: List[AnyMessage]  # Các lượt gần đây (nguyên văn, trong ngân sách token)
     router_decision: str 
+    query_embedding: Optional[list]  # Embedding của query (từ intent classifier), dùng lại cho semantic cache
+    cache_scope: Optional[list]  # [intent, version] của semantic cache lúc tra (dùng lại khi lưu)
+    cache_hit: bool
     grader_decision: str
     retrieved_documents: list[dict]
     grader_critique: str
@@ -76,38 +112,87 @@ class GraderOuput(BaseModel):
 
 # --- MAIN AGENT CLASS ---
 class ProjectManagerAgent:
-    def __init__(self, current_user_id: int):
-        self.current_user_id = current_user_id
-        
+    """
+    Agent không giữ thông tin của user: LLM clients và graph được tạo một lần,
+    user hiện tại đi theo state của từng lần chạy -> dùng chung một instance cho cả process
+    (xem get_project_manager_agent()).
+    """
+    def __init__(self):
         # Init Models
-        self.llm_router = call_llm(**param_dict['router_kwargs'])
+        # LLM cache chỉ cho các bước phân loại / chấm điểm / viết lại (câu trả lời đã có semantic cache)
+        self.llm_router = call_llm(**param_dict['router_kwargs'], use_cache=True)
         self.llm_rag = call_llm(**param_dict['large_deterministic_kwargs'])
         self.llm_direct = call_llm(**param_dict['direct_kwargs'])
         self.llm_tool_call = call_llm(**param_dict['large_deterministic_kwargs'])
-        self.llm_grader = call_llm(**param_dict['large_deterministic_kwargs'])
-        self.llm_rewriter = call_llm(**param_dict['rewriter_kwargs'])
+        self.llm_grader = call_llm(**param_dict['large_deterministic_kwargs'], use_cache=True)
+        self.llm_rewriter = call_llm(**param_dict['rewriter_kwargs'], use_cache=True)
         
         # Init Tools
         self.tools_list = ALL_API_TOOLS
         self.tools = {t.name: t for t in self.tools_list}
         self.llm_tool_call = self.llm_tool_call.bind_tools(self.tools_list)
         
+        # Router cục bộ (rules + centroid), chỉ gọi LLM router khi không đủ tự tin
+        self.intent_classifier = LocalIntentClassifier(embed=self._embed_query)
+        
+        # Câu hỏi gần trùng câu đã trả lời -> trả lời từ cache, không gọi LLM / vector DB
+        self.answer_cache = SemanticAnswerCache() if PM_SEMANTIC_CACHE_ENABLED else None
+        
+        # Conversation memory theo (user, thread)
+        self.memory = ConversationMemory(summarize=self._summarize_turns)
+        
         # Build Graph
         self.graph = self.build_graph()
 
-    def run(self, message: str, project_id: str = None, user_id: str = None, thread_id: str = "general"):
-        """Wrapper function để gọi Agent từ API Router"""
-        initial_state = {
+    def _memory_key(self, user_id: str, thread_id: str) -> str:
+        # Thread gắn với user: user khác dùng cùng thread_id không thấy hội thoại của nhau
+        return f"{user_id}:{thread_id}"
+
+    def _summarize_turns(self, summary: str, turns: list) -> str:
+        """Gộp các lượt hội thoại cũ vào bản tóm tắt (dùng model rewriter, output ngắn)."""
+        dialogue = "\n".join(f"User: {user_text}\nAssistant: {assistant_text}" for user_text, assistant_text in turns)
+        prompt = f"""Cập nhật bản tóm tắt hội thoại giữa User và PM Assistant.
+Giữ lại các thông tin cần cho các câu hỏi tiếp theo (dự án, task, người, quyết định, yêu cầu của user). Viết ngắn gọn, tiếng Việt.
+
+Tóm tắt hiện tại:
+{summary or "(chưa có)"}
+
+Các lượt hội thoại mới:
+{dialogue}"""
+        response = self.llm_rewriter.invoke([HumanMessage(content=prompt)])
+        return str(response.content).strip()
+
+    def _context_messages(self, state: AgentState) -> list:
+        """Tóm tắt + lịch sử gần đây đặt trước câu hỏi hiện tại."""
+        summary = state.get('conversation_summary')
+        messages = [SystemMessage(content=f"Tóm tắt hội thoại trước đó:\n{summary}")] if summary else []
+        return messages + list(state.get('history') or [])
+
+    def _initial_state(self, message: str, project_id: str = None, user_id: str = None,
+                       thread_id: str = "general") -> dict:
+        summary, history = self.memory.get(self._memory_key(user_id, thread_id))
+        return {
             "messages": [],
             "query": message,
+            "current_user_id": user_id,
+            "project_id": project_id,
+            "conversation_summary": summary,
+            "history": history,
             "retrieved_documents": [],
             "grader_critique": "",
             "rewrite_numbers": 0,
             "max_rewrite": 3,
             "router_decision": "",
+            "query_embedding": None,
+            "cache_scope": None,
+            "cache_hit": False,
             "grader_decision": "",
             "feedback_history": [],
         }
+
+    def run(self, message: str, project_id: str = None, user_id: str = None, thread_id: str = "general"):
+        """Wrapper function để gọi Agent từ API Router"""
+        initial_state = self._initial_state(message, project_id, user_id, thread_id)
         
         # Chạy Graph
         try:
@@ -116,18 +201,75 @@ class ProjectManagerAgent:
             # Lấy tin nhắn cuối cùng từ Bot
             last_message = final_state['messages'][-1]
             if hasattr(last_message, 'content'):
-                return str(last_message.content)
+                response = str(last_message.content)
+                self.memory.add_turn(self._memory_key(user_id, thread_id), message, response)
+                return response
             return "Đã xử lý xong nhưng không có phản hồi."
             
         except Exception as e:
             print(f"❌ Error in Agent Run: {e}")
             return f"Xin lỗi, tôi gặp lỗi khi xử lý: {str(e)}"
 
+    async def astream(self, message: str, project_id: str = None, user_id: str = None, thread_id: str = "general"):
+        """
+        Chạy graph và trả về từng sự kiện ngay khi có (dùng cho SSE):
+            {"type": "route", "decision": "RAG" | "TOOL_CALL" | "DIRECT"}
+            {"type": "tool_start", "name", "input"} / {"type": "tool_end", "name"}
+            {"type": "token", "node", "text"}      # token của câu trả lời
+            {"type": "done", "response"}           # câu trả lời đầy đủ
+            {"type": "error", "message"}
+        """
+        initial_state = self._initial_state(message, project_id, user_id, thread_id)
+        streamed_nodes = set()
+        final_message = None
+
+        try:
+            async for event in self.graph.astream_events(initial_state, version="v2"):
+                kind = event["event"]
+                name = event.get("name")
+                node = event.get("metadata", {}).get("langgraph_node")
+
+                if kind == "on_chain_end" and name == "router" and node == "router":
+                    yield {"type": "route", "decision": (event["data"].get("output") or {}).get("router_decision")}
+
+                elif kind == "on_tool_start":
+                    yield {"type": "tool_start", "name": name, "input": event["data"].get("input")}
+
+                elif kind == "on_tool_end":
+                    yield {"type": "tool_end", "name": name}
+
+                elif kind == "on_chat_model_stream" and node in GENERATOR_NODES:
+                    text = _content_text(event["data"]["chunk"].content)
+                    if text:
+                        streamed_nodes.add(node)
+                        yield {"type": "token", "node": node, "text": text}
+
+                elif kind == "on_chain_end" and name in GENERATOR_NODES and node == name:
+                    messages = (event["data"].get("output") or {}).get("messages") or []
+                    if messages:
+                        final_message = messages[-1]
+                        # Response lấy từ LLM cache không đi qua stream -> gửi cả câu một lần
+                        text = _content_text(getattr(final_message, "content", ""))
+                        if node not in streamed_nodes and text:
+                            yield {"type": "token", "node": node, "text": text}
+                    streamed_nodes.discard(node)  # tool_generator có thể chạy nhiều vòng
+
+            response = _content_text(getattr(final_message, "content", "")) if final_message else ""
+            if response:
+                self.memory.add_turn(self._memory_key(user_id, thread_id), message, response)
+            yield {"type": "done", "response": response or "Đã xử lý xong nhưng không có phản hồi."}
+
+        except Exception as e:
+            print(f"❌ Error in Agent Stream: {e}")
+            yield {"type": "error", "message": f"Xin lỗi, tôi gặp lỗi khi xử lý: {str(e)}"}
+
     def build_graph(self) -> StateGraph:
         builder = StateGraph(AgentState)
         
         builder.add_node('router', self.router)
-        builder.add_node('retriever', self.retriever)
+        builder.add_node('semantic_cache', self.semantic_cache)
+        # graph.invoke dùng bản sync, astream (SSE) dùng bản async với Weaviate async client
+        builder.add_node('retriever', RunnableLambda(self.retriever, afunc=self.aretriever, name='retriever'))
         builder.add_node('grader', self.grader)
         builder.add_node('query_rewriter', self.query_rewriter)
         builder.add_node('rag_generator', self.rag_generator)
@@ -137,8 +279,9 @@ class ProjectManagerAgent:
         
         builder.set_entry_point('router')
         
-        builder.add_conditional_edges('router', self._intent_classify, {
-            'RAG': 'retriever', 'TOOL_CALL': 'tool_generator', 'DIRECT': 'direct_generator'
+        builder.add_edge('router', 'semantic_cache')
+        builder.add_conditional_edges('semantic_cache', self._intent_classify, {
+            'CACHED': END, 'RAG': 'retriever', 'TOOL_CALL': 'tool_generator', 'DIRECT': 'direct_generator'
         })
         
         builder.add_edge('retriever', 'grader')
@@ -157,30 +300,102 @@ class ProjectManagerAgent:
         return builder.compile()
 
     # --- NODE FUNCTIONS ---
-    def router(self, state: AgentState):
+    def _embed_query(self, text: str) -> list:
+        # Qua embedding service: câu hỏi lặp lại không bị embed lại, embed đồng thời được gộp batch
+        return get_embedding_service().embed(text)
+
+    def _llm_route(self, state: AgentState) -> str:
         query = state['query']
         prompt = """Phân loại câu hỏi vào 1 trong 3 nhánh:
 DIRECT - Trả lời trực tiếp (Chào hỏi, kiến thức chung)
-RAG - Tra cứu tài liệu (Quy trình, quy định công ty)
+RAG - Tra cứu tài liệu (Quy trình, quy định công ty) và nội dung đã bàn/quyết định trong các cuộc họp của dự án
 TOOL_CALL - Thao tác dữ liệu (Task của tôi, tạo task, search)"""
         
-        messages = [SystemMessage(content=prompt), HumanMessage(content=query)]
+        # Chỉ cần vài lượt gần nhất để hiểu câu hỏi nối tiếp ("còn task kia thì sao?")
+        history = list(state.get('history') or [])[-4:]
+        messages = [SystemMessage(content=prompt)] + history + [HumanMessage(content=query)]
+        response = self.llm_router.with_structured_output(RouterOutput).invoke(messages)
+        return response.decision
+
+    def router(self, state: AgentState):
+        query = state['query']
+        
+        local = self.intent_classifier.classify(query)
+        if local.decision:
+            print(f"  🧭 Router ({local.source}, {local.confidence:.2f}): {local.decision}")
+            self.intent_classifier.maybe_shadow(query, local.decision, lambda: self._llm_route(state))
+            return {'router_decision': local.decision, 'query_embedding': local.embedding}
+        
         try:
-            response = self.llm_router.with_structured_output(RouterOutput).invoke(messages)
-            return {'router_decision': response.decision}
+            decision = self._llm_route(state)
         except:
             return {'router_decision': 'DIRECT'} # Fallback
+        
+        # Chỉ học từ câu hỏi độc lập (câu nối tiếp phụ thuộc vào lịch sử hội thoại)
+        if not state.get('history'):
+            self.intent_classifier.record_llm_decision(query, decision, local.embedding)
+        return {'router_decision': decision, 'query_embedding': local.embedding}
+
+    def _cacheable(self, state: AgentState) -> bool:
+        # Câu nối tiếp phụ thuộc lịch sử hội thoại -> không dùng chung câu trả lời
+        return (self.answer_cache is not None and state['router_decision'] in CACHEABLE_INTENTS
+                and not state.get('history') and not state.get('conversation_summary'))
+
+    def _cache_scope(self, state: AgentState) -> list:
+        """[intent, version]: câu trả lời RAG phụ thuộc tài liệu chung và knowledge của project đang chat."""
+        decision = state['router_decision']
+        if decision != 'RAG':
+            return [decision, NO_VERSION]
+        version = get_collection_version(RAG_COLLECTION)
+        project_id = state.get('project_id')
+        if not project_id:
+            return ['RAG', version]
+        return [f"RAG:{project_id}", f"{version}:{get_collection_version(project_collection_name(project_id))}"]
+
+    def semantic_cache(self, state: AgentState):
+        if not self._cacheable(state):
+            return {'cache_hit': False}
+        
+        decision = state['router_decision']
+        try:
+            embedding = state.get('query_embedding')
+            if embedding is None:
+                embedding = self._embed_query(state['query'])
+            scope = self._cache_scope(state)
+            answer = self.answer_cache.lookup(embedding, *scope)
+        except Exception as e:
+            print(f"⚠️ [SEMANTIC CACHE] Tra cứu lỗi: {e}")
+            return {'cache_hit': False}
+        
+        if answer is None:
+            return {'cache_hit': False, 'query_embedding': embedding, 'cache_scope': scope}
+        print(f"  ⚡ Semantic cache hit ({decision})")
+        return {'cache_hit': True, 'messages': [AIMessage(content=answer)]}
+
+    def _store_answer(self, state: AgentState, response):
+        """Lưu câu trả lời vào semantic cache (chỉ khi đã tra cache và miss)."""
+        embedding = state.get('query_embedding')
+        scope = state.get('cache_scope')
+        answer = _content_text(getattr(response, 'content', ''))
+        if not self._cacheable(state) or embedding is None or not scope or not answer:
+            return
+        try:
+            self.answer_cache.add(state['query'], answer, embedding, *scope)
+        except Exception as e:
+            print(f"⚠️ [SEMANTIC CACHE] Lưu lỗi: {e}")
 
     def tool_generator(self, state: AgentState):
         messages = state.get('messages', [])
         query = state['query']
-        tool_prompt = f"PM Assistant - User ID: {self.current_user_id}. Trả lời tiếng Việt."
+        tool_prompt = f"PM Assistant - User ID: {state.get('current_user_id')}. Trả lời tiếng Việt."
+        if state.get('conversation_summary'):
+            tool_prompt += f"\n\nTóm tắt hội thoại trước đó:\n{state['conversation_summary']}"
         
-        msgs = [SystemMessage(content=tool_prompt), HumanMessage(content=query)] + messages
+        msgs = [SystemMessage(content=tool_prompt)] + list(state.get('history') or []) + [HumanMessage(content=query)] + messages
         response = self.llm_tool_call.invoke(msgs)
         return {'messages': [response]}
 
-    def take_action(self, state: AgentState):
+    def take_action(self, state: AgentState, config: RunnableConfig):
         last_message = state['messages'][-1]
         tool_messages = []
         if hasattr(last_message, 'tool_calls'):
@@ -189,19 +404,41 @@ TOOL_CALL - Thao tác dữ liệu (Task của tôi, tạo task, search)"""
                 tool_args = tool_call['args']
                 
                 # Scope Enforcement
-                if tool_name == 'get_user_tasks': tool_args['user_id'] = self.current_user_id
-                if tool_name == 'create_task': tool_args['author_user_id'] = self.current_user_id
+                if tool_name == 'get_user_tasks': tool_args['user_id'] = state.get('current_user_id')
+                if tool_name == 'search': tool_args['user_id'] = state.get('current_user_id')
+                if tool_name == 'create_task': tool_args['author_user_id'] = state.get('current_user_id')
+                if tool_name == 'update_task_status': tool_args['user_id'] = state.get('current_user_id')
                 
                 if tool_name in self.tools:
-                    res = self.tools[tool_name].invoke(tool_args)
+                    res = self.tools[tool_name].invoke(tool_args, config=config)
                     tool_messages.append(ToolMessage(content=json.dumps(res, default=str), tool_call_id=tool_call['id']))
         return {'messages': tool_messages}
 
+    def _retrieval_targets(self, state: AgentState) -> list:
+        """(collection, top_k): tài liệu chung + knowledge (họp, task) của project đang chat."""
+        targets = [(RAG_COLLECTION, 3)]
+        if state.get('project_id'):
+            targets.append((project_collection_name(state['project_id']), PM_KNOWLEDGE_TOP_K))
+        return targets
+
     def retriever(self, state: AgentState):
         query = state['query']
         try:
-            docs = retrieve(query=query, collection_name='ProjectDocuments', use_reranker=True, top_k=3)
-            formatted = format_retrieved_documents(docs)
+            results = [retrieve(query=query, collection_name=name, use_reranker=True, top_k=top_k)
+                       for name, top_k in self._retrieval_targets(state)]
+            formatted = format_retrieved_documents(merge_results(*results))
+        except:
+            formatted = []
+        return {'retrieved_documents': formatted}
+
+    async def aretriever(self, state: AgentState):
+        query = state['query']
+        try:
+            results = await asyncio.gather(*[
+                aretrieve(query=query, collection_name=name, use_reranker=True, top_k=top_k)
+                for name, top_k in self._retrieval_targets(state)
+            ])
+            formatted = format_retrieved_documents(merge_results(*results))
         except:
             formatted = []
         return {'retrieved_documents': formatted}
@@ -217,16 +454,35 @@ TOOL_CALL - Thao tác dữ liệu (Task của tôi, tạo task, search)"""
         docs = state['retrieved_documents']
         query = state['query']
         prompt = f"Trả lời câu hỏi dựa trên tài liệu sau:\n{docs}\nCâu hỏi: {query}"
-        response = self.llm_rag.invoke([HumanMessage(content=prompt)])
+        response = self.llm_rag.invoke(self._context_messages(state) + [HumanMessage(content=prompt)])
+        # Không cache câu trả lời khi không tìm được tài liệu (retrieval lỗi hoặc collection trống)
+        if docs and docs != NO_DOCUMENTS_FOUND:
+            self._store_answer(state, response)
         return {'messages': [response]}
 
     def direct_generator(self, state: AgentState):
-        response = self.llm_direct.invoke([HumanMessage(content=state['query'])])
+        response = self.llm_direct.invoke(self._context_messages(state) + [HumanMessage(content=state['query'])])
+        self._store_answer(state, response)
         return {"messages": [response]}
 
     # --- CONDITIONAL ---
-    def _intent_classify(self, state): return state['router_decision']
+    def _intent_classify(self, state): return 'CACHED' if state.get('cache_hit') else state['router_decision']
     def _exist_rewrite(self, state): return False # Tạm tắt loop rewrite để test ổn định trước
     def _exist_tool(self, state):
         last = state.get('messages', [])[-1]
-        return bool(getattr(last, 'tool_calls', None))
\ No newline at end of file
+        return bool(getattr(last, 'tool_calls', None))
+
+
+# --- SINGLETON ---
+_agent_instance: Optional[ProjectManagerAgent] = None
+_agent_lock = threading.Lock()
+
+
+def get_project_manager_agent() -> ProjectManagerAgent:
+    """ProjectManagerAgent dùng chung trong process (khởi tạo LLM clients và compile graph một lần)."""
+    global _agent_instance
+    if _agent_instance is None:
+        with _agent_lock:
+            if _agent_instance is None:
+                _agent_instance = ProjectManagerAgent()
+    return _agent_instance
@@ -1,68 +1,13 @@
 """
 API Tools - Live Data Access and Modifications
-Gọi trực tiếp Backend API để truy vấn và thao tác dữ liệu
+Truy vấn và thao tác dữ liệu qua tool backend (in-process trong server, HTTP khi agent chạy tách rời)
 """
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-import os
-import requests
 from langchain_core.tools import tool
 from pydantic import BaseModel, Field
-from dotenv import load_dotenv
 
-load_dotenv()
-
-# Backend API base URL
-API_BASE_URL = os.environ.get('API_BASE_URL', 'http://localhost:3000')
-
-# --- HELPER FUNCTIONS (CORE) ---
-def _api_get(endpoint: str, params: Dict = None) -> Dict[str, Any]:
-    """Helper để gọi GET API"""
-    try:
-        response = requests.get(
-            f"{API_BASE_URL}{endpoint}",
-            params=params,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": f"API error ({response.status_code}): {response.text}"}
-    except requests.RequestException as e:
-        return {"success": False, "error": f"Network error: {e}"}
-
-def _api_post(endpoint: str, data: Dict) -> Dict[str, Any]:
-    """Helper để gọi POST API"""
-    try:
-        response = requests.post(
-            f"{API_BASE_URL}{endpoint}",
-            json=data,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        if response.status_code == 201:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": f"API error ({response.status_code}): {response.text}"}
-    except requests.RequestException as e:
-        return {"success": False, "error": f"Network error: {e}"}
-
-def _api_patch(endpoint: str, data: Dict) -> Dict[str, Any]:
-    """Helper để gọi PATCH API"""
-    try:
-        response = requests.patch(
-            f"{API_BASE_URL}{endpoint}",
-            json=data,
-            headers={"Content-Type": "application/json"},
-            timeout=30
-        )
-        if response.status_code == 200:
-            return {"success": True, "data": response.json()}
-        else:
-            return {"success": False, "error": f"API error ({response.status_code}): {response.text}"}
-    except requests.RequestException as e:
-        return {"success": False, "error": f"Network error: {e}"}
+from ..tool_backend import get_tool_backend
 
 def _summarize_tasks(tasks: List[Dict]) -> Dict[str, Any]:
     """Tạo summary thống kê từ list tasks"""
@@ -80,19 +25,19 @@ def _summarize_tasks(tasks: List[Dict]) -> Dict[str, Any]:
 # --- SMART LOOKUP HELPERS (NEW) ---
 # Hàm này giúp tìm ID từ tên, giúp user không cần nhớ ID
 
-def _resolve_project_id(name_or_id: str) -> Optional[str]:
+def _resolve_project_id(name_or_id: str, user_id: Optional[str] = None) -> Optional[str]:
     """Tìm Project ID từ tên hoặc trả về chính nó nếu là ID hợp lệ."""
     if not name_or_id: return None
     
-    # Nếu trông giống UUID hoặc ID số, trả về luôn (giả định)
-    if len(name_or_id) > 20 and "-" in name_or_id: 
-        return name_or_id
-        
-    # Gọi API lấy danh sách project để tìm
-    result = _api_get("/projects") # Giả định endpoint list projects
+    # Chỉ tìm trong các project mà user là thành viên
+    result = get_tool_backend().list_projects(user_id)
     if not result["success"]: return None
     
     projects = result["data"]
+    # 0. Đúng ID của một project user tham gia
+    for p in projects:
+        if p.get("id") == name_or_id:
+            return name_or_id
     # 1. Tìm chính xác (Case insensitive)
     for p in projects:
         if p.get("name", "").lower() == name_or_id.lower():
@@ -112,7 +57,7 @@ def _resolve_user_id(name_email_or_id: str) -> Optional[str]:
     if len(name_email_or_id) > 20 and "-" in name_email_or_id:
         return name_email_or_id
         
-    result = _api_get("/users") # Giả định endpoint list users
+    result = get_tool_backend().list_users(name_email_or_id)
     if not result["success"]: return None
     
     users = result["data"]
@@ -128,7 +73,7 @@ def _resolve_user_id(name_email_or_id: str) -> Optional[str]:
     for u in users:
         if (search_key in u.get("email", "").lower() or 
             search_key in u.get("username", "").lower() or
-            search_key in u.get("full_name", "").lower()):
+            search_key in (u.get("name") or u.get("full_name") or "").lower()):
             return u.get("id")
             
     return None
@@ -157,13 +102,14 @@ class CreateTaskInput(BaseModel):
 class UpdateTaskStatusInput(BaseModel):
     task_id: str = Field(description="ID của task")
     status: str = Field(description="Trạng thái mới")
+    user_id: Optional[str] = Field(default=None, description="Hệ thống tự điền ID người chat.")
 
 # --- TOOLS ---
 
 @tool
-def search(query: str) -> Dict[str, Any]:
+def search(query: str, user_id: Optional[str] = None) -> Dict[str, Any]:
     """Tìm kiếm tasks, projects, users."""
-    result = _api_get("/search", params={"query": query})
+    result = get_tool_backend().search(query, user_id)
     if not result["success"]: 
         # Fallback nếu endpoint search lỗi: tự tìm thủ công
         return {"success": False, "error": "Search unavailable"}
@@ -184,7 +130,7 @@ def get_user_tasks(user_id: Optional[str] = None) -> Dict[str, Any]:
     if target_id is None:
         return {"success": False, "error": "Missing user_id (Agent should have injected this)."}
 
-    result = _api_get(f"/tasks/user/{target_id}")
+    result = get_tool_backend().get_user_tasks(target_id)
     if not result["success"]: return result
     
     tasks = result["data"]
@@ -218,7 +164,7 @@ def create_task(
     final_project_id = project_id
     if not final_project_id and project_name:
         print(f"🔍 Đang tìm project theo tên: {project_name}")
-        final_project_id = _resolve_project_id(project_name)
+        final_project_id = _resolve_project_id(project_name, author_user_id)
         if not final_project_id:
             return {"success": False, "error": f"Không tìm thấy project nào có tên '{project_name}'. Vui lòng kiểm tra lại."}
     
@@ -233,22 +179,13 @@ def create_task(
         if not final_assignee_id:
             return {"success": False, "error": f"Không tìm thấy user nào có tên/email '{assignee_name}'."}
 
-    # 3. Tạo Payload
+    # 3. Tạo task
     today = datetime.now().strftime("%Y-%m-%d")
-    payload = {
-        "title": title,
-        "projectId": final_project_id,
-        "authorUserId": author_user_id,
-        "startDate": today,
-    }
-    
-    if description: payload["description"] = description
-    if priority: payload["priority"] = priority
-    if status: payload["status"] = status
-    if due_date: payload["dueDate"] = due_date
-    if final_assignee_id: payload["assignedUserId"] = final_assignee_id
-    
-    result = _api_post("/tasks", payload)
+    result = get_tool_backend().create_task(
+        title, final_project_id, author_user_id,
+        description=description or None, priority=priority or None, status=status or None,
+        due_date=due_date or None, assignee_id=final_assignee_id, start_date=today
+    )
     
     if result["success"]:
         task = result["data"]
@@ -261,13 +198,15 @@ def create_task(
     return result
 
 @tool(args_schema=UpdateTaskStatusInput)
-def update_task_status(task_id: str, status: str) -> Dict[str, Any]:
+def update_task_status(task_id: str, status: str, user_id: Optional[str] = None) -> Dict[str, Any]:
     """Cập nhật trạng thái task."""
+    if user_id is None:
+        return {"success": False, "error": "Missing user_id (Agent should have injected this)."}
     valid_statuses = ["To Do", "In Progress", "Done"]
     if status not in valid_statuses:
         return {"success": False, "error": f"Invalid status '{status}'"}
     
-    result = _api_patch(f"/tasks/{task_id}/status", {"status": status})
+    result = get_tool_backend().update_task_status(task_id, status, user_id)
     if result["success"]:
         return {"success": True, "message": f"Task #{task_id} updated to '{status}'", "task": result["data"]}
     return result
@@ -0,0 +1,235 @@
+"""
+Phân loại intent cục bộ cho router của ProjectManagerAgent (không gọi LLM):
+    1. Keyword rules (chào hỏi, thao tác task, tra cứu quy trình...)
+    2. Nearest-centroid trên embedding, học từ các quyết định của LLM router đã được log
+Không đủ tự tin -> trả None để agent dùng LLM router.
+"""
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ...shared import AI_CACHE_DIR
+
+INTENTS = ('DIRECT', 'RAG', 'TOOL_CALL')
+
+# Cấu hình (có thể đổi qua biến môi trường)
+PM_INTENT_MIN_SIMILARITY = float(os.environ.get('PM_INTENT_MIN_SIMILARITY', '0.75'))  # cosine tối thiểu tới centroid gần nhất
+PM_INTENT_MIN_MARGIN = float(os.environ.get('PM_INTENT_MIN_MARGIN', '0.05'))          # chênh lệch tối thiểu với centroid thứ hai
+PM_INTENT_MIN_SAMPLES = int(os.environ.get('PM_INTENT_MIN_SAMPLES', '20'))            # số mẫu tối thiểu mỗi intent để dùng centroid
+PM_INTENT_RETRAIN_EVERY = int(os.environ.get('PM_INTENT_RETRAIN_EVERY', '20'))        # tính lại centroid sau N mẫu mới
+PM_INTENT_LOG_MAX = int(os.environ.get('PM_INTENT_LOG_MAX', '5000'))
+PM_INTENT_SHADOW_RATE = float(os.environ.get('PM_INTENT_SHADOW_RATE', '0.05'))       # tỉ lệ quyết định cục bộ được LLM kiểm tra lại
+
+# Chào hỏi / xã giao: cả tin nhắn phải chỉ gồm các câu xã giao (kèm từ đệm, dấu câu)
+# -> "chào, tạo giúp tôi task X" / "ok tạo task review API" không phải DIRECT
+_SMALL_TALK_PHRASE = (
+    r"(xin chào|chào|chao|hello|hi|hey|alo|cảm ơn|cám ơn|thanks|thank you|tạm biệt|bye|ok|oke|okay|"
+    r"bạn là ai|bạn tên gì|bạn làm được gì|good (morning|afternoon|evening))"
+    r"(\s+(bạn|nhé|nha|nhá|ạ|em|anh|chị|bot|nhiều|lắm|you|all|there))*"
+)
+_SMALL_TALK = re.compile(
+    rf"^\s*{_SMALL_TALK_PHRASE}([\s,.!?~]+{_SMALL_TALK_PHRASE})*[\s.!?~]*$",
+    re.IGNORECASE,
+)
+_SMALL_TALK_MAX_WORDS = 6
+
+_KEYWORD_RULES = {
+    'TOOL_CALL': re.compile(
+        r"\b(task|công việc|việc) (của tôi|của mình|của em)|\b(tạo|thêm|giao|cập nhật|đổi|chuyển) (task|công việc)|"
+        r"trạng thái (task|công việc)|\bmy tasks?\b|\bcreate (a )?task\b|\bdeadline của (tôi|mình)\b",
+        re.IGNORECASE,
+    ),
+    'RAG': re.compile(
+        r"\b(quy trình|quy định|chính sách|hướng dẫn|tài liệu|nội quy|policy|process|guideline)\b|"
+        r"\b(cuộc họp|biên bản|buổi họp)\b|đã (quyết định|thống nhất|chốt|bàn)",
+        re.IGNORECASE,
+    ),
+}
+
+
+@dataclass
+class IntentResult:
+    decision: Optional[str]          # None = không đủ tự tin
+    source: str                      # 'rule' | 'centroid' | 'none'
+    confidence: float = 0.0
+    embedding: Optional[np.ndarray] = None
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class IntentLog:
+    """Log (query, quyết định của LLM router, embedding) trong SQLite - dữ liệu huấn luyện centroid."""
+
+    def __init__(self, path: str, max_rows: int = PM_INTENT_LOG_MAX):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS intent_log ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT NOT NULL, decision TEXT NOT NULL,"
+                " embedding BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def add(self, query: str, decision: str, embedding: np.ndarray):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO intent_log (query, decision, embedding, created_at) VALUES (?, ?, ?, ?)",
+                (query, decision, sqlite3.Binary(embedding.astype(np.float32).tobytes()), time.time())
+            )
+            conn.execute(
+                "DELETE FROM intent_log WHERE id <= (SELECT MAX(id) FROM intent_log) - ?", (self.max_rows,)
+            )
+            conn.commit()
+
+    def load(self) -> Dict[str, List[np.ndarray]]:
+        with self._lock:
+            rows = self._connect().execute("SELECT decision, embedding FROM intent_log").fetchall()
+        samples: Dict[str, List[np.ndarray]] = {}
+        for decision, blob in rows:
+            samples.setdefault(decision, []).append(np.frombuffer(blob, dtype=np.float32))
+        return samples
+
+
+class LocalIntentClassifier:
+    """
+    Router cục bộ: keyword rules -> nearest centroid -> None (dùng LLM).
+
+    Mọi quyết định của LLM router được log lại làm dữ liệu huấn luyện; một phần nhỏ quyết định cục bộ
+    được LLM chạy lại ở chế độ nền (shadow) để đo tỉ lệ đồng thuận.
+    """
+
+    def __init__(self, embed: Optional[Callable[[str], List[float]]] = None, log: Optional[IntentLog] = None):
+        self.embed = embed
+        self.log = log or IntentLog(os.path.join(AI_CACHE_DIR, 'intent_log.sqlite'))
+
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+        self._new_samples = 0
+        self._lock = threading.Lock()
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='intent-shadow')
+        self._stats = {'rule': 0, 'centroid': 0, 'llm': 0, 'shadow_checked': 0, 'shadow_agreed': 0}
+
+    # ==================== TRAINING ====================
+
+    def _train(self):
+        """Tính centroid (trung bình embedding đã chuẩn hoá) cho các intent có đủ mẫu."""
+        samples = self.log.load()
+        centroids = {
+            intent: _normalize(np.mean([_normalize(v) for v in vectors], axis=0))
+            for intent, vectors in samples.items()
+            if intent in INTENTS and len(vectors) >= PM_INTENT_MIN_SAMPLES
+        }
+        with self._lock:
+            # Cần ít nhất 2 intent thì so sánh khoảng cách mới có nghĩa
+            self._centroids = centroids if len(centroids) >= 2 else {}
+            self._new_samples = 0
+
+    def _get_centroids(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            needs_training = self._centroids is None or self._new_samples >= PM_INTENT_RETRAIN_EVERY
+        if needs_training:
+            self._train()
+        return self._centroids
+
+    # ==================== CLASSIFY ====================
+
+    def _classify_rules(self, query: str) -> Optional[str]:
+        text = query.strip()
+        if _SMALL_TALK.match(text) and len(text.split()) <= _SMALL_TALK_MAX_WORDS:
+            return 'DIRECT'
+        matched = [intent for intent, pattern in _KEYWORD_RULES.items() if pattern.search(text)]
+        return matched[0] if len(matched) == 1 else None
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        if not self.embed:
+            return None
+        try:
+            return _normalize(self.embed(query))
+        except Exception as e:
+            print(f"⚠️ [INTENT] Embedding lỗi: {e}")
+            return None
+
+    def classify(self, query: str) -> IntentResult:
+        decision = self._classify_rules(query)
+        if decision:
+            self._count('rule')
+            return IntentResult(decision, 'rule', 1.0)
+
+        embedding = self._embed(query)
+        centroids = self._get_centroids() if embedding is not None else {}
+        if centroids:
+            scores = sorted(((float(embedding @ c), intent) for intent, c in centroids.items()), reverse=True)
+            (best, intent), (second, _) = scores[0], scores[1]
+            if best >= PM_INTENT_MIN_SIMILARITY and best - second >= PM_INTENT_MIN_MARGIN:
+                self._count('centroid')
+                return IntentResult(intent, 'centroid', best, embedding)
+
+        return IntentResult(None, 'none', 0.0, embedding)
+
+    # ==================== FEEDBACK ====================
+
+    def record_llm_decision(self, query: str, decision: str, embedding: Optional[np.ndarray] = None):
+        """Log quyết định của LLM router (dữ liệu huấn luyện centroid)."""
+        self._count('llm')
+        if decision not in INTENTS:
+            return
+        if embedding is None:
+            embedding = self._embed(query)
+        if embedding is None:
+            return
+        self.log.add(query, decision, embedding)
+        with self._lock:
+            self._new_samples += 1
+
+    def maybe_shadow(self, query: str, local_decision: str, llm_route: Callable[[], str]):
+        """Với xác suất PM_INTENT_SHADOW_RATE, chạy LLM router ở nền và so sánh với quyết định cục bộ."""
+        if random.random() >= PM_INTENT_SHADOW_RATE:
+            return
+
+        def check():
+            try:
+                agreed = llm_route() == local_decision
+            except Exception:
+                return
+            with self._lock:
+                self._stats['shadow_checked'] += 1
+                self._stats['shadow_agreed'] += int(agreed)
+
+        self._shadow_executor.submit(check)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['centroid_intents'] = sorted(self._centroids) if self._centroids else []
+        total = stats['rule'] + stats['centroid'] + stats['llm']
+        stats['local_rate'] = round((stats['rule'] + stats['centroid']) / total, 4) if total else 0.0
+        stats['agreement_rate'] = (
+            round(stats['shadow_agreed'] / stats['shadow_checked'], 4) if stats['shadow_checked'] else None
+        )
+        return stats
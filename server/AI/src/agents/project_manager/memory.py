@@ -0,0 +1,139 @@
+"""
+Conversation memory cho ProjectManagerAgent: lịch sử theo thread với ngân sách token,
+tóm tắt cuốn chiếu các lượt cũ và giải phóng thread không hoạt động
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, List, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+# Cấu hình (có thể đổi qua biến môi trường)
+PM_MEMORY_TOKEN_BUDGET = int(os.environ.get('PM_MEMORY_TOKEN_BUDGET', '2000'))   # token tối đa của các lượt giữ nguyên văn
+PM_MEMORY_IDLE_TTL = float(os.environ.get('PM_MEMORY_IDLE_TTL', '3600'))         # giây không hoạt động thì xóa thread
+PM_MEMORY_MAX_THREADS = int(os.environ.get('PM_MEMORY_MAX_THREADS', '1000'))
+PM_MEMORY_MAX_SUMMARY_CHARS = 2000
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token (~4 ký tự/token), đủ dùng cho việc giới hạn ngân sách."""
+    return max(1, len(text or '') // 4)
+
+
+@dataclass
+class ThreadMemory:
+    summary: str = ''
+    turns: List[Tuple[str, str]] = field(default_factory=list)  # [(user, assistant)]
+    tokens: int = 0
+    last_used: float = field(default_factory=time.time)
+    compacting: bool = False
+
+
+class ConversationMemory:
+    """
+    Lưu hội thoại theo thread (trong RAM của process).
+
+    - Các lượt gần nhất được giữ nguyên văn trong giới hạn `token_budget`.
+    - Khi vượt ngân sách, các lượt cũ nhất được gộp vào bản tóm tắt bằng `summarize(summary, turns)`
+      (chạy nền, không làm chậm câu trả lời hiện tại).
+    - Thread không hoạt động quá `idle_ttl` giây hoặc vượt `max_threads` (LRU) bị xóa.
+    """
+
+    def __init__(self, summarize: Callable[[str, List[Tuple[str, str]]], str],
+                 token_budget: int = PM_MEMORY_TOKEN_BUDGET, idle_ttl: float = PM_MEMORY_IDLE_TTL,
+                 max_threads: int = PM_MEMORY_MAX_THREADS):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.idle_ttl = idle_ttl
+        self.max_threads = max_threads
+
+        self._threads: "OrderedDict[str, ThreadMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pm-memory')
+
+    def _evict_locked(self):
+        cutoff = time.time() - self.idle_ttl
+        while self._threads:
+            key, memory = next(iter(self._threads.items()))
+            if memory.last_used >= cutoff and len(self._threads) <= self.max_threads:
+                break
+            self._threads.pop(key)
+
+    def get(self, key: str) -> Tuple[str, List[AnyMessage]]:
+        """(tóm tắt, các lượt gần đây dạng messages) của thread."""
+        with self._lock:
+            self._evict_locked()
+            memory = self._threads.get(key)
+            if memory is None:
+                return '', []
+            self._threads.move_to_end(key)
+            memory.last_used = time.time()
+            messages = []
+            for user_text, assistant_text in memory.turns:
+                messages.append(HumanMessage(content=user_text))
+                messages.append(AIMessage(content=assistant_text))
+            return memory.summary, messages
+
+    def add_turn(self, key: str, user_text: str, assistant_text: str):
+        """Ghi một lượt hỏi-đáp; lên lịch tóm tắt nếu vượt ngân sách token."""
+        with self._lock:
+            memory = self._threads.get(key)
+            if memory is None:
+                memory = self._threads[key] = ThreadMemory()
+            self._threads.move_to_end(key)
+            memory.turns.append((user_text, assistant_text))
+            memory.tokens += estimate_tokens(user_text) + estimate_tokens(assistant_text)
+            memory.last_used = time.time()
+
+            if memory.tokens > self.token_budget and not memory.compacting:
+                memory.compacting = True
+                self._executor.submit(self._compact, key, memory)
+            self._evict_locked()
+
+    def clear(self, key: str):
+        with self._lock:
+            self._threads.pop(key, None)
+
+    def _compact(self, key: str, memory: ThreadMemory):
+        """Gộp các lượt cũ nhất vào bản tóm tắt đến khi còn khoảng nửa ngân sách."""
+        try:
+            with self._lock:
+                target = self.token_budget // 2
+                tokens = memory.tokens
+                count = 0
+                # Luôn giữ lượt mới nhất nguyên văn
+                while count < len(memory.turns) - 1 and tokens > target:
+                    user_text, assistant_text = memory.turns[count]
+                    tokens -= estimate_tokens(user_text) + estimate_tokens(assistant_text)
+                    count += 1
+                old_turns = memory.turns[:count]
+                summary = memory.summary
+
+            if not old_turns:
+                return
+
+            # Gọi LLM ngoài lock; lượt mới chỉ được append vào cuối nên cắt đầu danh sách vẫn đúng
+            try:
+                new_summary = self.summarize(summary, old_turns)[:PM_MEMORY_MAX_SUMMARY_CHARS]
+            except Exception as e:
+                # Tóm tắt lỗi: vẫn bỏ các lượt cũ để lịch sử không tăng vô hạn
+                print(f"⚠️ [PM MEMORY] Tóm tắt thread {key} lỗi: {e}")
+                new_summary = summary
+
+            with self._lock:
+                memory.summary = new_summary
+                del memory.turns[:len(old_turns)]
+                memory.tokens = sum(estimate_tokens(u) + estimate_tokens(a) for u, a in memory.turns)
+        finally:
+            memory.compacting = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "tokens": sum(m.tokens for m in self._threads.values()),
+            }
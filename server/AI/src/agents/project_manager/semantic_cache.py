@@ -0,0 +1,140 @@
+"""
+Semantic answer cache cho ProjectManagerAgent: câu hỏi gần trùng (cosine >= ngưỡng) với câu đã trả lời
+thì trả lại câu trả lời cũ, không gọi LLM hay vector DB.
+
+Mỗi entry gắn với version của collection lúc sinh câu trả lời (RAG); khi collection thay đổi
+(bump_collection_version) các entry cũ tự mất hiệu lực.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from ...shared import AI_CACHE_DIR
+
+# Cấu hình (có thể đổi qua biến môi trường)
+PM_SEMANTIC_CACHE_ENABLED = os.environ.get('PM_SEMANTIC_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+PM_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('PM_SEMANTIC_CACHE_THRESHOLD', '0.95'))
+PM_SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get('PM_SEMANTIC_CACHE_MAX_ENTRIES', '2000'))
+PM_SEMANTIC_CACHE_TTL = float(os.environ.get('PM_SEMANTIC_CACHE_TTL', str(7 * 24 * 3600)))  # giây
+
+# Entry không phụ thuộc collection (DIRECT)
+NO_VERSION = '-'
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    Lưu (intent, version, query, answer, embedding) trong SQLite; tra cứu bằng ma trận embedding
+    đã chuẩn hoá trong RAM (nạp lại khi bảng thay đổi, kể cả do process khác ghi).
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = PM_SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = PM_SEMANTIC_CACHE_MAX_ENTRIES, ttl_seconds: float = PM_SEMANTIC_CACHE_TTL):
+        self.path = path or os.path.join(AI_CACHE_DIR, 'semantic_answers.sqlite')
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._conn = None
+        self._lock = threading.Lock()
+        # (intent, version) -> (ids, answers, matrix)
+        self._index: Dict[Tuple[str, str], Tuple[list, list, np.ndarray]] = {}
+        self._stamp = None
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, intent TEXT NOT NULL, version TEXT NOT NULL,"
+                " query TEXT NOT NULL, answer TEXT NOT NULL, embedding BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_answers_intent_version ON answers (intent, version)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _refresh_locked(self):
+        """Xóa index trong RAM nếu bảng đã thay đổi (so MAX(id), COUNT(*))."""
+        stamp = self._connect().execute("SELECT MAX(id), COUNT(*) FROM answers").fetchone()
+        if stamp != self._stamp:
+            self._index.clear()
+            self._stamp = stamp
+
+    def _load_locked(self, intent: str, version: str) -> Tuple[list, list, np.ndarray]:
+        key = (intent, version)
+        if key not in self._index:
+            rows = self._connect().execute(
+                "SELECT id, answer, embedding FROM answers WHERE intent = ? AND version = ? AND created_at >= ?",
+                (intent, version, time.time() - self.ttl_seconds)
+            ).fetchall()
+            ids = [row[0] for row in rows]
+            answers = [row[1] for row in rows]
+            matrix = (np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+                      if rows else np.empty((0, 0), dtype=np.float32))
+            self._index[key] = (ids, answers, matrix)
+        return self._index[key]
+
+    def lookup(self, embedding, intent: str, version: str = NO_VERSION) -> Optional[str]:
+        """Câu trả lời của câu hỏi gần nhất nếu cosine >= threshold, ngược lại None."""
+        query = _normalize(embedding)
+        with self._lock:
+            self._refresh_locked()
+            _, answers, matrix = self._load_locked(intent, version)
+            answer = None
+            if len(answers) and matrix.shape[1] == query.shape[0]:
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    answer = answers[best]
+            self._stats['hits' if answer is not None else 'misses'] += 1
+        return answer
+
+    def add(self, query: str, answer: str, embedding, intent: str, version: str = NO_VERSION):
+        vector = _normalize(embedding)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO answers (intent, version, query, answer, embedding, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (intent, version, query, answer, sqlite3.Binary(vector.tobytes()), time.time())
+            )
+            # Entry của version cũ không bao giờ được dùng lại
+            if version != NO_VERSION:
+                conn.execute("DELETE FROM answers WHERE intent = ? AND version != ?", (intent, version))
+            conn.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM answers WHERE id <= (SELECT MAX(id) FROM answers) - ?", (self.max_entries,)
+            )
+            conn.commit()
+            self._stats['stores'] += 1
+            self._index.clear()
+            self._stamp = None
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM answers")
+            conn.commit()
+            self._index.clear()
+            self._stamp = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = self._connect().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['threshold'] = self.threshold
+        return stats
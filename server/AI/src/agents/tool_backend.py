@@ -0,0 +1,280 @@
+"""
+Backend cho tools của các agent (project_manager/api_tools.py, meeting_to_task/tools.py),
+chọn qua biến môi trường AGENT_TOOL_BACKEND:
+    auto       - in-process nếu import được code server (agent chạy trong FastAPI / worker), ngược lại HTTP (mặc định)
+    inprocess  - gọi thẳng TaskService / ProjectService / UserRepository với DB session riêng cho mỗi lời gọi
+    http       - gọi Backend API qua API_BASE_URL (agent chạy ở process / máy khác)
+Mọi hàm trả {"success": True, "data": ...} hoặc {"success": False, "error": "..."}, data là dict/list JSON.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cấu hình (có thể đổi qua biến môi trường)
+AGENT_TOOL_BACKEND = os.environ.get('AGENT_TOOL_BACKEND', 'auto').lower()
+API_BASE_URL = os.environ.get('API_BASE_URL', 'http://localhost:3000')
+AGENT_TOOL_HTTP_TIMEOUT = float(os.environ.get('AGENT_TOOL_HTTP_TIMEOUT', '30'))
+AGENT_TOOL_SEARCH_LIMIT = int(os.environ.get('AGENT_TOOL_SEARCH_LIMIT', '20'))
+
+
+class ToolBackend:
+    """Interface các thao tác dữ liệu mà tools cần."""
+
+    name = 'base'
+
+    def search(self, query: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """data: {'tasks': [...], 'projects': [...], 'users': [...]}"""
+        raise NotImplementedError
+
+    def list_projects(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def list_users(self, query: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get_user_tasks(self, user_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def create_task(self, title: str, project_id: str, author_id: str, **fields) -> Dict[str, Any]:
+        """fields: description, status, priority, tags, due_date, assignee_id, start_date, points"""
+        raise NotImplementedError
+
+    def update_task_status(self, task_id: str, status: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+# ==================== HTTP ====================
+
+class HttpToolBackend(ToolBackend):
+    """Gọi Backend API; mỗi thread một requests.Session để tái sử dụng kết nối (keep-alive)."""
+
+    name = 'http'
+
+    def __init__(self, base_url: str = API_BASE_URL, timeout: float = AGENT_TOOL_HTTP_TIMEOUT):
+        self.base_url = base_url
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({"Content-Type": "application/json"})
+            self._local.session = session
+        return session
+
+    def _request(self, method: str, endpoint: str, expected_status: int = 200, **kwargs) -> Dict[str, Any]:
+        try:
+            response = self.session.request(method, f"{self.base_url}{endpoint}", timeout=self.timeout, **kwargs)
+            if response.status_code == expected_status:
+                return {"success": True, "data": response.json()}
+            else:
+                return {"success": False, "error": f"API error ({response.status_code}): {response.text}"}
+        except requests.RequestException as e:
+            return {"success": False, "error": f"Network error: {e}"}
+
+    def search(self, query, user_id=None):
+        return self._request("GET", "/search", params={"query": query})
+
+    def list_projects(self, user_id=None):
+        return self._request("GET", "/projects")
+
+    def list_users(self, query=None):
+        return self._request("GET", "/users")
+
+    def get_user_tasks(self, user_id):
+        return self._request("GET", f"/tasks/user/{user_id}")
+
+    def create_task(self, title, project_id, author_id, **fields):
+        payload = {
+            "title": title, "projectId": project_id, "authorUserId": author_id,
+            "description": fields.get("description"), "status": fields.get("status"),
+            "priority": fields.get("priority"), "tags": fields.get("tags"),
+            "startDate": fields.get("start_date"), "dueDate": fields.get("due_date"),
+            "points": fields.get("points"), "assignedUserId": fields.get("assignee_id"),
+        }
+        payload = {k: v for k, v in payload.items() if v is not None}
+        return self._request("POST", "/tasks", expected_status=201, json=payload)
+
+    def update_task_status(self, task_id, status, user_id=None):
+        return self._request("PATCH", f"/tasks/{task_id}/status", json={"status": status})
+
+
+# ==================== IN-PROCESS ====================
+
+class InProcessToolBackend(ToolBackend):
+    """
+    Gọi thẳng service / repository của server (không serialize HTTP, không TCP, không auth loopback).
+    Mỗi lời gọi dùng một DB session riêng từ SessionLocal (an toàn khi tools chạy song song).
+    """
+
+    name = 'inprocess'
+
+    def __init__(self):
+        from src.core.database import SessionLocal
+        self._session_factory = SessionLocal
+
+    @contextmanager
+    def _session(self):
+        db = self._session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _run(self, fn) -> Dict[str, Any]:
+        """Chạy fn(db) và chuyển lỗi của service (HTTPException, validate, DB...) thành kết quả lỗi như bản HTTP."""
+        from fastapi import HTTPException
+        from pydantic import ValidationError
+        from sqlalchemy.exc import SQLAlchemyError
+
+        with self._session() as db:
+            try:
+                return {"success": True, "data": fn(db)}
+            except HTTPException as e:
+                db.rollback()
+                return {"success": False, "error": f"API error ({e.status_code}): {e.detail}"}
+            except (ValidationError, ValueError) as e:
+                db.rollback()
+                return {"success": False, "error": f"API error (422): {e}"}
+            except SQLAlchemyError as e:
+                # Ví dụ vi phạm khóa ngoại (assignee_id không tồn tại)
+                db.rollback()
+                return {"success": False, "error": f"API error (400): {type(e).__name__}: {e.__cause__ or e}"}
+
+    @staticmethod
+    def _require_member(db, project_id: str, user_id: Optional[str]):
+        """Thao tác ghi chỉ được làm trong project mà user đang chat là thành viên."""
+        from fastapi import HTTPException
+        from src.repositories.project_repository import ProjectRepository
+
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Missing user_id")
+        project = ProjectRepository(db).get_by_id(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found.")
+        if user_id not in [m.id for m in project.members]:
+            raise HTTPException(status_code=403, detail="User is not a member of this project.")
+
+    @staticmethod
+    def _tasks(tasks) -> List[dict]:
+        from src.schemas import task as task_schemas
+        return [task_schemas.TaskOut.model_validate(task).model_dump(mode='json') for task in tasks]
+
+    @staticmethod
+    def _projects(projects) -> List[dict]:
+        # Không kèm members: tools chỉ cần id / tên
+        return [{"id": p.id, "name": p.name, "description": p.description} for p in projects]
+
+    @staticmethod
+    def _users(users) -> List[dict]:
+        return [{"id": u.id, "name": u.name, "username": u.username, "email": u.email} for u in users]
+
+    def search(self, query, user_id=None):
+        from src.repositories.project_repository import ProjectRepository
+        from src.repositories.user_repository import UserRepository
+        from src.services.task_service import TaskService
+
+        def fn(db):
+            keyword = query.lower()
+            projects = ProjectRepository(db).get_all_projects_where_user_is_member(user_id) if user_id else []
+            return {
+                "tasks": self._tasks(TaskService(db).search_tasks(query, user_id, AGENT_TOOL_SEARCH_LIMIT))
+                if user_id else [],
+                "projects": self._projects([p for p in projects if keyword in (p.name or '').lower()]),
+                "users": self._users(UserRepository(db).search_users(query, AGENT_TOOL_SEARCH_LIMIT)),
+            }
+        return self._run(fn)
+
+    def list_projects(self, user_id=None):
+        from src.services.project_service import ProjectService
+
+        # Giống GET /projects: chỉ các project user là thành viên
+        if not user_id:
+            return {"success": False, "error": "API error (401): Missing user_id"}
+        return self._run(lambda db: self._projects(ProjectService(db).get_projects_by_user(user_id)))
+
+    def list_users(self, query=None):
+        from src.repositories.user_repository import UserRepository
+
+        def fn(db):
+            repo = UserRepository(db)
+            return self._users(repo.search_users(query, AGENT_TOOL_SEARCH_LIMIT) if query else repo.get_all())
+        return self._run(fn)
+
+    def get_user_tasks(self, user_id):
+        from src.services.task_service import TaskService
+        return self._run(lambda db: self._tasks(TaskService(db).get_tasks_by_assignee(user_id)))
+
+    def create_task(self, title, project_id, author_id, **fields):
+        from src.schemas import task as task_schemas
+        from src.services.task_service import TaskService
+
+        tags = fields.get("tags")
+        if isinstance(tags, str):
+            tags = [tag.strip() for tag in tags.split(",") if tag.strip()]
+        # start_date / points: model Task chưa có cột tương ứng
+        data = {
+            "title": title, "project_id": project_id, "description": fields.get("description"),
+            "status": fields.get("status"), "priority": fields.get("priority"), "tags": tags,
+            "due_date": fields.get("due_date"), "assignee_id": fields.get("assignee_id"),
+        }
+
+        def fn(db):
+            task_data = task_schemas.TaskCreate(**{k: v for k, v in data.items() if v is not None})
+            self._require_member(db, task_data.project_id, author_id)
+            return self._tasks([TaskService(db).create_task(task_data, author_id=author_id)])[0]
+        return self._run(fn)
+
+    def update_task_status(self, task_id, status, user_id=None):
+        from fastapi import HTTPException
+        from src.services.task_service import TaskService
+
+        def fn(db):
+            service = TaskService(db)
+            task = service.repo.get_by_id(task_id)
+            if not task:
+                raise HTTPException(status_code=404, detail="Task not found or access denied.")
+            self._require_member(db, task.project_id, user_id)
+            task = service.update_task_status(task_id, status, user_id)
+            if not task:
+                raise HTTPException(status_code=404, detail="Task not found or access denied.")
+            return self._tasks([task])[0]
+        return self._run(fn)
+
+
+_backend: Optional[ToolBackend] = None
+_backend_lock = threading.Lock()
+
+
+def _create_backend() -> ToolBackend:
+    if AGENT_TOOL_BACKEND == 'http':
+        return HttpToolBackend()
+    if AGENT_TOOL_BACKEND == 'inprocess':
+        return InProcessToolBackend()
+    if AGENT_TOOL_BACKEND == 'auto':
+        try:
+            return InProcessToolBackend()
+        except (ImportError, ValueError) as e:
+            # Không có code server / DATABASE_URL: agent chạy tách khỏi server
+            print(f"⚠️ [TOOLS] Không dùng được backend in-process ({e}), gọi API qua {API_BASE_URL}")
+            return HttpToolBackend()
+    raise ValueError(f"Unsupported AGENT_TOOL_BACKEND: {AGENT_TOOL_BACKEND}")
+
+
+def get_tool_backend() -> ToolBackend:
+    """Tool backend dùng chung trong process (theo AGENT_TOOL_BACKEND)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+                print(f"🔧 [TOOLS] Agent tool backend: {_backend.name}")
+    return _backend
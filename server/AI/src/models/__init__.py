@@ -1,3 +1,7 @@
 from .models import call_llm, embedding_model
+from .llm_cache import get_llm_cache, llm_cache_stats
+from .embeddings import get_embedding_service, embedding_stats
+from .whisper_pool import get_whisper_pool
+from .parallel_stt import transcribe_segments
 
-__all__ = ['call_llm', 'embedding_model']
\ No newline at end of file
+__all__ = ['call_llm', 'embedding_model', 'get_llm_cache', 'llm_cache_stats', 'get_embedding_service', 'embedding_stats', 'get_whisper_pool', 'transcribe_segments']
\ No newline at end of file
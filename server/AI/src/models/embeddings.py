@@ -0,0 +1,239 @@
+"""
+Embedding service dùng chung trong process:
+    - Cache vector trên disk theo (model, loại, sha256 nội dung) -> một đoạn text không bao giờ bị embed hai lần
+    - Micro-batching: các lời gọi embed() đồng thời trong cửa sổ EMBEDDING_BATCH_WINDOW_MS được gộp thành một request
+    - embed_many(): tra cache một lượt, phần còn thiếu chia batch và gửi song song (giới hạn EMBEDDING_CONCURRENCY)
+"""
+import asyncio
+import inspect
+import os
+import threading
+import time
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from ..shared import sha256_text, SqliteCache, AI_CACHE_DIR
+
+# Cấu hình (có thể đổi qua biến môi trường)
+EMBEDDING_PROVIDER = os.environ.get('EMBEDDING_PROVIDER', 'gemini')
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get('EMBEDDING_BATCH_WINDOW_MS', '10'))
+EMBEDDING_MAX_BATCH = int(os.environ.get('EMBEDDING_MAX_BATCH', '100'))          # số text tối đa mỗi request
+EMBEDDING_CONCURRENCY = int(os.environ.get('EMBEDDING_CONCURRENCY', '4'))        # số request song song
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get('EMBEDDING_CACHE_MAX_ENTRIES', '200000'))
+EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get('EMBEDDING_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# Loại embedding: một số provider (Gemini) dùng task_type khác nhau cho câu hỏi và tài liệu
+KIND_QUERY = 'query'
+KIND_DOCUMENT = 'document'
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array('f', vector).tobytes()
+
+
+def _unpack(raw: bytes) -> List[float]:
+    vector = array('f')
+    vector.frombytes(raw)
+    return vector.tolist()
+
+
+class EmbeddingService:
+    """Bọc một LangChain Embeddings (embedding_model()) với cache + micro-batching."""
+
+    def __init__(self, embeddings: Optional[Embeddings] = None, provider: str = EMBEDDING_PROVIDER,
+                 cache: Optional[SqliteCache] = None, batch_window_ms: float = EMBEDDING_BATCH_WINDOW_MS,
+                 max_batch: int = EMBEDDING_MAX_BATCH, concurrency: int = EMBEDDING_CONCURRENCY):
+        self.provider = provider
+        self._embeddings = embeddings
+        self.cache = cache or SqliteCache(
+            os.path.join(AI_CACHE_DIR, 'embeddings.sqlite'),
+            max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+            max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+            name='embeddings',
+        )
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max(1, max_batch)
+
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='embedding')
+        self._pending: List[tuple] = []  # (kind, text, key, Future)
+        self._inflight: Dict[str, Future] = {}  # key -> Future: text đang được embed thì không gửi lại
+        self._cond = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+        self._stats = {'requests': 0, 'texts_embedded': 0}
+
+    # ==================== PROVIDER ====================
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            from .models import embedding_model
+            self._embeddings = embedding_model(self.provider)
+        return self._embeddings
+
+    @property
+    def model_name(self) -> str:
+        return str(getattr(self.embeddings, 'model', None) or self.provider)
+
+    def _key(self, kind: str, text: str) -> str:
+        return sha256_text(f"{self.model_name}\x00{kind}\x00{text}")
+
+    def _call_provider(self, kind: str, texts: List[str]) -> List[List[float]]:
+        """Một request tới provider cho cả batch."""
+        embed_documents = self.embeddings.embed_documents
+        with self._cond:
+            self._stats['requests'] += 1
+            self._stats['texts_embedded'] += len(texts)
+        if kind == KIND_QUERY:
+            if 'task_type' in inspect.signature(embed_documents).parameters:
+                # Gemini: embed_query dùng task_type RETRIEVAL_QUERY, giữ nguyên khi gộp batch
+                return embed_documents(texts, task_type='RETRIEVAL_QUERY')
+            if len(texts) == 1:
+                return [self.embeddings.embed_query(texts[0])]
+        return embed_documents(texts)
+
+    # ==================== MICRO-BATCHING ====================
+
+    def _submit(self, kind: str, text: str, key: str) -> Future:
+        with self._cond:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self._inflight[key] = future
+            self._pending.append((kind, text, key, future))
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name='embedding-batcher', daemon=True)
+                self._flusher.start()
+            self._cond.notify()
+            return future
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Chờ hết cửa sổ batching (hoặc đủ max_batch) để gom thêm request
+                deadline = time.monotonic() + self.batch_window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+
+            by_kind: Dict[str, list] = {}
+            for item in batch:
+                by_kind.setdefault(item[0], []).append(item)
+            for kind, items in by_kind.items():
+                self._executor.submit(self._run_batch, kind, items)
+
+    def _run_batch(self, kind: str, items: List[tuple]):
+        """Embed một batch; mọi future của batch luôn được resolve (kết quả hoặc exception)."""
+        vectors, error = None, None
+        try:
+            vectors = self._call_provider(kind, [text for _, text, _, _ in items])
+            if vectors is None or len(vectors) != len(items):
+                raise ValueError(f"Embedding provider returned {0 if vectors is None else len(vectors)} "
+                                 f"vectors for {len(items)} texts")
+            self.cache.set_many({key: _pack(vector) for (_, _, key, _), vector in zip(items, vectors)})
+        except Exception as e:
+            error = e
+        with self._cond:
+            for _, _, key, _ in items:
+                self._inflight.pop(key, None)
+        for index, (_, _, _, future) in enumerate(items):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(vectors[index])
+
+    # ==================== PUBLIC API ====================
+
+    def embed_many(self, texts: List[str], kind: str = KIND_DOCUMENT) -> List[List[float]]:
+        """Vector cho từng text (cùng thứ tự). Text trùng / đã cache không gọi provider."""
+        keys = [self._key(kind, text) for text in texts]
+        cached = self.cache.get_many(keys)
+        vectors: Dict[str, List[float]] = {key: _unpack(raw) for key, raw in cached.items()}
+
+        futures = {}
+        for text, key in zip(texts, keys):
+            if key not in vectors and key not in futures:
+                futures[key] = self._submit(kind, text, key)
+        for key, future in futures.items():
+            vectors[key] = future.result()
+        return [vectors[key] for key in keys]
+
+    def embed(self, text: str, kind: str = KIND_QUERY) -> List[float]:
+        return self.embed_many([text], kind)[0]
+
+    async def aembed_many(self, texts: List[str], kind: str = KIND_DOCUMENT) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        cached = await asyncio.to_thread(self.cache.get_many, keys)
+        vectors: Dict[str, List[float]] = {key: _unpack(raw) for key, raw in cached.items()}
+
+        futures = {}
+        for text, key in zip(texts, keys):
+            if key not in vectors and key not in futures:
+                futures[key] = asyncio.wrap_future(self._submit(kind, text, key))
+        if futures:
+            for key, vector in zip(futures, await asyncio.gather(*futures.values())):
+                vectors[key] = vector
+        return [vectors[key] for key in keys]
+
+    async def aembed(self, text: str, kind: str = KIND_QUERY) -> List[float]:
+        return (await self.aembed_many([text], kind))[0]
+
+    def as_langchain(self) -> Embeddings:
+        """Adapter LangChain Embeddings (dùng được ở mọi chỗ đang nhận embedding_model())."""
+        return CachedEmbeddings(self)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+        cache = self.cache.stats()
+        stats['cache_hits'] = cache.get('hits', 0)
+        stats['cache_misses'] = cache.get('misses', 0)
+        stats['cache_hit_rate'] = cache.get('hit_rate', 0.0)
+        stats['avg_batch_size'] = round(stats['texts_embedded'] / stats['requests'], 2) if stats['requests'] else 0.0
+        return stats
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings đi qua EmbeddingService."""
+
+    def __init__(self, service: EmbeddingService):
+        self.service = service
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.service.embed_many(texts, KIND_DOCUMENT)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.service.embed(text, KIND_QUERY)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.service.aembed_many(texts, KIND_DOCUMENT)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.service.aembed(text, KIND_QUERY)
+
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """EmbeddingService dùng chung trong process (provider theo EMBEDDING_PROVIDER)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = EmbeddingService()
+    return _service
+
+
+def embedding_stats() -> dict:
+    """Thống kê của embedding service (trong process hiện tại)."""
+    return get_embedding_service().stats()
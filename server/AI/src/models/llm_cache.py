@@ -0,0 +1,95 @@
+"""
+Cache response của LLM (LangChain BaseCache) lưu trên SQLite, key = model + tham số + messages đã chuẩn hoá
+"""
+import json
+import os
+import threading
+from typing import Any, Optional, Sequence
+
+from langchain_core.caches import BaseCache, InMemoryCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from ..shared import sha256_text, SqliteCache, AI_CACHE_DIR
+
+# Cấu hình (có thể đổi qua biến môi trường)
+LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'sqlite')   # sqlite | memory | none
+LLM_CACHE_TTL_SECONDS = float(os.environ.get('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '5000'))
+LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """Gộp các khoảng trắng liên tiếp để khác biệt về định dạng không làm miss cache."""
+    return " ".join(prompt.split())
+
+
+class SqliteLLMCache(BaseCache):
+    """
+    LLM cache dùng SqliteCache (LRU theo số entry/dung lượng + TTL, dùng chung được giữa nhiều process).
+
+    LangChain truyền vào:
+        - prompt: messages đã serialize
+        - llm_string: model + tham số (temperature, top_p, max_tokens, tools/structured output đã bind...)
+    """
+
+    def __init__(self, cache: SqliteCache):
+        self.cache = cache
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        return sha256_text(f"{llm_string}\x00{_normalize_prompt(prompt)}")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        raw = self.cache.get(key)
+        if raw is None:
+            return None
+        try:
+            return [loads(generation) for generation in json.loads(raw)]
+        except Exception:
+            # Entry hỏng hoặc không tương thích với phiên bản LangChain hiện tại
+            self.cache.delete(key)
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        payload = json.dumps([dumps(generation) for generation in return_val], ensure_ascii=False)
+        self.cache.set(self._key(prompt, llm_string), payload.encode('utf-8'))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+_llm_cache: Optional[BaseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[BaseCache]:
+    """LLM cache dùng chung trong process theo LLM_CACHE_BACKEND (None nếu tắt)."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None and LLM_CACHE_BACKEND != 'none':
+            if LLM_CACHE_BACKEND == 'memory':
+                _llm_cache = InMemoryCache(maxsize=LLM_CACHE_MAX_ENTRIES)
+            elif LLM_CACHE_BACKEND == 'sqlite':
+                _llm_cache = SqliteLLMCache(SqliteCache(
+                    os.path.join(AI_CACHE_DIR, 'llm.sqlite'),
+                    max_entries=LLM_CACHE_MAX_ENTRIES,
+                    max_bytes=LLM_CACHE_MAX_BYTES,
+                    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                    name='llm',
+                ))
+            else:
+                raise ValueError(f"Unsupported LLM cache backend: {LLM_CACHE_BACKEND}")
+        return _llm_cache
+
+
+def llm_cache_stats() -> dict:
+    """Thống kê hit/miss của LLM cache (trong process hiện tại)."""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"name": "llm", "backend": "none"}
+    stats = cache.stats() if hasattr(cache, 'stats') else {"name": "llm"}
+    return {**stats, "backend": LLM_CACHE_BACKEND}
@@ -1,8 +1,9 @@
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from faster_whisper import WhisperModel
 from google import genai
 
+from .llm_cache import get_llm_cache
+
 # Lazy imports for heavy ML models - only import when needed
 
 def embedding_model(model_provider: str = "gemini") -> str:
@@ -29,7 +30,8 @@ def call_llm(model_provider: str = "gemini",
              model_name: str = "",
              temperature: float = 1.0,
              top_p: float = 0.95,
-             max_tokens = None
+             max_tokens = None,
+             use_cache: bool = False
     ) -> str:
     """
     Gọi LLM dựa trên tên model và prompt
@@ -37,24 +39,30 @@ def call_llm(model_provider: str = "gemini",
     Args:
         model_provider: Tên nhà cung cấp model LLM ('openai' hoặc 'gemini')
         model_name: Tên model LLM ('gpt-3.5-turbo' hoặc 'gemini-pro')
+        use_cache: Dùng LLM cache (backend cấu hình qua LLM_CACHE_BACKEND).
+            Chỉ bật cho lời gọi mang tính xác định (router, grader, rewrite);
+            không bật cho generator trả lời user hay tool call (dữ liệu live).
         
     Returns:
         Kết quả trả về từ LLM
     """
+    cache = get_llm_cache() if use_cache else None
     
     if model_provider == 'openai':
         llm = ChatOpenAI(
             model=model_name,
             temperature=temperature,
             top_p=top_p,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            cache=cache
         )
     elif model_provider == 'gemini':
         llm = ChatGoogleGenerativeAI(
             model=model_name,
             temperature=temperature,
             top_p=top_p,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            cache=cache
         )
     else:
         raise ValueError(f"Unsupported model: {model_provider}")
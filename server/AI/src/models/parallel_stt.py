@@ -0,0 +1,241 @@
+"""
+Transcribe song song bằng faster-whisper: cắt audio theo ranh giới giọng nói (VAD),
+transcribe từng đoạn trên process pool (mỗi process một model), rồi ghép lại theo thứ tự thời gian
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from .whisper_pool import get_whisper_pool, WHISPER_MODEL_SIZE, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, WHISPER_IDLE_TTL
+
+SAMPLE_RATE = 16000
+
+# Cấu hình (có thể đổi qua biến môi trường)
+STT_PARALLEL_WORKERS = int(os.environ.get('STT_PARALLEL_WORKERS', str(os.cpu_count() or 1)))
+STT_CHUNK_SECONDS = float(os.environ.get('STT_CHUNK_SECONDS', '30'))
+STT_PARALLEL_MIN_SECONDS = float(os.environ.get('STT_PARALLEL_MIN_SECONDS', '120'))  # audio ngắn hơn -> chạy tuần tự
+# Mỗi process con giữ một WhisperModel: pool không dùng quá TTL thì tắt hẳn để trả RAM (0 = giữ mãi)
+STT_PARALLEL_IDLE_TTL = float(os.environ.get('STT_PARALLEL_IDLE_TTL', str(WHISPER_IDLE_TTL)))
+STT_CHUNK_PADDING_SECONDS = 0.2
+
+
+# ==================== WORKER PROCESS ====================
+
+_worker_model = None
+
+
+def _init_worker(model_size: str, device: str, compute_type: str, cpu_threads: int):
+    """Chạy một lần trong mỗi process con: load model và giữ lại cho mọi đoạn audio."""
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _transcribe_chunk(index: int, offset_seconds: float, audio, language: str, beam_size: int):
+    """Transcribe một đoạn audio, trả timestamps tuyệt đối (cộng offset của đoạn)."""
+    segments, _ = _worker_model.transcribe(audio, language=language, beam_size=beam_size, vad_filter=False)
+    return index, [
+        {
+            "start": round(offset_seconds + seg.start, 3),
+            "end": round(offset_seconds + seg.end, 3),
+            "text": seg.text.strip(),
+        }
+        for seg in segments
+    ]
+
+
+# ==================== PROCESS POOL ====================
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0        # số process của pool hiện tại
+_executor_lock = threading.Lock()
+_executor_users = 0          # số lời gọi transcribe_segments đang dùng pool
+_executor_last_used = 0.0
+_reaper: Optional[threading.Thread] = None
+
+
+@contextmanager
+def _use_executor(workers: int):
+    """
+    Mượn process pool dùng chung (model đã load được giữ giữa các lần gọi).
+    Pool idle quá STT_PARALLEL_IDLE_TTL bị tắt: STT_PARALLEL_WORKERS model trong RAM không bị giữ suốt đời process.
+    """
+    global _executor, _executor_users, _executor_last_used
+    with _executor_lock:
+        executor = _get_executor_locked(workers)
+        _executor_users += 1
+    try:
+        yield executor
+    except BrokenProcessPool:
+        # Process con chết (ví dụ bị OOM kill): bỏ pool hỏng, lần gọi sau tạo pool mới
+        with _executor_lock:
+            if _executor is executor:
+                _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        print("  ⚠️ Parallel STT process pool is broken, it will be recreated on the next call")
+        raise
+    finally:
+        with _executor_lock:
+            _executor_users -= 1
+            _executor_last_used = time.time()
+
+
+def _ensure_reaper_locked():
+    """Thread nền tắt pool idle (giống reaper của WhisperModelPool)."""
+    global _reaper
+    if STT_PARALLEL_IDLE_TTL <= 0 or (_reaper and _reaper.is_alive()):
+        return
+
+    def reap():
+        global _executor, _reaper
+        while True:
+            time.sleep(max(STT_PARALLEL_IDLE_TTL / 2, 1.0))
+            with _executor_lock:
+                if _executor is not None and _executor_users == 0 \
+                        and time.time() - _executor_last_used >= STT_PARALLEL_IDLE_TTL:
+                    _executor.shutdown(wait=False, cancel_futures=True)
+                    _executor = None
+                    print("  🧹 Shut down idle parallel STT process pool")
+                if _executor is None:
+                    _reaper = None
+                    return
+
+    _reaper = threading.Thread(target=reap, name="parallel-stt-reaper", daemon=True)
+    _reaper.start()
+
+
+def _get_executor_locked(workers: int) -> ProcessPoolExecutor:
+    global _executor, _executor_workers
+    if _executor is not None and getattr(_executor, '_broken', False):
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _executor is not None and _executor_workers != workers:
+        if _executor_users == 0:
+            # Đổi số process: tạo lại pool (model được load lại trong các process mới)
+            _executor.shutdown(wait=False)
+            _executor = None
+        else:
+            print(f"  ⚠️ Parallel STT pool has {_executor_workers} processes (in use), "
+                  f"{workers} will apply once it is idle")
+    if _executor is None:
+        cpu_threads = max(1, (os.cpu_count() or 1) // workers)
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            # spawn: an toàn khi process cha đang chạy nhiều thread (worker, pool, reaper...)
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(WHISPER_MODEL_SIZE, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, cpu_threads),
+        )
+        _executor_workers = workers
+    _ensure_reaper_locked()
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(shutdown_executor)
+
+
+# ==================== SEGMENTATION ====================
+
+def _plan_chunks(speech_spans: List[dict], total_samples: int, max_chunk_samples: int) -> List[Tuple[int, int]]:
+    """
+    Gom các đoạn có giọng nói liền kề thành chunk dài tối đa `max_chunk_samples`,
+    chỉ cắt tại khoảng lặng. Đoạn nói dài hơn giới hạn được cắt thành các phần dài `max_chunk_samples`.
+    Padding chỉ thêm ở mép thật của đoạn nói (tối đa nửa khoảng lặng tới chunk bên cạnh):
+    chỗ cắt cưỡng bức không có padding, nên các chunk không chồng lên nhau và không có từ bị lặp.
+    """
+    pad = int(STT_CHUNK_PADDING_SECONDS * SAMPLE_RATE)
+    chunks = []  # (start, end, start là mép thật?, end là mép thật?)
+    current = None
+
+    for span in speech_spans:
+        start, end = span['start'], span['end']
+        start_is_edge = True
+
+        # Đoạn nói quá dài -> chia nhỏ
+        while end - start > max_chunk_samples:
+            if current:
+                chunks.append(current)
+                current = None
+            chunks.append((start, start + max_chunk_samples, start_is_edge, False))
+            start += max_chunk_samples
+            start_is_edge = False
+
+        if current and end - current[0] <= max_chunk_samples:
+            current = (current[0], end, current[2], True)
+        else:
+            if current:
+                chunks.append(current)
+            current = (start, end, start_is_edge, True)
+
+    if current:
+        chunks.append(current)
+
+    planned = []
+    for i, (start, end, start_is_edge, end_is_edge) in enumerate(chunks):
+        if start_is_edge:
+            start = max(start - pad, (chunks[i - 1][1] + start) // 2 if i else 0)
+        if end_is_edge:
+            end = min(end + pad, (end + chunks[i + 1][0]) // 2 if i + 1 < len(chunks) else total_samples)
+        planned.append((start, end))
+    return planned
+
+
+# ==================== PUBLIC API ====================
+
+def transcribe_segments(audio_file_path: str, language: str = "vi", beam_size: int = 3,
+                        workers: Optional[int] = None) -> List[dict]:
+    """
+    Transcribe file audio bằng faster-whisper.
+    Audio dài hơn STT_PARALLEL_MIN_SECONDS được cắt theo VAD và chạy song song trên process pool;
+    audio ngắn chạy tuần tự bằng model trong WhisperModelPool (tránh overhead chia việc).
+
+    Returns:
+        List[dict]: [{start, end, text}] theo thứ tự thời gian (giây)
+    """
+    from faster_whisper.audio import decode_audio
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    workers = max(1, workers or STT_PARALLEL_WORKERS)
+    audio = decode_audio(audio_file_path, sampling_rate=SAMPLE_RATE)
+    duration = len(audio) / SAMPLE_RATE
+
+    if workers == 1 or duration < STT_PARALLEL_MIN_SECONDS:
+        with get_whisper_pool().acquire() as model:
+            segments, _ = model.transcribe(audio, language=language, beam_size=beam_size)
+            return [
+                {"start": round(seg.start, 3), "end": round(seg.end, 3), "text": seg.text.strip()}
+                for seg in segments if seg.text.strip()
+            ]
+
+    speech_spans = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500))
+    if not speech_spans:
+        return []
+
+    chunks = _plan_chunks(speech_spans, len(audio), int(STT_CHUNK_SECONDS * SAMPLE_RATE))
+    print(f"  🔀 VAD: {duration:.0f}s audio, {len(speech_spans)} speech spans -> {len(chunks)} chunks on {workers} processes")
+
+    results = [None] * len(chunks)
+    with _use_executor(workers) as executor:
+        futures = [
+            executor.submit(_transcribe_chunk, i, start / SAMPLE_RATE, audio[start:end], language, beam_size)
+            for i, (start, end) in enumerate(chunks)
+        ]
+        for future in futures:
+            index, segments = future.result()
+            results[index] = segments
+
+    return [seg for chunk_segments in results for seg in chunk_segments if seg['text']]
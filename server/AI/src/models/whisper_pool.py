@@ -0,0 +1,160 @@
+"""
+Process-wide registry cho faster-whisper models: lazy load, pool giới hạn số instance, tự giải phóng khi idle
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+# Cấu hình mặc định (có thể đổi qua biến môi trường)
+WHISPER_MODEL_SIZE = os.environ.get('WHISPER_MODEL_SIZE', 'base')
+WHISPER_DEVICE = os.environ.get('WHISPER_DEVICE', 'cpu')
+WHISPER_COMPUTE_TYPE = os.environ.get('WHISPER_COMPUTE_TYPE', 'int8')
+WHISPER_POOL_SIZE = int(os.environ.get('WHISPER_POOL_SIZE', '2'))          # số model tối đa mỗi cấu hình
+WHISPER_IDLE_TTL = float(os.environ.get('WHISPER_IDLE_TTL', '600'))        # giây không dùng thì giải phóng
+WHISPER_CPU_THREADS = int(os.environ.get('WHISPER_CPU_THREADS', '0'))      # 0 = mặc định của CTranslate2
+
+
+class WhisperModelPool:
+    """
+    Pool các instance WhisperModel cùng cấu hình.
+
+    - Model chỉ được load khi cần (lazy) và được tái sử dụng giữa các lần transcribe.
+    - Tối đa `max_size` instance; job thứ max_size+1 chờ đến khi có model rảnh.
+    - Model rảnh quá `idle_ttl` giây sẽ bị giải phóng (trả RAM cho hệ thống).
+    """
+
+    def __init__(self, model_size: str, device: str, compute_type: str,
+                 max_size: int = WHISPER_POOL_SIZE, idle_ttl: float = WHISPER_IDLE_TTL,
+                 cpu_threads: int = WHISPER_CPU_THREADS):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.max_size = max(1, max_size)
+        self.idle_ttl = idle_ttl
+        self.cpu_threads = cpu_threads
+
+        self._idle = []  # [(model, last_used)], model dùng gần nhất ở cuối
+        self._created = 0
+        self._cond = threading.Condition()
+        self._reaper = None
+
+        self.loads = 0
+        self.evictions = 0
+
+    def _load_model(self):
+        from faster_whisper import WhisperModel
+
+        print(f"  📥 Loading faster-whisper '{self.model_size}' ({self.device}/{self.compute_type})...")
+        started = time.time()
+        model = WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+        self.loads += 1
+        print(f"  ✅ Model loaded in {time.time() - started:.1f}s")
+        return model
+
+    def _checkout(self, timeout: Optional[float]):
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                self._evict_idle_locked()
+                if self._idle:
+                    model, _ = self._idle.pop()  # LIFO: model "nóng" nhất
+                    return model
+                if self._created < self.max_size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a free Whisper model")
+                self._cond.wait(remaining)
+
+        # Load ngoài lock để các thread khác vẫn lấy/trả được model
+        try:
+            model = self._load_model()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+        self._ensure_reaper()
+        return model
+
+    def _checkin(self, model):
+        with self._cond:
+            self._idle.append((model, time.time()))
+            self._cond.notify()
+
+    def _evict_idle_locked(self):
+        if self.idle_ttl <= 0:
+            return
+        cutoff = time.time() - self.idle_ttl
+        kept = [(m, t) for m, t in self._idle if t >= cutoff]
+        evicted = len(self._idle) - len(kept)
+        if evicted:
+            self._idle = kept
+            self._created -= evicted
+            self.evictions += evicted
+            print(f"  🧹 Evicted {evicted} idle Whisper model(s)")
+
+    def _ensure_reaper(self):
+        """Thread nền định kỳ giải phóng model idle (kể cả khi không còn job nào gọi acquire)."""
+        if self.idle_ttl <= 0 or (self._reaper and self._reaper.is_alive()):
+            return
+
+        def reap():
+            while True:
+                time.sleep(max(self.idle_ttl / 2, 1.0))
+                with self._cond:
+                    self._evict_idle_locked()
+                    if self._created == 0:
+                        self._reaper = None
+                        return
+
+        self._reaper = threading.Thread(target=reap, name="whisper-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Mượn một model từ pool:
+
+            with get_whisper_pool().acquire() as model:
+                segments, info = model.transcribe(path)
+                text = " ".join(s.text for s in segments)  # segments là generator, phải đọc trong with
+        """
+        model = self._checkout(timeout)
+        try:
+            yield model
+        finally:
+            self._checkin(model)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "model": f"{self.model_size}/{self.device}/{self.compute_type}",
+                "loaded": self._created,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+_pools: Dict[Tuple[str, str, str], WhisperModelPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_whisper_pool(model_size: Optional[str] = None, device: Optional[str] = None,
+                     compute_type: Optional[str] = None) -> WhisperModelPool:
+    """Lấy (hoặc tạo) pool dùng chung trong process cho cấu hình model tương ứng."""
+    key = (model_size or WHISPER_MODEL_SIZE, device or WHISPER_DEVICE, compute_type or WHISPER_COMPUTE_TYPE)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = WhisperModelPool(*key)
+        return _pools[key]
@@ -1,3 +1,9 @@
-from .retriever import retrieve, format_retrieved_documents
+from .retriever import retrieve, aretrieve, format_retrieved_documents, merge_results
+from .versions import get_collection_version, bump_collection_version
+from .backends import RetrieverBackend, get_backend
 
-__all__ = ['retrieve', 'format_retrieved_documents']
\ No newline at end of file
+__all__ = [
+    'retrieve', 'aretrieve', 'format_retrieved_documents', 'merge_results',
+    'get_collection_version', 'bump_collection_version',
+    'RetrieverBackend', 'get_backend',
+]
@@ -0,0 +1,290 @@
+"""
+Backend cho retriever, chọn qua biến môi trường RAG_BACKEND:
+    weaviate  - Weaviate server (mặc định, client dùng chung trong process)
+    embedded  - index nhúng trong process (xem embedded.py), không cần server
+Mọi backend trả kết quả cùng dạng (.objects[i].properties / .metadata) mà format_retrieved_documents dùng.
+use_reranker=True: rerank theo RAG_RERANKER (mặc định cross-encoder cục bộ, xem reranker.py).
+"""
+import asyncio
+import os
+import threading
+from typing import List, Optional
+
+from .reranker import RAG_RERANKER, candidate_count, get_reranker
+
+RAG_BACKEND = os.environ.get('RAG_BACKEND', 'weaviate').lower()
+
+
+class RetrieverBackend:
+    """
+    Interface: hybrid search (alpha: 0 = keyword, 1 = vector) trên một collection,
+    cộng các thao tác ghi dùng cho ingestion (object: {'uuid', 'properties', 'vector'}).
+    """
+
+    name = 'base'
+    _embeddings = None
+    # True: mỗi lần upsert / delete ghi lại cả collection -> ingestion gom thành một lần ghi mỗi lần chạy
+    rewrites_on_write = False
+
+    @property
+    def embeddings(self):
+        """Embedding của AI module qua embedding service (cùng model + cache với pipeline ingest)."""
+        if self._embeddings is None:
+            from ..models.embeddings import get_embedding_service
+            self._embeddings = get_embedding_service().as_langchain()
+        return self._embeddings
+
+    def ensure_collection(self, collection_name: str):
+        raise NotImplementedError
+
+    def upsert(self, collection_name: str, items: List[dict]) -> int:
+        raise NotImplementedError
+
+    def delete(self, collection_name: str, uuids: List[str]) -> int:
+        raise NotImplementedError
+
+    def delete_by_property(self, collection_name: str, prop: str, values: List[str]) -> int:
+        """Xóa các object có properties[prop] thuộc `values`."""
+        raise NotImplementedError
+
+    def search(self, query: str, collection_name: str, metadata: Optional[dict] = None,
+               top_k: int = 15, alpha: float = 0.5, use_reranker: bool = False):
+        raise NotImplementedError
+
+    async def asearch(self, query: str, collection_name: str, metadata: Optional[dict] = None,
+                      top_k: int = 15, alpha: float = 0.5, use_reranker: bool = False):
+        return await asyncio.to_thread(self.search, query, collection_name, metadata, top_k, alpha, use_reranker)
+
+    @staticmethod
+    def _local_rerank(use_reranker: bool) -> bool:
+        return use_reranker and RAG_RERANKER == 'local'
+
+    @staticmethod
+    def _limit(top_k: int, use_reranker: bool) -> int:
+        """Rerank cục bộ cần lấy dư ứng viên từ hybrid search."""
+        return candidate_count(top_k) if RetrieverBackend._local_rerank(use_reranker) else top_k
+
+    def _rerank(self, query: str, results, top_k: int, use_reranker: bool):
+        if not self._local_rerank(use_reranker):
+            return results
+        return get_reranker().rerank(query, results, top_k)
+
+
+class WeaviateBackend(RetrieverBackend):
+    name = 'weaviate'
+
+    def __init__(self):
+        from .client import get_weaviate_manager
+        self.manager = get_weaviate_manager()
+        # collection -> True nếu không có vectorizer phía server (tạo bởi pipeline ingest, query phải kèm vector)
+        self._external_vectors = {}
+
+    # ==================== WRITE ====================
+
+    def ensure_collection(self, collection_name: str):
+        from weaviate.classes.config import Configure, Property, DataType, Tokenization
+
+        client = self.manager.get_client()
+        if not client.collections.exists(collection_name):
+            # Vector do pipeline tính (embedding_model), Weaviate chỉ lưu và search; property khác dùng auto-schema
+            client.collections.create(
+                name=collection_name,
+                vectorizer_config=Configure.Vectorizer.none(),
+                # Module reranker của Weaviate chỉ cần khi RAG_RERANKER=weaviate (server phải bật module này)
+                reranker_config=Configure.Reranker.transformers() if RAG_RERANKER == 'weaviate' else None,
+                properties=[
+                    Property(name='content', data_type=DataType.TEXT),
+                    Property(name='source', data_type=DataType.TEXT),
+                    # So khớp nguyên giá trị khi filter / xóa theo entity (knowledge.py)
+                    Property(name='entity_key', data_type=DataType.TEXT, tokenization=Tokenization.FIELD),
+                    Property(name='project_id', data_type=DataType.TEXT, tokenization=Tokenization.FIELD),
+                ]
+            )
+            self._external_vectors[collection_name] = True
+
+    def upsert(self, collection_name: str, items: List[dict]) -> int:
+        collection = self.manager.get_client().collections.get(collection_name)
+        with collection.batch.fixed_size(batch_size=200) as batch:
+            for item in items:
+                batch.add_object(properties=item['properties'], uuid=item['uuid'], vector=item.get('vector'))
+        failed = collection.batch.failed_objects
+        if failed:
+            raise RuntimeError(f"{len(failed)} objects failed: {failed[0].message}")
+        return len(items)
+
+    def delete(self, collection_name: str, uuids: List[str]) -> int:
+        from weaviate.classes.query import Filter
+
+        if not uuids:
+            return 0
+        collection = self.manager.get_client().collections.get(collection_name)
+        result = collection.data.delete_many(where=Filter.by_id().contains_any(list(uuids)))
+        return result.successful
+
+    def delete_by_property(self, collection_name: str, prop: str, values: List[str]) -> int:
+        from weaviate.classes.query import Filter
+
+        if not values:
+            return 0
+        collection = self.manager.get_client().collections.get(collection_name)
+        result = collection.data.delete_many(where=Filter.by_property(prop).contains_any(list(values)))
+        return result.successful
+
+    # ==================== SEARCH ====================
+
+    @staticmethod
+    def _connection_errors() -> tuple:
+        """Lỗi do kết nối hỏng (nên kết nối lại); lỗi khác (404 collection, query sai...) không đụng tới client dùng chung."""
+        from weaviate import exceptions
+        names = ('WeaviateConnectionError', 'WeaviateClosedClientError', 'WeaviateGRPCUnavailableError',
+                 'WeaviateTimeoutError')
+        return tuple(getattr(exceptions, name) for name in names if hasattr(exceptions, name)) + (ConnectionError,)
+
+    @staticmethod
+    def _has_vectorizer(config) -> bool:
+        from weaviate.classes.config import Vectorizers
+        return getattr(config, 'vectorizer', None) not in (None, Vectorizers.NONE)
+
+    def _hybrid_kwargs(self, query: str, metadata: Optional[dict], top_k: int, alpha: float, use_reranker: bool) -> dict:
+        """Tham số hybrid search dùng chung cho bản sync và async."""
+        from weaviate.classes.query import Rerank, Filter, MetadataQuery
+
+        search_filter = None
+        if metadata:
+            filter_list = []
+            for key, value in metadata.items():
+                filter_list.append(Filter.by_property(key).contains_any([value]))
+
+            search_filter = Filter.any_of(filter_list)
+
+        return dict(
+            query=query,
+            filters=search_filter,
+            alpha=alpha,
+            limit=self._limit(top_k, use_reranker),
+            rerank=Rerank(
+                prop="content",
+                query=query
+            ) if use_reranker and RAG_RERANKER == 'weaviate' else None,
+            return_metadata=MetadataQuery(score=True, distance=True)
+        )
+
+    def search(self, query, collection_name, metadata=None, top_k=15, alpha=0.5, use_reranker=False):
+        kwargs = self._hybrid_kwargs(query, metadata, top_k, alpha, use_reranker)
+
+        # Thử lại một lần với kết nối mới, chỉ khi lỗi là do kết nối đã hỏng
+        for attempt in range(2):
+            try:
+                client = self.manager.get_client()
+                # Collection knowledge của project chỉ có sau lần index đầu tiên: chưa có = không có kết quả
+                if collection_name not in self._external_vectors and not client.collections.exists(collection_name):
+                    return None
+                collection = client.collections.get(collection_name)
+                if collection_name not in self._external_vectors:
+                    self._external_vectors[collection_name] = not self._has_vectorizer(collection.config.get())
+                if self._external_vectors[collection_name] and alpha > 0 and 'vector' not in kwargs:
+                    kwargs['vector'] = self.embeddings.embed_query(query)
+                results = collection.query.hybrid(**kwargs)
+                break
+            except self._connection_errors() as e:
+                print(f"Error during retrieval: {e}")
+                self.manager.invalidate()
+            except Exception as e:
+                # Lỗi của query / collection (WeaviateQueryError, 404...), kết nối vẫn dùng được
+                print(f"Error during retrieval: {e}")
+                return None
+        else:
+            return None
+        return self._rerank(query, results, top_k, use_reranker)
+
+    async def asearch(self, query, collection_name, metadata=None, top_k=15, alpha=0.5, use_reranker=False):
+        kwargs = self._hybrid_kwargs(query, metadata, top_k, alpha, use_reranker)
+
+        for attempt in range(2):
+            try:
+                client = await self.manager.aget_client()
+                if collection_name not in self._external_vectors and not await client.collections.exists(collection_name):
+                    return None
+                collection = client.collections.get(collection_name)
+                if collection_name not in self._external_vectors:
+                    self._external_vectors[collection_name] = not self._has_vectorizer(await collection.config.get())
+                if self._external_vectors[collection_name] and alpha > 0 and 'vector' not in kwargs:
+                    kwargs['vector'] = await self.embeddings.aembed_query(query)
+                results = await collection.query.hybrid(**kwargs)
+                break
+            except self._connection_errors() as e:
+                print(f"Error during retrieval: {e}")
+                await self.manager.ainvalidate()
+            except Exception as e:
+                print(f"Error during retrieval: {e}")
+                return None
+        else:
+            return None
+        if not self._local_rerank(use_reranker):
+            return results
+        # Cross-encoder chạy trên CPU: đưa ra thread để không chặn event loop
+        return await asyncio.to_thread(self._rerank, query, results, top_k, use_reranker)
+
+
+class EmbeddedBackend(RetrieverBackend):
+    """
+    Index nhúng: query được embed bằng embedding_model() của AI module
+    (collection phải được ingest bằng cùng model, xem ingestion.py).
+    """
+
+    name = 'embedded'
+    rewrites_on_write = True  # mỗi lần ghi tạo generation mới (O(N), dựng lại IVF)
+
+    def __init__(self, index=None, embeddings=None):
+        from .embedded import EmbeddedIndex
+        self.index = index or EmbeddedIndex()
+        self._embeddings = embeddings
+
+    def ensure_collection(self, collection_name: str):
+        # Collection nhúng được tạo khi ghi lần đầu
+        pass
+
+    def upsert(self, collection_name: str, items: List[dict]) -> int:
+        return self.index.collection(collection_name).upsert(items)
+
+    def delete(self, collection_name: str, uuids: List[str]) -> int:
+        return self.index.collection(collection_name).delete(uuids)
+
+    def delete_by_property(self, collection_name: str, prop: str, values: List[str]) -> int:
+        values = set(values)
+        return self.index.collection(collection_name).delete_where(lambda obj: obj['properties'].get(prop) in values)
+
+    def search(self, query, collection_name, metadata=None, top_k=15, alpha=0.5, use_reranker=False):
+        try:
+            query_vector = self.embeddings.embed_query(query) if alpha > 0 else None
+        except Exception as e:
+            # Không embed được thì vẫn còn nhánh keyword
+            print(f"⚠️ [RAG] Embedding query lỗi, chỉ dùng BM25: {e}")
+            query_vector, alpha = None, 0.0
+        try:
+            results = self.index.collection(collection_name).search(
+                query, query_vector, metadata, self._limit(top_k, use_reranker), alpha
+            )
+        except Exception as e:
+            print(f"Error during retrieval: {e}")
+            return None
+        return self._rerank(query, results, top_k, use_reranker)
+
+
+_backend: Optional[RetrieverBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> RetrieverBackend:
+    """Backend dùng chung trong process (theo RAG_BACKEND)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if RAG_BACKEND == 'embedded':
+                    _backend = EmbeddedBackend()
+                elif RAG_BACKEND == 'weaviate':
+                    _backend = WeaviateBackend()
+                else:
+                    raise ValueError(f"Unsupported RAG_BACKEND: {RAG_BACKEND}")
+    return _backend
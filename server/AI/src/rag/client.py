@@ -0,0 +1,141 @@
+"""
+Weaviate client dùng chung trong process: kết nối lazy, health check định kỳ, tự kết nối lại khi lỗi.
+Mỗi query chỉ còn thời gian search, không phải mở kết nối HTTP + gRPC handshake.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import weaviate
+
+# Cấu hình (có thể đổi qua biến môi trường)
+WEAVIATE_HOST = os.environ.get('WEAVIATE_HOST', 'localhost')
+WEAVIATE_PORT = int(os.environ.get('WEAVIATE_PORT', '8080'))
+WEAVIATE_GRPC_PORT = int(os.environ.get('WEAVIATE_GRPC_PORT', '50051'))
+WEAVIATE_HEALTHCHECK_INTERVAL = float(os.environ.get('WEAVIATE_HEALTHCHECK_INTERVAL', '30'))  # giây
+
+
+class WeaviateClientManager:
+    """
+    Giữ một client sync (dùng chung mọi thread) và một client async cho mỗi event loop.
+
+    get_client()/aget_client() kiểm tra is_ready() nếu lần kiểm tra trước đã quá
+    WEAVIATE_HEALTHCHECK_INTERVAL giây; client không còn sống thì đóng và kết nối lại.
+    Query lỗi thì gọi invalidate()/ainvalidate() để lần sau kết nối lại.
+    """
+
+    def __init__(self, host: str = WEAVIATE_HOST, port: int = WEAVIATE_PORT, grpc_port: int = WEAVIATE_GRPC_PORT,
+                 healthcheck_interval: float = WEAVIATE_HEALTHCHECK_INTERVAL):
+        self.host = host
+        self.port = port
+        self.grpc_port = grpc_port
+        self.healthcheck_interval = healthcheck_interval
+
+        self._client = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+        self._async_client = None
+        self._async_loop = None
+        self._async_checked_at = 0.0
+        self._async_lock = None
+
+    # ==================== SYNC ====================
+
+    def _is_alive(self, client) -> bool:
+        try:
+            return client.is_connected() and client.is_ready()
+        except Exception:
+            return False
+
+    def get_client(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._client is not None and now - self._checked_at >= self.healthcheck_interval:
+                if not self._is_alive(self._client):
+                    print("⚠️ [WEAVIATE] Kết nối không còn sống, kết nối lại")
+                    self._close_quietly(self._client)
+                    self._client = None
+                self._checked_at = now
+
+            if self._client is None:
+                self._client = weaviate.connect_to_local(host=self.host, port=self.port, grpc_port=self.grpc_port)
+                self._checked_at = now
+                print(f"🔌 [WEAVIATE] Đã kết nối {self.host}:{self.port} (gRPC {self.grpc_port})")
+            return self._client
+
+    def invalidate(self):
+        """Bỏ client hiện tại (sau khi query lỗi); lần gọi get_client() sau sẽ kết nối lại."""
+        with self._lock:
+            if self._client is not None:
+                self._close_quietly(self._client)
+                self._client = None
+
+    @staticmethod
+    def _close_quietly(client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    # ==================== ASYNC ====================
+
+    async def aget_client(self):
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            # Client async gắn với event loop đã tạo nó
+            self._async_loop = loop
+            self._async_client = None
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            now = time.monotonic()
+            client = self._async_client
+            if client is not None and now - self._async_checked_at >= self.healthcheck_interval:
+                try:
+                    alive = client.is_connected() and await client.is_ready()
+                except Exception:
+                    alive = False
+                if not alive:
+                    print("⚠️ [WEAVIATE] Kết nối async không còn sống, kết nối lại")
+                    await self._aclose_quietly(client)
+                    self._async_client = None
+                self._async_checked_at = now
+
+            if self._async_client is None:
+                client = weaviate.use_async_with_local(host=self.host, port=self.port, grpc_port=self.grpc_port)
+                await client.connect()
+                self._async_client = client
+                self._async_checked_at = now
+            return self._async_client
+
+    async def ainvalidate(self):
+        client, self._async_client = self._async_client, None
+        if client is not None:
+            await self._aclose_quietly(client)
+
+    @staticmethod
+    async def _aclose_quietly(client):
+        try:
+            await client.close()
+        except Exception:
+            pass
+
+    # ==================== SHUTDOWN ====================
+
+    def close(self):
+        self.invalidate()
+
+    async def aclose(self):
+        self.close()
+        if self._async_loop is asyncio.get_running_loop():
+            await self.ainvalidate()
+
+
+_manager = WeaviateClientManager()
+
+
+def get_weaviate_manager() -> WeaviateClientManager:
+    """Client manager dùng chung trong process."""
+    return _manager
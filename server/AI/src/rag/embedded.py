@@ -0,0 +1,393 @@
+"""
+Vector index nhúng trong process (không cần Weaviate server): embedding đã chuẩn hoá lưu dạng .npy
+và memory-map khi đọc, tìm kiếm brute-force hoặc IVF, kết hợp BM25 cho hybrid search (alpha).
+
+Mỗi collection là một thư mục:
+    CURRENT                 tên generation đang dùng
+    gen-<n>/objects.jsonl   uuid + properties theo thứ tự hàng
+    gen-<n>/vectors.npy     ma trận N x D (float32, đã chuẩn hoá)
+    gen-<n>/ivf_*.npy       centroid + danh sách (chỉ khi N >= RAG_IVF_MIN_DOCS)
+    LOCK                    file lock: mỗi lần ghi (mọi process) giữ lock từ lúc đọc snapshot tới khi đổi CURRENT
+Mỗi lần ghi tạo generation mới rồi đổi CURRENT (reader trong process khác tự nạp lại).
+Ghi là O(N) - phù hợp cho deployment nhỏ và CI.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import uuid as uuid_lib
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..shared import AI_CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khóa giữa các thread trong process
+    fcntl = None
+
+# Cấu hình (có thể đổi qua biến môi trường)
+RAG_EMBEDDED_DIR = os.environ.get('RAG_EMBEDDED_DIR', os.path.join(AI_CACHE_DIR, 'vector_index'))
+RAG_IVF_MIN_DOCS = int(os.environ.get('RAG_IVF_MIN_DOCS', '20000'))  # dưới ngưỡng này dùng brute-force
+RAG_IVF_NPROBE = int(os.environ.get('RAG_IVF_NPROBE', '8'))          # số cluster được quét mỗi query
+RAG_VECTOR_CANDIDATES = int(os.environ.get('RAG_VECTOR_CANDIDATES', '100'))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+IVF_KMEANS_ITERATIONS = 10
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+# ==================== RESULT SHAPE (giống Weaviate QueryReturn) ====================
+
+@dataclass
+class MetadataReturn:
+    score: Optional[float] = None
+    distance: Optional[float] = None
+    rerank_score: Optional[float] = None
+
+
+@dataclass
+class EmbeddedObject:
+    uuid: str
+    properties: dict
+    metadata: MetadataReturn = field(default_factory=MetadataReturn)
+    vector: Optional[list] = None
+
+
+@dataclass
+class QueryReturn:
+    objects: List[EmbeddedObject] = field(default_factory=list)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or '').lower())
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _relative_scores(scores: np.ndarray) -> np.ndarray:
+    """Min-max về [0, 1] (như relativeScoreFusion của Weaviate)."""
+    if not len(scores):
+        return scores
+    low, high = float(scores.min()), float(scores.max())
+    if high - low < 1e-9:
+        return np.ones_like(scores) if high > 0 else np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+
+def _matches(properties: dict, metadata: Optional[dict]) -> bool:
+    """Filter giống retrieve() bản Weaviate: khớp ít nhất một cặp key/value (contains_any)."""
+    if not metadata:
+        return True
+    for key, value in metadata.items():
+        prop = properties.get(key)
+        if prop == value or (isinstance(prop, list) and value in prop):
+            return True
+    return False
+
+
+# ==================== BM25 ====================
+
+class BM25Index:
+    """Inverted index BM25 trên các property dạng text, dựng trong RAM khi nạp collection."""
+
+    def __init__(self, texts: List[str]):
+        self.size = len(texts)
+        self.doc_lengths = np.zeros(self.size, dtype=np.float32)
+        postings: Dict[str, Dict[int, int]] = {}
+        for i, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths[i] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, {})[i] = tf
+        self.avg_length = float(self.doc_lengths.mean()) if self.size else 0.0
+        self.postings = {
+            term: (np.fromiter(docs.keys(), dtype=np.int64), np.fromiter(docs.values(), dtype=np.float32))
+            for term, docs in postings.items()
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        if not self.size:
+            return scores
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths / (self.avg_length or 1.0))
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tf = self.postings[term]
+            idf = math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        return scores
+
+
+# ==================== IVF ====================
+
+def build_ivf(vectors: np.ndarray, seed: int = 0):
+    """K-means (sqrt(N) cluster) -> (centroids, order, offsets): hàng của cluster c là order[offsets[c]:offsets[c+1]]."""
+    n = len(vectors)
+    n_lists = max(1, int(math.sqrt(n)))
+    rng = np.random.default_rng(seed)
+    centroids = np.array(vectors[rng.choice(n, n_lists, replace=False)], dtype=np.float32)
+    for _ in range(IVF_KMEANS_ITERATIONS):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = vectors[assignments == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize_rows(centroids)
+    assignments = np.argmax(vectors @ centroids.T, axis=1)
+    order = np.argsort(assignments, kind='stable')
+    offsets = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+    return centroids, order.astype(np.int64), offsets.astype(np.int64)
+
+
+# ==================== COLLECTION ====================
+
+class EmbeddedCollection:
+    """
+    Một collection của index nhúng. Đọc an toàn giữa các thread.
+    Ghi được tuần tự hóa giữa các thread (_write_lock) và giữa các process (file LOCK, POSIX):
+    snapshot được đọc lại sau khi có lock nên không mất upsert của process khác.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._loaded_stamp = None
+        self._loaded_generation = None
+        self._objects: List[dict] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._bm25: Optional[BM25Index] = None
+        self._ivf = None
+
+    # ---------- đọc ----------
+
+    def _current_file(self) -> str:
+        return os.path.join(self.path, 'CURRENT')
+
+    def _current_generation(self) -> Optional[str]:
+        try:
+            with open(self._current_file(), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _stamp(self):
+        try:
+            return os.stat(self._current_file()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _ensure_loaded(self):
+        stamp = self._stamp()
+        with self._lock:
+            if stamp == self._loaded_stamp:
+                return
+            generation = self._current_generation()
+            objects, vectors, ivf = [], None, None
+            if generation:
+                gen_dir = os.path.join(self.path, generation)
+                with open(os.path.join(gen_dir, 'objects.jsonl'), encoding='utf-8') as f:
+                    objects = [json.loads(line) for line in f if line.strip()]
+                if objects:
+                    vectors = np.load(os.path.join(gen_dir, 'vectors.npy'), mmap_mode='r')
+                if os.path.exists(os.path.join(gen_dir, 'ivf_centroids.npy')):
+                    ivf = tuple(
+                        np.load(os.path.join(gen_dir, f'ivf_{name}.npy'))
+                        for name in ('centroids', 'order', 'offsets')
+                    )
+            self._objects = objects
+            self._vectors = vectors
+            self._ivf = ivf
+            self._bm25 = BM25Index([
+                " ".join(str(v) for v in obj['properties'].values() if isinstance(v, str)) for obj in objects
+            ])
+            self._loaded_stamp = stamp
+            self._loaded_generation = generation
+
+    def count(self) -> int:
+        self._ensure_loaded()
+        return len(self._objects)
+
+    def _vector_candidates(self, query_vector: np.ndarray, allowed: Optional[np.ndarray], limit: int):
+        """(chỉ số hàng, cosine) của các vector gần nhất."""
+        vectors = self._vectors
+        if self._ivf is not None and allowed is None:
+            centroids, order, offsets = self._ivf
+            probes = np.argsort(-(centroids @ query_vector))[:RAG_IVF_NPROBE]
+            rows = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes])
+        else:
+            rows = np.arange(len(self._objects)) if allowed is None else np.flatnonzero(allowed)
+        if not len(rows):
+            return rows, np.zeros(0, dtype=np.float32)
+        sims = np.asarray(vectors[rows] @ query_vector, dtype=np.float32)
+        top = np.argsort(-sims)[:limit]
+        return rows[top], sims[top]
+
+    def search(self, query: str, query_vector, metadata: Optional[dict] = None,
+               limit: int = 15, alpha: float = 0.5) -> QueryReturn:
+        """Hybrid search: alpha * cosine + (1 - alpha) * BM25 (cả hai chuẩn hoá về [0, 1] trên tập ứng viên)."""
+        self._ensure_loaded()
+        with self._lock:
+            objects, bm25 = self._objects, self._bm25
+            if not objects:
+                return QueryReturn()
+
+            allowed = None
+            if metadata:
+                allowed = np.array([_matches(obj['properties'], metadata) for obj in objects])
+                if not allowed.any():
+                    return QueryReturn()
+
+            vector_scores: Dict[int, float] = {}
+            if alpha > 0 and query_vector is not None:
+                qv = _normalize_rows(query_vector)[0]
+                rows, sims = self._vector_candidates(qv, allowed, max(limit, RAG_VECTOR_CANDIDATES))
+                vector_scores = dict(zip(rows.tolist(), sims.tolist()))
+
+            keyword_scores: Dict[int, float] = {}
+            if alpha < 1:
+                scores = bm25.scores(query)
+                if allowed is not None:
+                    scores = np.where(allowed, scores, 0.0)
+                hits = np.flatnonzero(scores > 0)
+                keyword_scores = dict(zip(hits.tolist(), scores[hits].tolist()))
+
+            candidates = np.array(sorted(set(vector_scores) | set(keyword_scores)), dtype=np.int64)
+            if not len(candidates):
+                return QueryReturn()
+            vec = _relative_scores(np.array([vector_scores.get(i, 0.0) for i in candidates], dtype=np.float32))
+            kw = _relative_scores(np.array([keyword_scores.get(i, 0.0) for i in candidates], dtype=np.float32))
+            fused = alpha * vec + (1 - alpha) * kw
+
+            results = []
+            for pos in np.argsort(-fused)[:limit]:
+                row = int(candidates[pos])
+                distance = 1 - vector_scores[row] if row in vector_scores else None
+                results.append(EmbeddedObject(
+                    uuid=objects[row]['uuid'],
+                    properties=dict(objects[row]['properties']),
+                    metadata=MetadataReturn(score=float(fused[pos]), distance=distance),
+                ))
+            return QueryReturn(objects=results)
+
+    # ---------- ghi ----------
+
+    def _write_generation(self, objects: List[dict], vectors: Optional[np.ndarray]):
+        os.makedirs(self.path, exist_ok=True)
+        previous = self._current_generation()
+        generation = f"gen-{uuid_lib.uuid4().hex[:12]}"
+        gen_dir = os.path.join(self.path, generation)
+        os.makedirs(gen_dir)
+
+        with open(os.path.join(gen_dir, 'objects.jsonl'), 'w', encoding='utf-8') as f:
+            for obj in objects:
+                f.write(json.dumps(obj, ensure_ascii=False, default=str) + "\n")
+        if objects:
+            np.save(os.path.join(gen_dir, 'vectors.npy'), vectors)
+            if len(objects) >= RAG_IVF_MIN_DOCS:
+                for name, array in zip(('centroids', 'order', 'offsets'), build_ivf(vectors)):
+                    np.save(os.path.join(gen_dir, f'ivf_{name}.npy'), array)
+
+        tmp = self._current_file() + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(generation)
+        os.replace(tmp, self._current_file())
+
+        # Reader đang mmap generation cũ vẫn đọc được sau khi xóa (POSIX)
+        if previous:
+            shutil.rmtree(os.path.join(self.path, previous), ignore_errors=True)
+
+    @contextmanager
+    def _locked_for_write(self):
+        with self._write_lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, 'LOCK'), 'a+b') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _snapshot(self):
+        """Trạng thái mới nhất trên disk (gọi khi đang giữ lock ghi)."""
+        # mtime của CURRENT có thể trùng khi hai process ghi liên tiếp: so thêm tên generation
+        if self._current_generation() != self._loaded_generation:
+            with self._lock:
+                self._loaded_stamp = None
+        self._ensure_loaded()
+        with self._lock:
+            objects = list(self._objects)
+            vectors = np.array(self._vectors) if self._vectors is not None else None
+        return objects, vectors
+
+    def upsert(self, items: Iterable[dict]) -> int:
+        """Thêm/cập nhật object: mỗi item {'uuid', 'properties', 'vector'}. Trả về số object đã ghi."""
+        items = list(items)
+        if not items:
+            return 0
+        with self._locked_for_write():
+            objects, vectors = self._snapshot()
+            new_ids = {item['uuid'] for item in items}
+            keep = [i for i, obj in enumerate(objects) if obj['uuid'] not in new_ids]
+
+            objects = [objects[i] for i in keep] + [{'uuid': it['uuid'], 'properties': it['properties']} for it in items]
+            new_vectors = _normalize_rows(np.stack([np.asarray(it['vector'], dtype=np.float32) for it in items]))
+            vectors = np.concatenate([vectors[keep], new_vectors]) if vectors is not None and keep else new_vectors
+            self._write_generation(objects, vectors)
+        return len(items)
+
+    def delete_where(self, predicate: Callable[[dict], bool]) -> int:
+        """Xóa các object có predicate(object) True ({'uuid', 'properties'}). Trả về số object đã xóa."""
+        with self._locked_for_write():
+            objects, vectors = self._snapshot()
+            keep = [i for i, obj in enumerate(objects) if not predicate(obj)]
+            removed = len(objects) - len(keep)
+            if removed:
+                self._write_generation([objects[i] for i in keep], vectors[keep] if keep else None)
+        return removed
+
+    def delete(self, uuids: Iterable[str]) -> int:
+        uuids = set(uuids)
+        return self.delete_where(lambda obj: obj['uuid'] in uuids)
+
+
+class EmbeddedIndex:
+    """Tập các collection dưới RAG_EMBEDDED_DIR."""
+
+    def __init__(self, root: str = RAG_EMBEDDED_DIR):
+        self.root = root
+        self._collections: Dict[str, EmbeddedCollection] = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name: str) -> EmbeddedCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = EmbeddedCollection(os.path.join(self.root, name))
+            return self._collections[name]
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.root, name, 'CURRENT'))
+
+    def drop(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+        shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
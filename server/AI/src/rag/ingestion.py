@@ -0,0 +1,305 @@
+"""
+Pipeline ingest tài liệu vào vector store (collection mặc định ProjectDocuments):
+    load (markdown / PDF / text) -> chunk -> embed (embedding service: cache + batch) -> upsert hàng loạt
+
+Chạy lại là incremental:
+    - File không đổi (cùng sha256) bị bỏ qua, không cần đọc lại
+    - File đổi: chỉ embed các chunk mới (id = hash nội dung), chunk không còn thì bị xóa
+    - File bị xóa khỏi thư mục: xóa toàn bộ chunk của nó (tắt bằng --no-prune)
+
+CLI (chạy trong thư mục server):
+    python -m AI.src.rag.ingestion <thư mục hoặc file> [--collection ProjectDocuments] [--full]
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..models.embeddings import EmbeddingService, get_embedding_service, KIND_DOCUMENT
+from ..shared import sha256_file, sha256_text, AI_CACHE_DIR
+from .backends import RetrieverBackend, get_backend
+from .versions import bump_collection_version
+
+# Cấu hình (có thể đổi qua biến môi trường)
+RAG_INGEST_CHUNK_SIZE = int(os.environ.get('RAG_INGEST_CHUNK_SIZE', '500'))
+RAG_INGEST_CHUNK_OVERLAP = int(os.environ.get('RAG_INGEST_CHUNK_OVERLAP', '50'))
+RAG_INGEST_UPSERT_BATCH = int(os.environ.get('RAG_INGEST_UPSERT_BATCH', '2000'))     # số chunk mỗi lần embed + upsert
+
+SUPPORTED_EXTENSIONS = ('.md', '.markdown', '.txt', '.pdf')
+DEFAULT_COLLECTION = 'ProjectDocuments'
+
+# Namespace cố định để id của chunk ổn định giữa các lần chạy
+_CHUNK_NAMESPACE = uuid.UUID('5b0f6d1e-8d4a-4f7e-9a51-2f1c0c7a9e3d')
+
+
+def chunk_uuid(collection_name: str, source: str, content: str) -> str:
+    """Id của chunk: cùng nguồn + cùng nội dung -> cùng id (dùng để bỏ qua chunk không đổi)."""
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, f"{collection_name}:{source}:{sha256_text(content)}"))
+
+
+# ==================== LOAD & CHUNK ====================
+
+def load_file(path: Path) -> List[dict]:
+    """File -> danh sách {'text', 'page'} (PDF mỗi trang một phần, file text một phần)."""
+    ext = path.suffix.lower()
+    if ext == '.pdf':
+        from pypdf import PdfReader
+        reader = PdfReader(str(path))
+        return [{'text': page.extract_text() or '', 'page': i} for i, page in enumerate(reader.pages)]
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return [{'text': f.read(), 'page': 0}]
+
+
+def _splitter(path: Path, chunk_size: int, chunk_overlap: int):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    if path.suffix.lower() in ('.md', '.markdown'):
+        # Ưu tiên cắt theo heading để mỗi chunk gọn trong một mục
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+            separators=["\n## ", "\n### ", "\n#### ", "\n\n", "\n", " ", ""]
+        )
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=["\n\n", "\n", " ", ""]
+    )
+
+
+def chunk_file(path: Path, source: str, collection_name: str,
+               chunk_size: int = RAG_INGEST_CHUNK_SIZE, chunk_overlap: int = RAG_INGEST_CHUNK_OVERLAP) -> List[dict]:
+    """File -> danh sách object (chưa có vector) theo định dạng upsert của backend."""
+    splitter = _splitter(path, chunk_size, chunk_overlap)
+    objects = {}
+    for part in load_file(path):
+        for text in splitter.split_text(part['text']):
+            text = text.strip()
+            if not text:
+                continue
+            object_id = chunk_uuid(collection_name, source, text)
+            objects[object_id] = {
+                'uuid': object_id,
+                'properties': {'content': text, 'source': source, 'title': path.stem, 'page': part['page']},
+            }
+    return list(objects.values())
+
+
+# ==================== MANIFEST ====================
+
+class IngestManifest:
+    """Trạng thái đã ingest (sha256 của file, id các chunk) - dùng để chạy incremental."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(AI_CACHE_DIR, 'ingest_manifest.sqlite')
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " collection TEXT NOT NULL, source TEXT NOT NULL, file_hash TEXT NOT NULL, ingested_at REAL NOT NULL,"
+                " PRIMARY KEY (collection, source))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " collection TEXT NOT NULL, source TEXT NOT NULL, chunk_id TEXT NOT NULL,"
+                " PRIMARY KEY (collection, source, chunk_id))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def file_hashes(self, collection_name: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT source, file_hash FROM files WHERE collection = ?", (collection_name,)
+            ).fetchall()
+        return dict(rows)
+
+    def chunk_ids(self, collection_name: str, source: str) -> set:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT chunk_id FROM chunks WHERE collection = ? AND source = ?", (collection_name, source)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def save_file(self, collection_name: str, source: str, file_hash: str, chunk_ids: List[str]):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM chunks WHERE collection = ? AND source = ?", (collection_name, source))
+            conn.executemany(
+                "INSERT INTO chunks (collection, source, chunk_id) VALUES (?, ?, ?)",
+                [(collection_name, source, chunk_id) for chunk_id in chunk_ids]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO files (collection, source, file_hash, ingested_at) VALUES (?, ?, ?, ?)",
+                (collection_name, source, file_hash, time.time())
+            )
+            conn.commit()
+
+    def remove_file(self, collection_name: str, source: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM chunks WHERE collection = ? AND source = ?", (collection_name, source))
+            conn.execute("DELETE FROM files WHERE collection = ? AND source = ?", (collection_name, source))
+            conn.commit()
+
+
+# ==================== EMBED ====================
+
+def embed_objects(objects: List[dict], service: Optional[EmbeddingService] = None):
+    """
+    Gán 'vector' cho từng object qua embedding service
+    (cache theo nội dung, chia batch và gửi song song do service đảm nhận).
+    """
+    service = service or get_embedding_service()
+    vectors = service.embed_many([obj['properties']['content'] for obj in objects], KIND_DOCUMENT)
+    for obj, vector in zip(objects, vectors):
+        obj['vector'] = vector
+
+
+# ==================== PIPELINE ====================
+
+@dataclass
+class IngestReport:
+    files_total: int = 0
+    files_skipped: int = 0
+    files_removed: int = 0
+    chunks_upserted: int = 0
+    chunks_deleted: int = 0
+    errors: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def _discover(root: Path) -> Dict[str, Path]:
+    """source (đường dẫn tương đối, dạng POSIX) -> Path của các file được hỗ trợ."""
+    if root.is_file():
+        return {root.name: root}
+    return {
+        path.relative_to(root).as_posix(): path
+        for path in sorted(root.rglob('*'))
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS
+    }
+
+
+def ingest_path(root: str, collection_name: str = DEFAULT_COLLECTION, backend: Optional[RetrieverBackend] = None,
+                manifest: Optional[IngestManifest] = None, prune: bool = True, full: bool = False,
+                chunk_size: int = RAG_INGEST_CHUNK_SIZE, chunk_overlap: int = RAG_INGEST_CHUNK_OVERLAP) -> IngestReport:
+    """
+    Ingest một thư mục (hoặc một file) vào collection.
+
+    full=True: embed và upsert lại mọi chunk (manifest vẫn dùng để xóa chunk cũ).
+    Backend ghi lại cả collection mỗi lần ghi (embedded): vẫn embed theo batch nhưng chỉ upsert / delete
+    một lần ở cuối lần chạy, tránh ghi lại collection (và dựng lại IVF) sau mỗi batch.
+    """
+    started = time.time()
+    backend = backend or get_backend()
+    manifest = manifest or IngestManifest()
+    report = IngestReport()
+
+    backend.ensure_collection(collection_name)
+
+    files = _discover(Path(root))
+    known = manifest.file_hashes(collection_name)
+    report.files_total = len(files)
+
+    pending: List[dict] = []              # chunk mới cần embed + upsert
+    embedded: List[dict] = []             # chunk đã embed, chờ upsert (backend rewrites_on_write)
+    pending_files: List[tuple] = []       # (source, file_hash, chunk_ids) ghi manifest sau khi upsert xong
+    stale: List[str] = []                 # chunk cần xóa
+
+    deferred = backend.rewrites_on_write
+
+    def flush(final: bool = False):
+        if pending:
+            embed_objects(pending)
+            if deferred:
+                # Giữ vector dạng float32 cho tới lần ghi cuối (list float của Python tốn RAM gấp nhiều lần)
+                for obj in pending:
+                    obj['vector'] = np.asarray(obj['vector'], dtype=np.float32)
+            embedded.extend(pending)
+            pending.clear()
+        if deferred and not final:
+            return
+        if embedded:
+            backend.upsert(collection_name, embedded)
+            report.chunks_upserted += len(embedded)
+        if stale:
+            report.chunks_deleted += backend.delete(collection_name, stale) or 0
+        for source, file_hash, chunk_ids in pending_files:
+            manifest.save_file(collection_name, source, file_hash, chunk_ids)
+        embedded.clear()
+        pending_files.clear()
+        stale.clear()
+
+    for source, path in files.items():
+        try:
+            file_hash = sha256_file(str(path))
+            if not full and known.get(source) == file_hash:
+                report.files_skipped += 1
+                continue
+
+            objects = chunk_file(path, source, collection_name, chunk_size, chunk_overlap)
+            existing = manifest.chunk_ids(collection_name, source)
+            current = [obj['uuid'] for obj in objects]
+
+            pending.extend(obj for obj in objects if full or obj['uuid'] not in existing)
+            stale.extend(existing - set(current))
+            pending_files.append((source, file_hash, current))
+            print(f"📄 [INGEST] {source}: {len(objects)} chunk ({len(objects) - len(existing & set(current))} mới)")
+        except Exception as e:
+            report.errors.append(f"{source}: {e}")
+            print(f"❌ [INGEST] {source}: {e}")
+            continue
+
+        if len(pending) >= RAG_INGEST_UPSERT_BATCH:
+            flush()
+
+    if prune:
+        for source in set(known) - set(files):
+            stale.extend(manifest.chunk_ids(collection_name, source))
+            manifest.remove_file(collection_name, source)
+            report.files_removed += 1
+    flush(final=True)
+
+    # Cache phụ thuộc nội dung collection (semantic answer cache) tự mất hiệu lực
+    if report.chunks_upserted or report.chunks_deleted:
+        bump_collection_version(collection_name)
+
+    report.seconds = round(time.time() - started, 2)
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ingest tài liệu (markdown / PDF / text) vào vector store.")
+    parser.add_argument('path', help="Thư mục hoặc file cần ingest")
+    parser.add_argument('--collection', default=DEFAULT_COLLECTION)
+    parser.add_argument('--chunk-size', type=int, default=RAG_INGEST_CHUNK_SIZE)
+    parser.add_argument('--chunk-overlap', type=int, default=RAG_INGEST_CHUNK_OVERLAP)
+    parser.add_argument('--full', action='store_true', help="Embed và upsert lại toàn bộ chunk")
+    parser.add_argument('--no-prune', action='store_true', help="Không xóa chunk của file đã bị xóa khỏi thư mục")
+    args = parser.parse_args(argv)
+
+    report = ingest_path(
+        args.path, collection_name=args.collection, prune=not args.no_prune, full=args.full,
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    )
+    print(
+        f"✅ [INGEST] {report.files_total} file ({report.files_skipped} không đổi, {report.files_removed} đã xóa), "
+        f"{report.chunks_upserted} chunk upsert, {report.chunks_deleted} chunk xóa trong {report.seconds}s"
+    )
+    for error in report.errors:
+        print(f"   ❌ {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Knowledge của từng project (biên bản họp, transcript, task) trong vector store:
+mỗi project một collection, mỗi entity (meeting / task) là một nhóm chunk có chung `entity_key`.
+Server gọi index_entities() khi drain hàng đợi thay đổi (CDC), PM agent search collection này cùng ProjectDocuments.
+"""
+import os
+import re
+import uuid
+from typing import Dict, List, Optional
+
+from ..shared import sha256_text
+from .backends import RetrieverBackend, get_backend
+from .ingestion import embed_objects
+from .versions import bump_collection_version
+
+# Cấu hình (có thể đổi qua biến môi trường)
+RAG_KNOWLEDGE_CHUNK_SIZE = int(os.environ.get('RAG_KNOWLEDGE_CHUNK_SIZE', '1000'))
+RAG_KNOWLEDGE_CHUNK_OVERLAP = int(os.environ.get('RAG_KNOWLEDGE_CHUNK_OVERLAP', '100'))
+
+PROJECT_COLLECTION_PREFIX = 'ProjectKnowledge_'
+ENTITY_MEETING = 'meeting'
+ENTITY_TASK = 'task'
+
+_KNOWLEDGE_NAMESPACE = uuid.UUID('0c1f2a47-3b6e-4d59-8e27-6a9d4f1b2c83')
+
+
+def project_collection_name(project_id: str) -> str:
+    """Tên collection của project (Weaviate chỉ cho phép chữ, số và '_')."""
+    return PROJECT_COLLECTION_PREFIX + re.sub(r'[^0-9A-Za-z_]', '_', str(project_id))
+
+
+def entity_key(entity_type: str, entity_id: str) -> str:
+    return f"{entity_type}:{entity_id}"
+
+
+def _split(text: str) -> List[str]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=RAG_KNOWLEDGE_CHUNK_SIZE, chunk_overlap=RAG_KNOWLEDGE_CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+    return [chunk.strip() for chunk in splitter.split_text(text or '') if chunk.strip()]
+
+
+def _object(key: str, content: str, properties: dict) -> dict:
+    return {
+        'uuid': str(uuid.uuid5(_KNOWLEDGE_NAMESPACE, f"{key}:{sha256_text(content)}")),
+        'properties': {'content': content, 'entity_key': key, **properties},
+    }
+
+
+def meeting_objects(meeting: dict) -> List[dict]:
+    """
+    meeting: {'id', 'project_id', 'title', 'date', 'summary', 'transcript'}
+    -> chunk của biên bản và transcript; mỗi chunk có tiêu đề + ngày họp để embedding mang ngữ cảnh.
+    """
+    key = entity_key(ENTITY_MEETING, meeting['id'])
+    header = f"Cuộc họp: {meeting.get('title') or ''} ({meeting.get('date') or ''})"
+    base = {
+        'entity_type': ENTITY_MEETING, 'entity_id': meeting['id'], 'project_id': meeting['project_id'],
+        'title': meeting.get('title') or '', 'date': meeting.get('date') or '', 'source': key,
+    }
+    objects = []
+    for section, label in (('summary', 'Biên bản'), ('transcript', 'Transcript')):
+        for chunk in _split(meeting.get(section)):
+            objects.append(_object(key, f"{header}\n{label}: {chunk}", {**base, 'section': section}))
+    return objects
+
+
+def task_objects(task: dict) -> List[dict]:
+    """task: {'id', 'project_id', 'title', 'description', 'status', 'priority', 'assignee', 'due_date'} -> một chunk."""
+    key = entity_key(ENTITY_TASK, task['id'])
+    lines = [f"Task: {task.get('title') or ''}"]
+    for label, field in (('Mô tả', 'description'), ('Trạng thái', 'status'), ('Độ ưu tiên', 'priority'),
+                         ('Người thực hiện', 'assignee'), ('Hạn', 'due_date')):
+        if task.get(field):
+            lines.append(f"{label}: {task[field]}")
+    return [_object(key, "\n".join(lines), {
+        'entity_type': ENTITY_TASK, 'entity_id': task['id'], 'project_id': task['project_id'],
+        'title': task.get('title') or '', 'date': task.get('due_date') or '', 'source': key,
+        'section': 'task', 'status': task.get('status') or '',
+    })]
+
+
+def index_entities(project_id: str, upserts: List[dict], delete_keys: List[str],
+                   backend: Optional[RetrieverBackend] = None) -> Dict[str, int]:
+    """
+    Cập nhật collection của project trong một lượt:
+        upserts     - object đã dựng bằng meeting_objects()/task_objects() (entity cũ cùng key bị thay thế)
+        delete_keys - entity_key của entity đã xóa hoặc không còn nội dung
+    """
+    backend = backend or get_backend()
+    collection_name = project_collection_name(project_id)
+    backend.ensure_collection(collection_name)
+
+    keys = sorted(set(delete_keys) | {obj['properties']['entity_key'] for obj in upserts})
+    deleted = backend.delete_by_property(collection_name, 'entity_key', keys) if keys else 0
+    if upserts:
+        embed_objects(upserts)
+        backend.upsert(collection_name, upserts)
+
+    bump_collection_version(collection_name)
+    return {'upserted': len(upserts), 'deleted': deleted or 0}
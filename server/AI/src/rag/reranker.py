@@ -0,0 +1,143 @@
+"""
+Rerank cục bộ bằng cross-encoder nhỏ chạy trên CPU (không cần module reranker của Weaviate):
+backend lấy dư ứng viên từ hybrid search, cross-encoder chấm điểm (query, content) theo batch rồi giữ top_k.
+
+Chọn qua biến môi trường RAG_RERANKER:
+    local     - cross-encoder trong process (mặc định)
+    weaviate  - module reranker-transformers của Weaviate (chỉ backend weaviate)
+    none      - giữ thứ tự hybrid
+"""
+import os
+import threading
+import time
+from typing import List, Optional
+
+# Cấu hình (có thể đổi qua biến môi trường)
+RAG_RERANKER = os.environ.get('RAG_RERANKER', 'local').lower()
+RAG_RERANKER_MODEL = os.environ.get('RAG_RERANKER_MODEL', 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1')  # đa ngôn ngữ
+RAG_RERANKER_MAX_CANDIDATES = int(os.environ.get('RAG_RERANKER_MAX_CANDIDATES', '30'))  # số hit tối đa được chấm
+RAG_RERANKER_OVERFETCH = int(os.environ.get('RAG_RERANKER_OVERFETCH', '4'))             # lấy top_k * N hit để rerank
+RAG_RERANKER_BATCH = int(os.environ.get('RAG_RERANKER_BATCH', '16'))                    # số cặp mỗi lần forward
+RAG_RERANKER_MAX_LENGTH = int(os.environ.get('RAG_RERANKER_MAX_LENGTH', '512'))         # token (query + content)
+RAG_RERANKER_THREADS = int(os.environ.get('RAG_RERANKER_THREADS', '0'))                 # 0 = mặc định của torch
+
+
+def candidate_count(top_k: int) -> int:
+    """Số hit hybrid cần lấy để rerank còn đủ top_k."""
+    return max(top_k, min(top_k * RAG_RERANKER_OVERFETCH, RAG_RERANKER_MAX_CANDIDATES))
+
+
+class CrossEncoderReranker:
+    """
+    Cross-encoder (transformers, CPU) load lazy một lần cho cả process.
+    Mỗi lần chỉ một request được chạy model (lock) để các request đồng thời không tranh CPU lẫn nhau.
+    """
+
+    def __init__(self, model_name: str = RAG_RERANKER_MODEL, batch_size: int = RAG_RERANKER_BATCH,
+                 max_length: int = RAG_RERANKER_MAX_LENGTH, max_candidates: int = RAG_RERANKER_MAX_CANDIDATES,
+                 num_threads: int = RAG_RERANKER_THREADS):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.max_candidates = max(1, max_candidates)
+        self.num_threads = num_threads
+
+        self._model = None
+        self._tokenizer = None
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.pairs_scored = 0
+        self.total_seconds = 0.0
+
+    def _load(self) -> bool:
+        if self._model is not None or self._load_failed:
+            return self._model is not None
+        try:
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            print(f"  📥 Loading reranker '{self.model_name}' (cpu)...")
+            started = time.time()
+            if self.num_threads > 0:
+                torch.set_num_threads(self.num_threads)
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+            print(f"  ✅ Reranker loaded in {time.time() - started:.1f}s")
+        except Exception as e:
+            # Không có model / thư viện thì vẫn trả kết quả hybrid, chỉ cảnh báo một lần
+            self._load_failed = True
+            print(f"⚠️ [RAG] Không load được reranker, dùng thứ tự hybrid: {e}")
+        return self._model is not None
+
+    def score(self, query: str, passages: List[str]) -> Optional[List[float]]:
+        """Điểm liên quan của từng passage (cao hơn = liên quan hơn). None nếu reranker không khả dụng."""
+        with self._lock:
+            if not self._load():
+                return None
+            import torch
+
+            started = time.time()
+            scores: List[float] = []
+            with torch.inference_mode():
+                for start in range(0, len(passages), self.batch_size):
+                    batch = passages[start:start + self.batch_size]
+                    inputs = self._tokenizer([query] * len(batch), batch, padding=True, truncation='only_second',
+                                             max_length=self.max_length, return_tensors='pt')
+                    logits = self._model(**inputs).logits
+                    # Model 1 output: logit liên quan; model 2 lớp: lấy lớp "relevant"
+                    scores.extend((logits[:, -1] if logits.shape[-1] > 1 else logits.squeeze(-1)).tolist())
+
+            self.calls += 1
+            self.pairs_scored += len(passages)
+            self.total_seconds += time.time() - started
+            return scores
+
+    def rerank(self, query: str, results, top_k: int):
+        """
+        Sắp lại results.objects theo cross-encoder và giữ top_k (tối đa max_candidates hit đầu được chấm).
+        Điểm được ghi vào metadata.rerank_score như reranker của Weaviate.
+        """
+        if results is None or not results.objects:
+            return results
+        candidates = results.objects[:self.max_candidates]
+        scores = self.score(query, [str(obj.properties.get('content') or '') for obj in candidates])
+        if scores is None:
+            results.objects = results.objects[:top_k]
+            return results
+
+        ranked = sorted(zip(scores, range(len(candidates))), key=lambda pair: pair[0], reverse=True)
+        objects = []
+        for score, index in ranked[:top_k]:
+            obj = candidates[index]
+            try:
+                obj.metadata.rerank_score = score
+            except AttributeError:
+                pass
+            objects.append(obj)
+        results.objects = objects
+        return results
+
+    def stats(self) -> dict:
+        return {
+            'model': self.model_name,
+            'loaded': self._model is not None,
+            'calls': self.calls,
+            'pairs_scored': self.pairs_scored,
+            'avg_ms': round(self.total_seconds * 1000 / self.calls, 1) if self.calls else 0.0,
+        }
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Cross-encoder dùng chung trong process."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
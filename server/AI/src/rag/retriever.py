@@ -1,8 +1,8 @@
-from tomlkit import item
-import weaviate
-from weaviate.classes.query import Rerank, Filter, MetadataQuery
+from types import SimpleNamespace
 from typing import List, Dict, Optional
 
+from .backends import get_backend
+
         
 def retrieve(
     query: str,
@@ -13,6 +13,7 @@ def retrieve(
     use_reranker: bool = False) -> Dict:
     """
     Perform hybrid search (keyword + vector) with optional reranking and filtering.
+    Backend (Weaviate server hoặc index nhúng) chọn theo RAG_BACKEND.
     
     Args:
         query: The search query string
@@ -20,49 +21,34 @@ def retrieve(
         metadata: Optional metadata filter as a dictionary
         top_k: Number of results to return
         alpha: Weighting for hybrid search (0 = keyword, 1 = vector)
-        use_reranker: Whether to use Weaviate's reranker module
+        use_reranker: Whether to rerank the hybrid hits (RAG_RERANKER: local cross-encoder / weaviate / none)
     """
-    client = weaviate.connect_to_local(
-        port=8080, 
-        grpc_port=50051
-    )
-        
-    collection = client.collections.get(collection_name)
-    
-    # Construct filter
-    if metadata:
-        filter_list = []
-        for key, value in metadata.items():
-            filter_list.append(Filter.by_property(key).contains_any([value]))
-    
-        search_filter = Filter.any_of(filter_list)   
-    
-    # Perform hybrid search        
-    try:
-        results = collection.query.hybrid(
-            query=query,
-            filters=search_filter if metadata else None,
-            alpha=alpha,
-            limit=top_k,
-            rerank=Rerank(
-                prop="content",
-                query=query
-            ) if use_reranker else None,
-            return_metadata=MetadataQuery(score=True, distance=True)
-        )
-        client.close()
-        return results
-    
-    except Exception as e:
-        print(f"Error during retrieval: {e}")
-        client.close()
-        return None
+    return get_backend().search(query, collection_name, metadata, top_k, alpha, use_reranker)
+
+
+async def aretrieve(
+    query: str,
+    collection_name: str,
+    metadata: Optional[str] = None,
+    top_k: int = 15,
+    alpha: float = 0.5,
+    use_reranker: bool = False) -> Dict:
+    """Bản async của retrieve() (Weaviate dùng async client, không chiếm thread)."""
+    return await get_backend().asearch(query, collection_name, metadata, top_k, alpha, use_reranker)
+
+def merge_results(*results):
+    """Gộp kết quả của nhiều collection (bỏ qua None) thành một kết quả cùng dạng (.objects)."""
+    return SimpleNamespace(objects=[obj for result in results if result is not None for obj in result.objects])
+
+
+NO_DOCUMENTS_FOUND = "No relevant documents found."
+
 
 def format_retrieved_documents(results) -> str:
     """Format Weaviate objects into structured string for LLM context."""
     
     if results is None or not results.objects:
-        return "No relevant documents found."
+        return NO_DOCUMENTS_FOUND
     
     formatted_docs = []
     
@@ -0,0 +1,23 @@
+"""
+Version của các collection trong vector DB: mỗi lần dữ liệu thay đổi (ingest, xóa, cập nhật) thì bump,
+các cache phụ thuộc vào nội dung collection (ví dụ semantic answer cache) so version để tự vô hiệu hoá
+"""
+import os
+import time
+
+from ..shared import SqliteCache, AI_CACHE_DIR
+
+# Lưu trên disk để các process khác (API, worker, CLI ingest) cùng thấy
+_versions = SqliteCache(os.path.join(AI_CACHE_DIR, 'rag_versions.sqlite'), name='rag_versions')
+
+
+def get_collection_version(collection_name: str) -> str:
+    """Version hiện tại của collection ('0' nếu chưa từng bump)."""
+    return _versions.get_text(collection_name) or '0'
+
+
+def bump_collection_version(collection_name: str) -> str:
+    """Đánh dấu collection đã thay đổi. Trả về version mới."""
+    version = f"{time.time_ns()}"
+    _versions.set_text(collection_name, version)
+    return version
@@ -0,0 +1,4 @@
+from .hashing import sha256_file, sha256_text
+from .sqlite_cache import SqliteCache, AI_CACHE_DIR
+
+__all__ = ['sha256_file', 'sha256_text', 'SqliteCache', 'AI_CACHE_DIR']
@@ -0,0 +1,18 @@
+"""
+Hashing helpers dùng làm key cho các cache theo nội dung (content-addressed)
+"""
+import hashlib
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 của file, đọc theo chunk để không nạp cả file vào RAM."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    """SHA-256 của chuỗi (UTF-8)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,195 @@
+"""
+Persistent key-value cache trên SQLite với giới hạn LRU (số entry / dung lượng), TTL và thống kê hit/miss.
+Dùng chung cho transcript cache, LLM cache, embedding cache...
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Thư mục chứa các file cache (có thể đổi qua biến môi trường)
+AI_CACHE_DIR = os.environ.get('AI_CACHE_DIR', os.path.join(os.getcwd(), '.cache', 'ai'))
+
+
+class SqliteCache:
+    """
+    Cache key -> bytes lưu trong một file SQLite.
+
+    - LRU: mỗi lần đọc cập nhật `accessed_at`; khi vượt `max_entries`/`max_bytes` thì xóa entry cũ nhất.
+    - TTL: entry quá `ttl_seconds` kể từ lúc ghi được coi như miss và bị xóa.
+    - An toàn giữa nhiều thread (một connection + lock) và nhiều process (WAL + busy_timeout).
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, name: Optional[str] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.name = name or os.path.splitext(os.path.basename(path))[0]
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    # ==================== CONNECTION ====================
+
+    def _connect(self) -> sqlite3.Connection:
+        """Mở connection lần đầu dùng (lazy) để import module không tạo file."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache(accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    # ==================== CORE API ====================
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                conn.commit()
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), now, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Đọc nhiều key trong một transaction. Trả về {key: value} của các key hit."""
+        found: Dict[str, bytes] = {}
+        if not keys:
+            return found
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, value, created_at in conn.execute(
+                    f"SELECT key, value, created_at FROM cache WHERE key IN ({placeholders})", batch
+                ):
+                    if self.ttl_seconds is None or now - created_at <= self.ttl_seconds:
+                        found[key] = value
+            if found:
+                conn.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?", [(now, key) for key in found])
+                conn.commit()
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        """Ghi nhiều entry trong một transaction (evict một lần)."""
+        if not items:
+            return
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [(key, sqlite3.Binary(value), len(value), now, now) for key, value in items.items()]
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache")
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Xóa entry hết hạn, sau đó xóa entry ít dùng gần đây nhất cho đến khi dưới giới hạn."""
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        if self.max_entries is None and self.max_bytes is None:
+            return
+
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        if self.max_entries is not None and count > self.max_entries:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+
+        if self.max_bytes is not None and total > self.max_bytes:
+            for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                total -= size
+
+    # ==================== HELPERS ====================
+
+    def get_text(self, key: str) -> Optional[str]:
+        value = self.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set_text(self, key: str, value: str) -> None:
+        self.set(key, value.encode("utf-8"))
+
+    def get_json(self, key: str) -> Any:
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value: Any) -> None:
+        self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Thống kê hit/miss (trong process hiện tại) và kích thước cache."""
+        with self._lock:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
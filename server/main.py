@@ -4,8 +4,13 @@ from fastapi.staticfiles import StaticFiles # Import cái này
 # --- API Router ---
 from src.api import router as api_router
 
+# --- Realtime (Socket.IO) ---
+from src.realtime.main_socket import get_socketio_app
+
 # --- Database ---
-from src.core.database import create_db_tables
+from src.core.database import create_db_tables, SessionLocal
+from src.services.meeting_service import migrate_legacy_recordings, RECORDINGS_DIR
+from src.core.rag_indexer import register_rag_index_listeners
 
 app = FastAPI(title="JiraMeet API")
 
@@ -29,6 +34,8 @@ app.add_middleware(
 # --- Include API Routers ---
 app.include_router(api_router, prefix="/api")
 app.mount("/static", StaticFiles(directory="static"), name="static")
+# Socket.IO: client kết nối với path "/ws/socket.io"
+app.mount("/ws", get_socketio_app())
 
 
 # --- Health Check ---
@@ -46,6 +53,29 @@ def on_startup():
         print("Database tables created successfully or already exist.")
     except Exception as e:
         print(f"❌ Error creating database tables: {e}")
+    # Ghi outbox RAG khi Meeting/Task thay đổi (worker index theo batch)
+    register_rag_index_listeners()
+    # File ghi hình cũ nằm trong /static (ai cũng tải được) -> chuyển sang thư mục riêng
+    db = SessionLocal()
+    try:
+        moved = migrate_legacy_recordings(db)
+        if moved:
+            print(f"📦 Moved {moved} recording(s) out of static/ into {RECORDINGS_DIR}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error migrating recordings: {e}")
+    finally:
+        db.close()
+
+
+# --- Shutdown Event (Đóng kết nối Weaviate dùng chung) ---
+@app.on_event("shutdown")
+async def on_shutdown():
+    try:
+        from AI.src.rag.client import get_weaviate_manager
+    except ImportError:
+        return
+    await get_weaviate_manager().aclose()
 
 
 # --- Run server locally ---
@@ -1,6 +1,9 @@
 # src/api/v1/ai_router.py
 
+import asyncio
+import json
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -11,10 +14,11 @@ from src.schemas import meeting as meeting_schemas
 from src.schemas import task as task_schemas
 from src.schemas import user as user_schemas
 from src.services.ai_service import AIService 
+from src.repositories.project_repository import ProjectRepository
 
 # Import Agent
 try:
-    from AI.src.agents.project_manager.agent import ProjectManagerAgent
+    from AI.src.agents.project_manager.agent import get_project_manager_agent
     agent_available = True
 except ImportError:
     agent_available = False
@@ -30,6 +34,14 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
+def _ensure_project_member(db: Session, project_id: Optional[str], user_id: str):
+    """Agent tra cứu biên bản họp / task của project -> chỉ thành viên project được hỏi."""
+    if not project_id:
+        return
+    project = ProjectRepository(db).get_by_id(project_id)
+    if not project or user_id not in [m.id for m in project.members]:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this project.")
+
 # 1. Endpoint Chat (Dùng ProjectManagerAgent - Thông minh hơn)
 @router.post("/chat", response_model=ChatResponse)
 async def chat_with_ai_agent(
@@ -37,6 +49,7 @@ async def chat_with_ai_agent(
     current_user: user_schemas.UserOut = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    _ensure_project_member(db, request.project_id, str(current_user.id))
     if not agent_available:
         # Fallback về AIService đơn giản nếu Agent lỗi
         service = AIService(db)
@@ -44,17 +57,76 @@ async def chat_with_ai_agent(
         return {"response": resp}
 
     try:
-        agent = ProjectManagerAgent(current_user_id=current_user.id)
-        response_text = agent.run(
+        # Agent dùng chung (không tạo lại LLM clients/graph mỗi request); chạy trong thread để không chặn event loop
+        agent = get_project_manager_agent()
+        response_text = await asyncio.to_thread(
+            agent.run,
             message=request.message,
             project_id=request.project_id,
-            user_id=str(current_user.id)
+            user_id=str(current_user.id),
+            thread_id=request.thread_id
         )
         return {"response": response_text}
     except Exception as e:
         print(f"Agent Error: {e}")
         return {"response": "Xin lỗi, tôi đang gặp sự cố kết nối."}
 
+def _sse(event: dict) -> str:
+    """Định dạng một sự kiện Server-Sent Events."""
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+# 1b. Endpoint Chat dạng stream (SSE): route -> tool progress -> token -> done
+@router.post("/chat/stream")
+async def stream_chat_with_ai_agent(
+    request: ChatRequest,
+    current_user: user_schemas.UserOut = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    _ensure_project_member(db, request.project_id, str(current_user.id))
+
+    async def event_stream():
+        if not agent_available:
+            service = AIService(db)
+            resp = await asyncio.to_thread(service.get_chat_response, request.message, str(current_user.id))
+            yield _sse({"type": "done", "response": resp})
+            return
+
+        agent = get_project_manager_agent()
+        async for event in agent.astream(
+            message=request.message,
+            project_id=request.project_id,
+            user_id=str(current_user.id),
+            thread_id=request.thread_id
+        ):
+            yield _sse(event)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # tắt buffer của proxy (nginx)
+    )
+
+# Thống kê LLM cache, embedding cache và semantic answer cache (hit rate trong process API)
+@router.get("/cache-stats")
+def get_ai_cache_stats(current_user: user_schemas.UserOut = Depends(get_current_user)):
+    try:
+        from AI.src.models.llm_cache import llm_cache_stats
+        from AI.src.models.embeddings import embedding_stats
+    except ImportError:
+        raise HTTPException(status_code=503, detail="AI module không khả dụng.")
+    stats = {"llm": llm_cache_stats(), "embeddings": embedding_stats()}
+    answer_cache = get_project_manager_agent().answer_cache if agent_available else None
+    if answer_cache is not None:
+        stats["semantic"] = answer_cache.stats()
+    return stats
+
+# Thống kê router cục bộ: tỉ lệ không cần LLM và tỉ lệ đồng thuận với LLM router
+@router.get("/router-stats")
+def get_ai_router_stats(current_user: user_schemas.UserOut = Depends(get_current_user)):
+    if not agent_available:
+        raise HTTPException(status_code=503, detail="AI module không khả dụng.")
+    return get_project_manager_agent().intent_classifier.stats()
+
 # 2. Endpoint Xử lý Meeting (Dùng AIService - Chuyên dụng)
 @router.post("/meeting/{meeting_id}/process-transcript", response_model=List[task_schemas.TaskOut])
 def process_transcript_and_get_tasks(
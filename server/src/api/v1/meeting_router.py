@@ -1,113 +1,79 @@
 import shutil
 import os
 from urllib.parse import urlparse # Cần cái này để parse URL
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Request, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import joinedload  # <--- Thêm cái này
 # --- Core Imports ---
 from src.core.database import get_db
-from src.core.security import get_current_user
+from src.core.security import get_current_user, get_current_user_for_media
+from src.core.range_response import RangeFileResponse
 from src.schemas import meeting as meeting_schemas
 from src.schemas import user as user_schemas
-from src.services.meeting_service import MeetingService 
+from src.schemas import analysis_job as analysis_job_schemas
+from src.schemas import transcript as transcript_schemas
+from src.services.meeting_service import MeetingService, RECORDINGS_DIR, recording_file_path, recording_url
+from src.services.transcript_service import TranscriptService
+from src.services.analysis_job_service import AnalysisJobService, ENQUEUE_QUEUED, ENQUEUE_ATTACHED, ENQUEUE_REUSED
 from src.models.meeting import Meeting
 from src.models.user import User
 
-# --- AI AGENT IMPORT ---
-# Lưu ý: Đảm bảo folder AI nằm trong server và có __init__.py
-try:
-    from AI.src.agents.meeting_to_task.agent import MeetingToTaskAgent
-    print("✅ AI Agent imported successfully")
-    AI_AVAILABLE = True
-    # Khởi tạo Agent 1 lần để dùng chung
-    meeting_agent = MeetingToTaskAgent()
-except ImportError as e:
-    print(f"⚠️ Warning: Could not import AI Agent. AI features will be disabled. Error: {e}")
-    AI_AVAILABLE = False
-    meeting_agent = None
-
 router = APIRouter()
 
-# --- Background Task Function ---
-def _run_ai_analysis_task(meeting_id: str, db: Session):
-    """Chạy AI Agent ngầm để không chặn API"""
-    if not AI_AVAILABLE or not meeting_agent:
-        print("❌ AI Agent not available.")
-        return
-
-    print(f"\n🚀 [AI TASK] Starting analysis for Meeting ID: {meeting_id}")
-    try:
-        meeting = db.query(Meeting).filter(Meeting.id == meeting_id).first()
-        if not meeting or not meeting.recording_url:
-            print("❌ Error: No recording URL found.")
-            return
-
-        # Convert URL http://localhost:8000/static/... -> static/...
-        parsed_url = urlparse(meeting.recording_url)
-        audio_path = parsed_url.path.lstrip('/')
-        
-        # Kiểm tra file tồn tại
-        if not os.path.exists(audio_path):
-            print(f"❌ Error: File not found at {audio_path}")
-            return
-
-        # Lấy thông tin người tham gia
-        participants_info = []
-        if meeting.attendees:
-            # Giả sử attendees là list ID hoặc JSON string
-            # Logic lấy user từ DB...
-            pass 
-
-        metadata = {
-            "title": meeting.title,
-            "id": meeting.id,
-            "project_id": meeting.project_id,
-            "date": str(meeting.start_date)
-        }
-
-        # --- GỌI AI AGENT ---
-        print("🤖 AI is processing audio...")
-        # Giả định hàm run trả về dict kết quả
-        result, _ = meeting_agent.run(
-            audio_file_path=audio_path,
-            meeting_metadata=metadata,
-            thread_id=meeting_id
-        )
-        
-        # --- LƯU KẾT QUẢ ---
-        if result:
-            meeting.transcript = result.get("transcript", "")
-            meeting.ai_summary = result.get("mom", "") # Minutes of Meeting
-            # meeting.tasks = result.get("tasks", []) # Nếu có
-            
-            db.commit()
-            print(f"✅ [AI TASK] Analysis complete for {meeting_id}")
-        else:
-            print("⚠️ [AI TASK] AI returned no results.")
-
-    except Exception as e:
-        print(f"❌ [AI TASK] Exception: {e}")
-    finally:
-        db.close()
-
 # --- Endpoints ---
 
 @router.post("/{meeting_id}/analyze")
-async def analyze_meeting(
+def analyze_meeting(
     meeting_id: str, 
-    background_tasks: BackgroundTasks, # <-- Đã thêm import này
+    force: bool = False, # True -> phân tích lại dù đã có kết quả cho file ghi hình này
+    current_user: user_schemas.UserOut = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """API Trigger AI phân tích"""
-    meeting = db.query(Meeting).filter(Meeting.id == meeting_id).first()
-    if not meeting:
-        raise HTTPException(status_code=404, detail="Meeting not found")
+    """API Trigger AI phân tích (đưa vào hàng đợi, worker `python worker.py` xử lý)"""
+    service = AnalysisJobService(db)
+    job, outcome = service.enqueue_analysis(meeting_id, current_user.id, force=force)
     
-    # Đẩy vào background chạy
-    background_tasks.add_task(_run_ai_analysis_task, meeting_id, next(get_db()))
-    
-    return {"message": "AI analysis started in background", "status": "processing"}
+    messages = {
+        ENQUEUE_QUEUED: "AI analysis queued",
+        ENQUEUE_ATTACHED: "AI analysis already in progress for this recording",
+        ENQUEUE_REUSED: "AI analysis already completed for this recording",
+    }
+    return {"message": messages[outcome], "status": job.status, "job_id": job.id, "deduplicated": outcome != ENQUEUE_QUEUED}
+
+@router.get("/{meeting_id}/analysis", response_model=analysis_job_schemas.AnalysisJobOut)
+def get_meeting_analysis(
+    meeting_id: str,
+    current_user: user_schemas.UserOut = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Trạng thái job phân tích AI gần nhất của cuộc họp"""
+    service = AnalysisJobService(db)
+    return service.get_analysis_status(meeting_id, current_user.id)
+
+@router.get("/{meeting_id}/transcript", response_model=transcript_schemas.TranscriptPage)
+def read_meeting_transcript(
+    meeting_id: str,
+    start_ms: Optional[int] = Query(None, ge=0, description="Seek: lấy các đoạn từ mốc thời gian này (ms)"),
+    end_ms: Optional[int] = Query(None, ge=0),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+    current_user: user_schemas.UserOut = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Transcript có timestamp, phân trang và lọc theo khoảng thời gian"""
+    service = TranscriptService(db)
+    return service.get_segments(meeting_id, current_user.id, start_ms, end_ms, skip, limit)
+
+@router.get("/{meeting_id}/transcript/text", response_model=transcript_schemas.TranscriptText)
+def read_meeting_transcript_text(
+    meeting_id: str,
+    current_user: user_schemas.UserOut = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Transcript đầy đủ (ghép từ các segment)"""
+    service = TranscriptService(db)
+    return service.get_full_text(meeting_id, current_user.id)
 
 # ... (Các API create, get, upload giữ nguyên như cũ) ...
 @router.post("/{meeting_id}/recording")
@@ -116,22 +82,40 @@ def upload_meeting_recording(meeting_id: str, file: UploadFile = File(...), db:
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
 
-    os.makedirs("static/recordings", exist_ok=True)
-    file_location = f"static/recordings/{meeting_id}.webm"
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    file_location = recording_file_path(meeting_id)
+    tmp_location = f"{file_location}.uploading"
     
     try:
-        with open(file_location, "wb") as buffer:
+        # Ghi ra file tạm rồi os.replace -> người đang xem không đọc phải file ghi dở, ETag đổi ngay
+        with open(tmp_location, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
+        os.replace(tmp_location, file_location)
     except Exception as e:
         print(e)
+        if os.path.exists(tmp_location):
+            os.remove(tmp_location)
         raise HTTPException(status_code=500, detail="Could not save file")
 
-    full_url = f"http://localhost:8000/{file_location}"
+    # Không trả link /static: file chỉ tải được qua endpoint stream có kiểm tra quyền
+    full_url = recording_url(meeting_id)
     meeting.recording_url = full_url
     db.commit()
     db.refresh(meeting)
     return {"message": "Upload successful", "url": full_url}
 
+@router.get("/{meeting_id}/recording")
+def stream_meeting_recording(
+    meeting_id: str,
+    request: Request,
+    current_user: user_schemas.UserOut = Depends(get_current_user_for_media),
+    db: Session = Depends(get_db)
+):
+    """Stream file ghi hình: hỗ trợ Range (seek), ETag/If-None-Match và Cache-Control."""
+    service = MeetingService(db)
+    path = service.get_recording_path(meeting_id, current_user.id)
+    return RangeFileResponse(path, request, media_type="video/webm")
+
 # ... (Giữ nguyên các API create, get list) ...
 @router.get("/{project_id}", response_model=List[meeting_schemas.MeetingOut])
 def read_meetings_by_project(project_id: str, current_user: user_schemas.UserOut = Depends(get_current_user), db: Session = Depends(get_db)):
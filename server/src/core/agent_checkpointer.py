@@ -0,0 +1,307 @@
+# src/core/agent_checkpointer.py
+
+import asyncio
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    WRITES_IDX_MAP,
+    get_checkpoint_id,
+)
+
+from src.core.database import SessionLocal
+from src.models.agent_checkpoint import AgentCheckpoint, AgentCheckpointWrite, AgentBlob
+
+# --- Cấu hình (qua biến môi trường) ---
+AGENT_CHECKPOINT_TTL_HOURS = float(os.getenv("AGENT_CHECKPOINT_TTL_HOURS", "72"))   # review bị bỏ dở quá N giờ -> xóa
+AGENT_BLOB_MIN_CHARS = int(os.getenv("AGENT_BLOB_MIN_CHARS", "1024"))              # chuỗi ngắn hơn thì lưu inline
+
+# Marker thay cho giá trị được lưu theo tham chiếu
+_BLOB_REF_KEY = "__blob_sha256__"
+
+
+class DatabaseCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer LangGraph lưu trong database của hệ thống (thay cho MemorySaver).
+
+    - Thread đang chờ human review sống sót qua restart/deploy, RAM không tăng theo số thread.
+    - Các channel lớn (mặc định 'transcript') được lưu một lần vào bảng agent_blobs theo SHA-256;
+      checkpoint chỉ giữ tham chiếu nên mỗi bước của graph không chép lại cả transcript.
+    - prune() xóa các thread không có checkpoint mới trong `ttl_hours` (review bị bỏ dở).
+    """
+
+    def __init__(self, session_factory=SessionLocal, ref_channels: Sequence[str] = ("transcript",),
+                 ttl_hours: float = AGENT_CHECKPOINT_TTL_HOURS):
+        super().__init__()
+        self.session_factory = session_factory
+        self.ref_channels = set(ref_channels)
+        self.ttl_hours = ttl_hours
+
+    @contextmanager
+    def _session(self):
+        db = self.session_factory()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # ==================== BLOB REFERENCES ====================
+
+    def _store_blob(self, sha256: str, value: str):
+        """Lưu blob (nếu chưa có) hoặc cập nhật last_used_at."""
+        with self._session() as db:
+            blob = db.get(AgentBlob, sha256)
+            if blob:
+                blob.last_used_at = datetime.utcnow()
+                return
+            db.add(AgentBlob(sha256=sha256, value=value))
+            try:
+                db.flush()
+            except IntegrityError:
+                # Thread khác vừa lưu cùng nội dung
+                db.rollback()
+
+    def _to_ref(self, value: Any) -> Any:
+        if not isinstance(value, str) or len(value) < AGENT_BLOB_MIN_CHARS:
+            return value
+        sha256 = hashlib.sha256(value.encode("utf-8")).hexdigest()
+        self._store_blob(sha256, value)
+        return {_BLOB_REF_KEY: sha256}
+
+    def _from_ref(self, db, value: Any) -> Any:
+        if isinstance(value, dict) and len(value) == 1 and _BLOB_REF_KEY in value:
+            blob = db.get(AgentBlob, value[_BLOB_REF_KEY])
+            if blob is None:
+                raise KeyError(f"Agent blob {value[_BLOB_REF_KEY]} not found (đã bị prune?)")
+            return blob.value
+        return value
+
+    def _dehydrate(self, checkpoint: Checkpoint) -> Checkpoint:
+        values = checkpoint.get("channel_values") or {}
+        refs = {channel: self._to_ref(values[channel]) for channel in self.ref_channels if channel in values}
+        if not refs:
+            return checkpoint
+        return {**checkpoint, "channel_values": {**values, **refs}}
+
+    def _hydrate(self, db, checkpoint: Checkpoint) -> Checkpoint:
+        values = checkpoint.get("channel_values") or {}
+        for channel in self.ref_channels:
+            if channel in values:
+                values[channel] = self._from_ref(db, values[channel])
+        return checkpoint
+
+    # ==================== SERIALIZATION ====================
+
+    def _dumps(self, value: Any) -> Tuple[str, bytes]:
+        return self.serde.dumps_typed(value)
+
+    def _loads(self, type_: Optional[str], data: Optional[bytes]) -> Any:
+        if data is None:
+            return None
+        return self.serde.loads_typed((type_, bytes(data)))
+
+    def _to_tuple(self, db, row: AgentCheckpoint) -> CheckpointTuple:
+        writes = db.query(AgentCheckpointWrite)\
+                   .filter(AgentCheckpointWrite.thread_id == row.thread_id,
+                           AgentCheckpointWrite.checkpoint_ns == row.checkpoint_ns,
+                           AgentCheckpointWrite.checkpoint_id == row.checkpoint_id)\
+                   .order_by(AgentCheckpointWrite.task_id, AgentCheckpointWrite.idx)\
+                   .all()
+        pending_writes = [
+            (
+                w.task_id,
+                w.channel,
+                self._from_ref(db, self._loads(w.type, w.value)) if w.channel in self.ref_channels
+                else self._loads(w.type, w.value),
+            )
+            for w in writes
+        ]
+
+        parent_config = None
+        if row.parent_checkpoint_id:
+            parent_config = {"configurable": {
+                "thread_id": row.thread_id,
+                "checkpoint_ns": row.checkpoint_ns,
+                "checkpoint_id": row.parent_checkpoint_id,
+            }}
+
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": row.thread_id,
+                "checkpoint_ns": row.checkpoint_ns,
+                "checkpoint_id": row.checkpoint_id,
+            }},
+            checkpoint=self._hydrate(db, self._loads(row.type, row.checkpoint)),
+            metadata=self._loads(row.metadata_type, row.checkpoint_metadata) or {},
+            parent_config=parent_config,
+            pending_writes=pending_writes,
+        )
+
+    # ==================== BaseCheckpointSaver API ====================
+
+    def get_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._session() as db:
+            query = db.query(AgentCheckpoint)\
+                      .filter(AgentCheckpoint.thread_id == configurable["thread_id"],
+                              AgentCheckpoint.checkpoint_ns == configurable.get("checkpoint_ns", ""))
+            if checkpoint_id:
+                row = query.filter(AgentCheckpoint.checkpoint_id == checkpoint_id).first()
+            else:
+                # checkpoint_id (uuid6) tăng dần theo thời gian -> lớn nhất là mới nhất
+                row = query.order_by(AgentCheckpoint.checkpoint_id.desc()).first()
+            return self._to_tuple(db, row) if row else None
+
+    def list(self, config: Optional[Dict[str, Any]], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        results = []
+        with self._session() as db:
+            query = db.query(AgentCheckpoint)
+            if config:
+                configurable = config["configurable"]
+                query = query.filter(AgentCheckpoint.thread_id == configurable["thread_id"])
+                if "checkpoint_ns" in configurable:
+                    query = query.filter(AgentCheckpoint.checkpoint_ns == configurable["checkpoint_ns"])
+                if get_checkpoint_id(config):
+                    query = query.filter(AgentCheckpoint.checkpoint_id == get_checkpoint_id(config))
+            if before and get_checkpoint_id(before):
+                query = query.filter(AgentCheckpoint.checkpoint_id < get_checkpoint_id(before))
+            query = query.order_by(AgentCheckpoint.checkpoint_id.desc())
+            if limit and not filter:
+                query = query.limit(limit)
+
+            for row in query:
+                checkpoint_tuple = self._to_tuple(db, row)
+                if filter and any(checkpoint_tuple.metadata.get(k) != v for k, v in filter.items()):
+                    continue
+                results.append(checkpoint_tuple)
+                if limit and len(results) >= limit:
+                    break
+        yield from results
+
+    def put(self, config: Dict[str, Any], checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> Dict[str, Any]:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+
+        type_, data = self._dumps(self._dehydrate(checkpoint))
+        metadata_type, metadata_data = self._dumps(metadata)
+
+        with self._session() as db:
+            db.merge(AgentCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_checkpoint_id=configurable.get("checkpoint_id"),
+                type=type_,
+                checkpoint=data,
+                metadata_type=metadata_type,
+                checkpoint_metadata=metadata_data,
+                saved_at=datetime.utcnow(),
+            ))
+
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(self, config: Dict[str, Any], writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"], task_id)
+
+        with self._session() as db:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                # Write thường (idx >= 0) chỉ ghi một lần; write đặc biệt (error, interrupt...) được ghi đè
+                if write_idx >= 0 and db.get(AgentCheckpointWrite, (*key, write_idx)) is not None:
+                    continue
+                if channel in self.ref_channels:
+                    value = self._to_ref(value)
+                type_, data = self._dumps(value)
+                db.merge(AgentCheckpointWrite(
+                    thread_id=key[0],
+                    checkpoint_ns=key[1],
+                    checkpoint_id=key[2],
+                    task_id=task_id,
+                    idx=write_idx,
+                    channel=channel,
+                    type=type_,
+                    value=data,
+                    task_path=task_path,
+                ))
+
+    # Đường async: chạy bản đồng bộ trong thread (SQLAlchemy Session đồng bộ)
+    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[Dict[str, Any]], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint_tuple in results:
+            yield checkpoint_tuple
+
+    async def aput(self, config: Dict[str, Any], checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: Dict[str, Any], writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    # ==================== MAINTENANCE ====================
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Xóa toàn bộ checkpoint của một thread."""
+        with self._session() as db:
+            db.query(AgentCheckpointWrite).filter(AgentCheckpointWrite.thread_id == thread_id)\
+              .delete(synchronize_session=False)
+            db.query(AgentCheckpoint).filter(AgentCheckpoint.thread_id == thread_id)\
+              .delete(synchronize_session=False)
+
+    def prune(self, ttl_hours: Optional[float] = None) -> Dict[str, int]:
+        """
+        Xóa các thread không có checkpoint mới trong `ttl_hours` và các blob không còn được tham chiếu.
+        (Mỗi checkpoint mới đều cập nhật last_used_at của blob nó tham chiếu, nên blob cũ hơn
+        cutoff chỉ còn được dùng bởi các thread cũng đã hết hạn.)
+        """
+        ttl_hours = self.ttl_hours if ttl_hours is None else ttl_hours
+        cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+
+        with self._session() as db:
+            stale_threads = [
+                thread_id for (thread_id,) in db.query(AgentCheckpoint.thread_id)
+                                                .group_by(AgentCheckpoint.thread_id)
+                                                .having(func.max(AgentCheckpoint.saved_at) < cutoff)
+                                                .all()
+            ]
+            for i in range(0, len(stale_threads), 500):
+                batch = stale_threads[i:i + 500]
+                db.query(AgentCheckpointWrite).filter(AgentCheckpointWrite.thread_id.in_(batch))\
+                  .delete(synchronize_session=False)
+                db.query(AgentCheckpoint).filter(AgentCheckpoint.thread_id.in_(batch))\
+                  .delete(synchronize_session=False)
+            blobs = db.query(AgentBlob).filter(AgentBlob.last_used_at < cutoff)\
+                      .delete(synchronize_session=False)
+
+        return {"threads": len(stale_threads), "blobs": blobs}
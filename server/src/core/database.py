@@ -58,5 +58,5 @@ def create_db_tables():
     """Tạo tất cả các bảng (tables) trong database dựa trên Base Model."""
     # Chỉ nên chạy function này một lần khi database chưa được thiết lập,
     # hoặc dùng các công cụ Migration (Alembic)
-    from src.models import user, project, task, meeting # Đảm bảo tất cả Models được load
+    from src.models import user, project, task, meeting, analysis_job, live_transcript, transcript_segment, agent_checkpoint, rag_index # Đảm bảo tất cả Models được load
     Base.metadata.create_all(bind=engine)
\ No newline at end of file
@@ -0,0 +1,187 @@
+# src/core/rag_indexer.py
+
+"""
+Change-data-capture: thay đổi của Meeting/Task được ghi vào outbox `rag_index_queue` trong cùng transaction,
+worker drain theo batch -> embed -> upsert vào collection knowledge của project (AI/src/rag/knowledge.py).
+"""
+
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Any
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload
+
+from src.models.meeting import Meeting
+from src.models.task import Task
+from src.models.rag_index import RAG_ENTITY_MEETING, RAG_ENTITY_TASK, RAG_OP_UPSERT, RAG_OP_DELETE
+from src.repositories.rag_index_repository import RagIndexRepository, upsert_queue_rows_stmt
+
+# --- Cấu hình (qua biến môi trường) ---
+RAG_INDEX_ENABLED = os.getenv("RAG_INDEX_ENABLED", "true").lower() in ("1", "true", "yes")
+RAG_INDEX_BATCH = int(os.getenv("RAG_INDEX_BATCH", "100"))
+RAG_INDEX_LEASE_SECONDS = int(os.getenv("RAG_INDEX_LEASE_SECONDS", "600"))
+RAG_INDEX_RETRY_BASE_SECONDS = float(os.getenv("RAG_INDEX_RETRY_BASE_SECONDS", "30"))
+RAG_INDEX_RETRY_MAX_SECONDS = float(os.getenv("RAG_INDEX_RETRY_MAX_SECONDS", "3600"))
+
+# Chỉ các cột này thay đổi mới cần index lại
+_INDEXED_FIELDS = {
+    Meeting: ("title", "summary", "transcript", "start_date", "project_id"),
+    Task: ("title", "description", "status", "priority", "assignee_id", "due_date", "project_id"),
+}
+_ENTITY_TYPES = {Meeting: RAG_ENTITY_MEETING, Task: RAG_ENTITY_TASK}
+
+
+# ==================== CAPTURE ====================
+
+def _has_content(obj) -> bool:
+    # Meeting chưa có biên bản / transcript thì chưa có gì để index
+    return not isinstance(obj, Meeting) or bool(obj.summary or obj.transcript)
+
+
+def _changed(obj) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in _INDEXED_FIELDS[type(obj)])
+
+
+def _capture_changes(session: Session, flush_context):
+    """after_flush: ghi outbox cho Meeting/Task mới, đã sửa (cột liên quan) hoặc đã xóa."""
+    now = datetime.utcnow()
+    rows = {}
+
+    def add(obj, op):
+        if obj.project_id:
+            # Entity chuyển sang project khác: ghi lại project cũ để xóa chunk trong collection cũ
+            previous = {pid for pid in inspect(obj).attrs.project_id.history.deleted if pid and pid != obj.project_id}
+            rows[(_ENTITY_TYPES[type(obj)], obj.id)] = {
+                "entity_type": _ENTITY_TYPES[type(obj)], "entity_id": obj.id,
+                "project_id": obj.project_id, "op": op, "enqueued_at": now,
+                "stale_project_ids": ",".join(sorted(previous)) or None,
+            }
+
+    for obj in session.new:
+        if type(obj) in _INDEXED_FIELDS and _has_content(obj):
+            add(obj, RAG_OP_UPSERT)
+    for obj in session.dirty:
+        if type(obj) in _INDEXED_FIELDS and _changed(obj):
+            add(obj, RAG_OP_UPSERT)
+    for obj in session.deleted:
+        if type(obj) in _INDEXED_FIELDS:
+            add(obj, RAG_OP_DELETE)
+
+    if rows:
+        session.connection().execute(upsert_queue_rows_stmt(list(rows.values())))
+
+
+_listeners_registered = False
+_listeners_lock = threading.Lock()
+
+
+def register_rag_index_listeners():
+    """Bật capture thay đổi cho mọi Session (gọi một lần khi khởi động API / worker)."""
+    global _listeners_registered
+    if not RAG_INDEX_ENABLED:
+        return
+    with _listeners_lock:
+        if not _listeners_registered:
+            event.listen(Session, "after_flush", _capture_changes)
+            _listeners_registered = True
+
+
+# ==================== INDEX ====================
+
+def _meeting_dict(meeting: Meeting) -> Dict[str, Any]:
+    return {
+        "id": meeting.id,
+        "project_id": meeting.project_id,
+        "title": meeting.title,
+        "date": meeting.start_date.strftime("%Y-%m-%d") if meeting.start_date else "",
+        "summary": meeting.summary,
+        "transcript": meeting.transcript,
+    }
+
+
+def _task_dict(task: Task) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "project_id": task.project_id,
+        "title": task.title,
+        "description": task.description,
+        "status": task.status,
+        "priority": task.priority,
+        "assignee": task.assignee.username if task.assignee else None,
+        "due_date": task.due_date.strftime("%Y-%m-%d") if task.due_date else None,
+    }
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff: base * 2^attempts, có giới hạn trên."""
+    return min(RAG_INDEX_RETRY_BASE_SECONDS * (2 ** attempts), RAG_INDEX_RETRY_MAX_SECONDS)
+
+
+class RagIndexer:
+    """Drain outbox: mỗi lượt claim một batch, gom theo project, index mỗi project một lần."""
+
+    def __init__(self, batch_size: int = RAG_INDEX_BATCH):
+        self.batch_size = batch_size
+
+    def drain_once(self, db: Session) -> int:
+        """Xử lý một batch. Trả về số thay đổi đã claim (0 = hàng đợi trống)."""
+        from AI.src.rag.knowledge import index_entities, meeting_objects, task_objects, entity_key
+
+        repo = RagIndexRepository(db)
+        items = repo.claim_batch(self.batch_size, RAG_INDEX_LEASE_SECONDS)
+        if not items:
+            return 0
+
+        # Đọc trạng thái hiện tại của entity (không dùng dữ liệu lúc enqueue)
+        ids = defaultdict(list)
+        for item in items:
+            if item["op"] == RAG_OP_UPSERT:
+                ids[item["entity_type"]].append(item["entity_id"])
+        entities = {}
+        if ids[RAG_ENTITY_MEETING]:
+            for meeting in db.query(Meeting).filter(Meeting.id.in_(ids[RAG_ENTITY_MEETING])):
+                entities[(RAG_ENTITY_MEETING, meeting.id)] = _meeting_dict(meeting)
+        if ids[RAG_ENTITY_TASK]:
+            for task in db.query(Task).options(joinedload(Task.assignee)).filter(Task.id.in_(ids[RAG_ENTITY_TASK])):
+                entities[(RAG_ENTITY_TASK, task.id)] = _task_dict(task)
+        db.rollback() # Không giữ transaction trong lúc embed
+
+        by_project: Dict[str, List[dict]] = defaultdict(list)
+        for item in items:
+            by_project[item["project_id"]].append(item)
+
+        for project_id, group in by_project.items():
+            upserts, delete_keys = [], []
+            stale = defaultdict(list)  # project cũ -> entity_key cần xóa khỏi collection của project đó
+            for item in group:
+                key = entity_key(item["entity_type"], item["entity_id"])
+                for old_project_id in item["stale_project_ids"]:
+                    stale[old_project_id].append(key)
+                entity = entities.get((item["entity_type"], item["entity_id"]))
+                objects = []
+                if item["op"] == RAG_OP_UPSERT and entity is not None and entity["project_id"] == project_id:
+                    objects = meeting_objects(entity) if item["entity_type"] == RAG_ENTITY_MEETING \
+                        else task_objects(entity)
+                if objects:
+                    upserts.extend(objects)
+                else:
+                    delete_keys.append(key)
+
+            try:
+                stats = index_entities(project_id, upserts, delete_keys)
+                for old_project_id, keys in stale.items():
+                    stats["deleted"] += index_entities(old_project_id, [], keys)["deleted"]
+                repo.complete(group)
+                print(f"🔎 [RAG INDEX] Project {project_id}: {len(group)} entities, "
+                      f"{stats['upserted']} chunks upserted, {stats['deleted']} removed")
+            except Exception as e:
+                db.rollback()
+                attempts = max(item["attempts"] for item in group)
+                repo.fail(group, f"{type(e).__name__}: {e}", retry_delay(attempts))
+                print(f"❌ [RAG INDEX] Project {project_id}: {e}")
+
+        return len(items)
@@ -0,0 +1,180 @@
+# src/core/range_response.py
+
+import os
+from email.utils import formatdate
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Kích thước mỗi lần đọc khi server ASGI không hỗ trợ zero-copy
+CHUNK_SIZE = 256 * 1024
+
+# Extension ASGI cho phép server tự gọi sendfile() trên file object
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+PATHSEND_EXTENSION = "http.response.pathsend"
+
+
+def _parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse header `Range: bytes=...` thành (start, end) inclusive.
+
+    Trả về None nếu header không hợp lệ hoặc có nhiều range (khi đó trả cả file, RFC 9110 cho phép).
+    Raise ValueError nếu range không thỏa mãn được (416).
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    start_str, end_str = start_str.strip(), end_str.strip()
+    if not (start_str.isdigit() or start_str == "") or not (end_str.isdigit() or end_str == ""):
+        return None
+
+    if start_str == "":
+        # bytes=-N : N byte cuối
+        if not end_str or int(end_str) == 0:
+            raise ValueError("Empty suffix range")
+        start = max(file_size - int(end_str), 0)
+        end = file_size - 1
+    else:
+        start = int(start_str)
+        end = min(int(end_str), file_size - 1) if end_str else file_size - 1
+
+    if start >= file_size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class RangeFileResponse(Response):
+    """
+    Response trả file hỗ trợ HTTP Range (206), ETag mạnh, Cache-Control và zero-copy sendfile.
+
+    - ETag được tính từ (inode, size, mtime_ns) nên đổi ngay khi file được ghi lại (upload dùng os.replace).
+    - Nếu server ASGI hỗ trợ extension `http.response.zerocopysend`, file object được giao
+      cho server gọi sendfile() (server đóng file khi gửi xong); ngược lại đọc bằng os.pread theo chunk (vẫn đi qua page cache của OS).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        request: Request,
+        media_type: str = "application/octet-stream",
+        cache_control: str = "private, max-age=3600",
+    ) -> None:
+        self.path = path
+        self.stat_result = os.stat(path)
+        self.file_size = self.stat_result.st_size
+        self.etag = '"{:x}-{:x}-{:x}"'.format(
+            self.stat_result.st_ino, self.stat_result.st_size, self.stat_result.st_mtime_ns
+        )
+        self.start = 0
+        self.end = self.file_size - 1
+        self.send_body = request.method != "HEAD"
+
+        super().__init__(content=None, media_type=media_type)
+        self.raw_headers = []
+        self._set_headers(request.headers, cache_control)
+
+    def _set_headers(self, request_headers: Headers, cache_control: str) -> None:
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": formatdate(self.stat_result.st_mtime, usegmt=True),
+            "cache-control": cache_control,
+            "content-type": self.media_type,
+        }
+
+        # 1. Conditional GET: client đã có bản mới nhất
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and self.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            self.status_code = 304
+            self.send_body = False
+            headers.pop("content-type")
+            self.raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+            return
+
+        # 2. Range request (bỏ qua nếu If-Range không khớp ETag hiện tại)
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == self.etag):
+            try:
+                byte_range = _parse_range(range_header, self.file_size)
+            except ValueError:
+                self.status_code = 416
+                self.send_body = False
+                headers["content-range"] = f"bytes */{self.file_size}"
+                headers["content-length"] = "0"
+                self.raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+                return
+
+            if byte_range is not None:
+                self.start, self.end = byte_range
+                self.status_code = 206
+                headers["content-range"] = f"bytes {self.start}-{self.end}/{self.file_size}"
+
+        headers["content-length"] = str(self.end - self.start + 1 if self.file_size else 0)
+        self.raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()]
+
+    def _advise(self, fd: int, count: int) -> None:
+        """Gợi ý kernel đọc trước vùng cần gửi -> các lần xem lại/seek được phục vụ từ page cache."""
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, self.start, count, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, self.start, count, os.POSIX_FADV_WILLNEED)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        count = self.end - self.start + 1
+        if not self.send_body or self.file_size == 0 or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        is_full_file = self.start == 0 and count == self.file_size
+
+        if PATHSEND_EXTENSION in extensions and is_full_file:
+            await send({"type": PATHSEND_EXTENSION, "path": self.path})
+            return
+
+        if ZEROCOPY_EXTENSION in extensions:
+            # Extension nhận file object; server gửi bất đồng bộ và tự đóng file khi xong (không đóng ở đây)
+            file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            try:
+                self._advise(file.fileno(), count)
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+            except BaseException:
+                # Server chưa nhận file -> tự đóng
+                file.close()
+                raise
+            return
+
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            self._advise(fd, count)
+            offset = self.start
+            remaining = count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(CHUNK_SIZE, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # File bị cắt ngắn trong lúc gửi -> đóng body để client không treo
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
@@ -5,7 +5,7 @@ from typing import Optional
 
 from passlib.context import CryptContext
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
 from sqlalchemy.orm import Session
 from src.core.database import get_db
@@ -30,6 +30,12 @@ oauth2_scheme = OAuth2PasswordBearer(
     scopes={"me": "Read current user information"},
 )
 
+# Thẻ <video>/<audio> không gửi được header Authorization -> cho phép token qua query string
+oauth2_scheme_optional = OAuth2PasswordBearer(
+    tokenUrl="/v1/users/login",
+    auto_error=False,
+)
+
 
 # --- 2. Hashing Mật khẩu ---
 # src/core/security.py
@@ -97,4 +103,21 @@ def get_current_user(
         )
     
     # Sử dụng UserOut schema để xác thực và trả về dữ liệu
-    return UserOut.model_validate(user)
\ No newline at end of file
+    return UserOut.model_validate(user)
+
+def get_current_user_for_media(
+    db: Session = Depends(get_db),
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None, description="Token cho media player không gửi được header"),
+) -> UserOut:
+    """
+    Giống get_current_user nhưng chấp nhận token qua `?access_token=` (dùng cho endpoint stream media).
+    """
+    token = header_token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_current_user(db=db, token=token)
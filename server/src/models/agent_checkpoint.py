@@ -0,0 +1,60 @@
+# src/models/agent_checkpoint.py
+
+from sqlalchemy import Column, String, Integer, Text, LargeBinary, DateTime, Index
+from src.models.base import Base # Kế thừa Base
+from datetime import datetime
+
+
+class AgentCheckpoint(Base):
+    """
+    Checkpoint của LangGraph (state của một thread agent tại một bước).
+    Giữ state của các lượt phân tích đang chờ human review qua các lần restart/deploy.
+    """
+    __tablename__ = 'agent_checkpoints'
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default='')
+    checkpoint_id = Column(String, primary_key=True)
+    parent_checkpoint_id = Column(String, nullable=True)
+
+    # Dữ liệu đã serialize bằng serde của LangGraph (type + bytes)
+    type = Column(String(50), nullable=True)
+    checkpoint = Column(LargeBinary, nullable=False)
+    metadata_type = Column(String(50), nullable=True)
+    checkpoint_metadata = Column('metadata', LargeBinary, nullable=True)
+    saved_at = Column(DateTime, default=datetime.utcnow, nullable=False) # dùng cho TTL
+
+    __table_args__ = (
+        Index('ix_agent_checkpoints_saved_at', 'saved_at'),
+    )
+
+    def __repr__(self):
+        return f"<AgentCheckpoint(thread_id='{self.thread_id}', checkpoint_id='{self.checkpoint_id}')>"
+
+
+class AgentCheckpointWrite(Base):
+    """Pending writes của một checkpoint (output của các node chưa được gộp vào checkpoint kế tiếp)."""
+    __tablename__ = 'agent_checkpoint_writes'
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default='')
+    checkpoint_id = Column(String, primary_key=True)
+    task_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+
+    channel = Column(String, nullable=False)
+    type = Column(String(50), nullable=True)
+    value = Column(LargeBinary, nullable=True)
+    task_path = Column(String, nullable=False, default='')
+
+
+class AgentBlob(Base):
+    """
+    Giá trị lớn (ví dụ transcript) được lưu một lần theo SHA-256 nội dung;
+    checkpoint chỉ giữ tham chiếu thay vì chép lại toàn bộ ở mỗi bước.
+    """
+    __tablename__ = 'agent_blobs'
+
+    sha256 = Column(String(64), primary_key=True)
+    value = Column(Text, nullable=False)
+    last_used_at = Column(DateTime, default=datetime.utcnow, nullable=False) # cập nhật mỗi khi checkpoint mới tham chiếu
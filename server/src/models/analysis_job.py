@@ -0,0 +1,53 @@
+# src/models/analysis_job.py
+
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Integer, JSON, Index
+from sqlalchemy.orm import relationship
+from src.models.base import Base # Kế thừa Base
+from datetime import datetime
+
+# Các trạng thái của một job phân tích
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class AnalysisJob(Base):
+    """
+    Hàng đợi job phân tích AI cho cuộc họp (lưu trong DB để không mất khi restart).
+    Worker (`python worker.py`) lấy job bằng SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = 'analysis_jobs'
+
+    id = Column(String, primary_key=True)
+    meeting_id = Column(String, ForeignKey('meetings.id'), nullable=False, index=True)
+
+    # SHA-256 của file ghi hình tại thời điểm yêu cầu phân tích
+    recording_checksum = Column(String(64), nullable=True)
+    # "<meeting_id>:<checksum>" khi job còn queued/running, NULL khi đã xong.
+    # UNIQUE -> tối đa một job đang chạy cho mỗi (meeting, recording) (single-flight).
+    active_key = Column(String, unique=True, nullable=True)
+
+    status = Column(String(20), default=JOB_QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+
+    # Thời điểm sớm nhất job được chạy (dùng cho retry với backoff)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Thông tin worker đang giữ job (lease), hết hạn thì worker khác được lấy lại
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+
+    last_error = Column(Text, nullable=True)
+    result = Column(JSON, nullable=True) # MoM + action items (bản nháp chờ review)
+    finished_at = Column(DateTime, nullable=True)
+
+    meeting = relationship("Meeting")
+
+    __table_args__ = (
+        Index('ix_analysis_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    def __repr__(self):
+        return f"<AnalysisJob(id='{self.id}', meeting_id='{self.meeting_id}', status='{self.status}')>"
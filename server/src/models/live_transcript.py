@@ -0,0 +1,26 @@
+# src/models/live_transcript.py
+
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer
+from src.models.base import Base # Kế thừa Base
+from datetime import datetime
+
+# Trạng thái phiên transcribe trực tiếp
+LIVE_STREAMING = 'streaming'
+LIVE_COMPLETE = 'complete'
+
+
+class LiveTranscriptSession(Base):
+    """
+    Trạng thái transcribe trực tiếp (live) của một cuộc họp.
+    'complete' nghĩa là Meeting.transcript đã đầy đủ -> phân tích sau họp không cần chạy lại STT.
+    """
+    __tablename__ = 'live_transcript_sessions'
+
+    meeting_id = Column(String, ForeignKey('meetings.id'), primary_key=True)
+    status = Column(String(20), default=LIVE_STREAMING, nullable=False)
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    ended_at = Column(DateTime, nullable=True)
+    committed_ms = Column(Integer, default=0, nullable=False) # Tổng thời lượng audio đã transcribe
+
+    def __repr__(self):
+        return f"<LiveTranscriptSession(meeting_id='{self.meeting_id}', status='{self.status}')>"
@@ -0,0 +1,42 @@
+# src/models/rag_index.py
+
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+from src.models.base import Base # Kế thừa Base
+from datetime import datetime
+
+# Loại entity được index vào RAG store
+RAG_ENTITY_MEETING = 'meeting'
+RAG_ENTITY_TASK = 'task'
+
+# Thao tác cần thực hiện
+RAG_OP_UPSERT = 'upsert'
+RAG_OP_DELETE = 'delete'
+
+
+class RagIndexQueueItem(Base):
+    """
+    Outbox các thay đổi của Meeting/Task cần index lại vào collection knowledge của project.
+    Được ghi trong cùng transaction với thay đổi (SQLAlchemy after_flush), worker drain theo batch.
+    Mỗi entity tối đa một dòng: thay đổi liên tiếp chỉ cập nhật enqueued_at.
+    """
+    __tablename__ = 'rag_index_queue'
+
+    entity_type = Column(String(20), primary_key=True)
+    entity_id = Column(String, primary_key=True)
+    project_id = Column(String, nullable=False)
+    # Project cũ (phân tách bằng dấu phẩy) khi entity bị chuyển project: chunk trong collection cũ phải bị xóa
+    stale_project_ids = Column(Text, nullable=True)
+    op = Column(String(10), default=RAG_OP_UPSERT, nullable=False)
+    enqueued_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Lease của worker đang xử lý / thời điểm retry sau lỗi
+    locked_until = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_rag_index_queue_locked_until', 'locked_until'),
+    )
+
+    def __repr__(self):
+        return f"<RagIndexQueueItem(entity='{self.entity_type}:{self.entity_id}', op='{self.op}')>"
@@ -0,0 +1,35 @@
+# src/models/transcript_segment.py
+
+from sqlalchemy import Column, String, Text, ForeignKey, Integer, Index
+from src.models.base import Base # Kế thừa Base
+
+# Nguồn của segment
+SEGMENT_SOURCE_STT = 'stt'       # transcribe file ghi hình sau cuộc họp
+SEGMENT_SOURCE_LIVE = 'live'     # transcribe trực tiếp trong lúc họp
+SEGMENT_SOURCE_MANUAL = 'manual' # transcript do client gửi lên
+
+
+class TranscriptSegment(Base):
+    """
+    Một đoạn transcript có timestamp. Transcript đầy đủ được ghép từ các segment khi cần,
+    cho phép phân trang, seek theo thời gian và append mà không ghi lại cả khối Text.
+    """
+    __tablename__ = 'transcript_segments'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    meeting_id = Column(String, ForeignKey('meetings.id'), nullable=False)
+
+    # Vị trí tính bằng mili-giây từ đầu cuộc họp (0 nếu nguồn không có timestamp)
+    start_ms = Column(Integer, nullable=False, default=0)
+    end_ms = Column(Integer, nullable=False, default=0)
+
+    speaker = Column(String(100), nullable=True)
+    text = Column(Text, nullable=False)
+    source = Column(String(20), nullable=False, default=SEGMENT_SOURCE_STT)
+
+    __table_args__ = (
+        Index('ix_transcript_segments_meeting_start', 'meeting_id', 'start_ms'),
+    )
+
+    def __repr__(self):
+        return f"<TranscriptSegment(meeting_id='{self.meeting_id}', start_ms={self.start_ms})>"
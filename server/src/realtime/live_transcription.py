@@ -0,0 +1,302 @@
+# src/realtime/live_transcription.py
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from socketio import AsyncServer
+from fastapi import HTTPException
+
+from src.core.database import SessionLocal
+from src.core.security import decode_access_token
+from src.models.meeting import Meeting
+from src.models.live_transcript import LiveTranscriptSession, LIVE_STREAMING, LIVE_COMPLETE
+from src.models.transcript_segment import SEGMENT_SOURCE_LIVE
+from src.repositories.user_repository import UserRepository
+from src.repositories.transcript_segment_repository import TranscriptSegmentRepository
+from src.services.meeting_service import MeetingService
+
+# Namespace riêng trên cùng kết nối Socket.IO (multiplexing) -> có connect/disconnect riêng
+NAMESPACE = '/transcription'
+
+# Audio client gửi lên: PCM 16-bit little-endian, mono, 16 kHz
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "10"))      # transcribe mỗi khi đủ N giây
+LIVE_MAX_CARRY_SECONDS = float(os.getenv("LIVE_MAX_CARRY_SECONDS", "30")) # không giữ lại câu dở dang quá N giây
+# Buffer tối đa mỗi stream (STT chậm hơn realtime / client gửi dồn): vượt thì bỏ audio cũ nhất và báo live_error
+LIVE_MAX_BUFFER_SECONDS = float(os.getenv("LIVE_MAX_BUFFER_SECONDS", "60"))
+MAX_BUFFER_BYTES = int(max(LIVE_MAX_BUFFER_SECONDS, LIVE_WINDOW_SECONDS + LIVE_MAX_CARRY_SECONDS) * BYTES_PER_SECOND)
+
+# Phiên stream theo sid, và số stream đang mở theo meeting
+live_streams: Dict[str, "LiveStream"] = {}
+active_streams_by_meeting: Dict[str, int] = {}
+
+
+class LiveStream:
+    """Buffer audio của một người nói trong một cuộc họp."""
+
+    def __init__(self, meeting_id: str, speaker: str, base_ms: int):
+        self.meeting_id = meeting_id
+        self.speaker = speaker
+        self.base_ms = base_ms      # vị trí của stream này so với lúc cuộc họp bắt đầu live
+        self.buffer = bytearray()
+        self.buffer_start = 0       # vị trí (byte, tính từ đầu stream) của buffer[0]
+        self.lagging = False        # đã báo live_error vì buffer đầy (chưa xử lý kịp)
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+
+# ==================== BLOCKING HELPERS (chạy trong thread) ====================
+
+def _transcribe_window(pcm: bytes, final: bool) -> Tuple[List[dict], int]:
+    """
+    Transcribe buffer hiện tại bằng local Whisper (model pool).
+
+    Nếu chưa phải lần cuối và câu cuối kết thúc sát mép buffer (có thể đang nói dở),
+    giữ phần audio từ đầu câu đó cho lần sau (rolling window).
+
+    Returns:
+        (segments [{start, end, text}] tính bằng giây trong buffer, số byte đã tiêu thụ)
+    """
+    import numpy as np
+    from AI.src.models.whisper_pool import get_whisper_pool
+
+    usable = len(pcm) - (len(pcm) % 2)
+    audio = np.frombuffer(pcm[:usable], dtype=np.int16).astype(np.float32) / 32768.0
+    window_seconds = len(audio) / SAMPLE_RATE
+
+    with get_whisper_pool().acquire() as model:
+        # beam_size=1 (greedy) để độ trễ thấp
+        segments = [
+            {"start": seg.start, "end": seg.end, "text": seg.text.strip()}
+            for seg in model.transcribe(audio, language="vi", beam_size=1, vad_filter=True)[0]
+        ]
+
+    if final or not segments:
+        return [s for s in segments if s["text"]], usable
+
+    last = segments[-1]
+    can_carry = window_seconds - last["start"] < LIVE_MAX_CARRY_SECONDS
+    if window_seconds - last["end"] < 1.0 and can_carry:
+        consumed = int(last["start"] * SAMPLE_RATE) * 2
+        return [s for s in segments[:-1] if s["text"]], consumed
+
+    return [s for s in segments if s["text"]], usable
+
+
+def _append_transcript(meeting_id: str, segments: List[dict], committed_ms: int):
+    """Ghi các segment mới (append, không ghi lại toàn bộ transcript)."""
+    db = SessionLocal()
+    try:
+        TranscriptSegmentRepository(db).bulk_insert(meeting_id, segments, source=SEGMENT_SOURCE_LIVE)
+        session = db.query(LiveTranscriptSession).filter(LiveTranscriptSession.meeting_id == meeting_id).first()
+        if session:
+            session.committed_ms = max(session.committed_ms, committed_ms)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _authorize_user(token: str) -> Dict[str, str]:
+    """Giải mã token -> thông tin user (raise HTTPException nếu không hợp lệ)."""
+    user_id = decode_access_token(token)
+    db = SessionLocal()
+    try:
+        user = UserRepository(db).get_by_id(user_id)
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        return {"user_id": user.id, "username": user.username}
+    finally:
+        db.close()
+
+
+def _start_session(meeting_id: str, user_id: str) -> int:
+    """Kiểm tra quyền, tạo/mở lại phiên live. Trả về ms kể từ lúc cuộc họp bắt đầu live."""
+    db = SessionLocal()
+    try:
+        MeetingService(db).get_meeting_for_member(meeting_id, user_id)
+        now = datetime.utcnow()
+        session = db.query(LiveTranscriptSession).filter(LiveTranscriptSession.meeting_id == meeting_id).first()
+        if not session:
+            session = LiveTranscriptSession(meeting_id=meeting_id, status=LIVE_STREAMING, started_at=now, committed_ms=0)
+            db.add(session)
+        else:
+            session.status = LIVE_STREAMING
+            session.ended_at = None
+        db.commit()
+        return int((now - session.started_at).total_seconds() * 1000)
+    finally:
+        db.close()
+
+
+def _complete_session(meeting_id: str):
+    db = SessionLocal()
+    try:
+        session = db.query(LiveTranscriptSession).filter(LiveTranscriptSession.meeting_id == meeting_id).first()
+        if session:
+            session.status = LIVE_COMPLETE
+            session.ended_at = datetime.utcnow()
+        # Bản Text đầy đủ chỉ ghép một lần khi kết thúc (cho các API cũ đọc Meeting.transcript)
+        meeting = db.query(Meeting).filter(Meeting.id == meeting_id).first()
+        if meeting:
+            meeting.transcript = TranscriptSegmentRepository(db).get_full_text(meeting_id)
+        db.commit()
+    finally:
+        db.close()
+
+
+# ==================== HANDLERS ====================
+
+def register_live_transcription_handlers(sio: AsyncServer):
+    """
+    Đăng ký handlers cho transcribe trực tiếp trong cuộc họp (namespace '/transcription').
+
+    Giao thức (client):
+        io(url + '/transcription', {auth: {token}})
+        emit('live_start', {meeting_id})
+        emit('live_audio', <bytes PCM16 mono 16kHz>)   # gửi liên tục, ví dụ mỗi 250ms
+        emit('live_stop')
+        on('live_transcript', {meeting_id, speaker, segments: [{start_ms, end_ms, text}]})
+        on('live_error', {message})                      # lỗi / STT không theo kịp (audio bị bỏ qua)
+    """
+
+    def _trim(stream: LiveStream, upto: int):
+        """Bỏ phần buffer trước vị trí tuyệt đối `upto` (byte tính từ đầu stream)."""
+        cut = upto - stream.buffer_start
+        if cut > 0:
+            del stream.buffer[:cut]
+            stream.buffer_start += cut
+
+    def _stream_ms(stream: LiveStream, position: int) -> int:
+        return stream.base_ms + position * 1000 // BYTES_PER_SECOND
+
+    async def process(sid: str, stream: LiveStream, final: bool = False):
+        async with stream.lock:
+            if not stream.buffer:
+                return
+            # Buffer bị giới hạn MAX_BUFFER_BYTES nên mỗi lượt transcribe tối đa một cửa sổ cố định
+            window_start = stream.buffer_start
+            pcm = bytes(stream.buffer)
+            try:
+                segments, consumed = await asyncio.to_thread(_transcribe_window, pcm, final)
+            except Exception as e:
+                # Bỏ cửa sổ lỗi: không transcribe lại một buffer ngày càng lớn ở lượt sau
+                _trim(stream, window_start + len(pcm))
+                print(f"❌ [LIVE STT] {stream.meeting_id}: {e}")
+                await sio.emit('live_error', {
+                    'message': f'Live transcription failed, skipped {len(pcm) / BYTES_PER_SECOND:.0f}s of audio',
+                }, room=sid, namespace=NAMESPACE)
+                return
+
+            # Chunk mới có thể đã được nối (hoặc audio cũ bị bỏ) trong lúc transcribe -> cắt theo vị trí tuyệt đối
+            _trim(stream, window_start + consumed)
+            stream.lagging = False
+            window_start_ms = _stream_ms(stream, window_start)
+
+            if not segments:
+                return
+
+            payload = [
+                {
+                    "start_ms": window_start_ms + int(seg["start"] * 1000),
+                    "end_ms": window_start_ms + int(seg["end"] * 1000),
+                    "text": seg["text"],
+                }
+                for seg in segments
+            ]
+            rows = [{**seg, "speaker": stream.speaker} for seg in payload]
+            await asyncio.to_thread(_append_transcript, stream.meeting_id, rows, _stream_ms(stream, window_start + consumed))
+            await sio.emit('live_transcript', {
+                'meeting_id': stream.meeting_id,
+                'speaker': stream.speaker,
+                'segments': payload,
+            }, room=f"transcript:{stream.meeting_id}", namespace=NAMESPACE)
+
+    async def finish(sid: str):
+        """Transcribe phần audio còn lại và đóng stream."""
+        stream = live_streams.pop(sid, None)
+        if not stream:
+            return
+        try:
+            if stream.task:
+                await stream.task
+            await process(sid, stream, final=True)
+        except Exception as e:
+            print(f"❌ [LIVE STT] {stream.meeting_id}: final transcription failed: {e}")
+        finally:
+            # Luôn giảm số stream và đóng phiên, kể cả khi lượt cuối lỗi (ghi DB / emit)
+            remaining = active_streams_by_meeting.get(stream.meeting_id, 1) - 1
+            if remaining <= 0:
+                active_streams_by_meeting.pop(stream.meeting_id, None)
+                await asyncio.to_thread(_complete_session, stream.meeting_id)
+                print(f"✅ [LIVE STT] Meeting {stream.meeting_id} live transcript complete")
+            else:
+                active_streams_by_meeting[stream.meeting_id] = remaining
+
+    @sio.on('connect', namespace=NAMESPACE)
+    async def on_connect(sid, environ, auth=None):
+        token = (auth or {}).get('token')
+        if not token:
+            raise ConnectionRefusedError('Missing token')
+        try:
+            user = await asyncio.to_thread(_authorize_user, token)
+        except HTTPException as e:
+            raise ConnectionRefusedError(e.detail)
+        await sio.save_session(sid, user, namespace=NAMESPACE)
+
+    @sio.on('disconnect', namespace=NAMESPACE)
+    async def on_disconnect(sid):
+        await finish(sid)
+
+    @sio.on('live_start', namespace=NAMESPACE)
+    async def on_live_start(sid, data: Dict[str, Any]):
+        meeting_id = (data or {}).get('meeting_id')
+        user = await sio.get_session(sid, namespace=NAMESPACE)
+        if not meeting_id or sid in live_streams:
+            await sio.emit('live_error', {'message': 'Invalid or duplicate live_start'}, room=sid, namespace=NAMESPACE)
+            return
+        try:
+            base_ms = await asyncio.to_thread(_start_session, meeting_id, user['user_id'])
+        except HTTPException as e:
+            await sio.emit('live_error', {'message': e.detail}, room=sid, namespace=NAMESPACE)
+            return
+
+        live_streams[sid] = LiveStream(meeting_id, user['username'], base_ms)
+        active_streams_by_meeting[meeting_id] = active_streams_by_meeting.get(meeting_id, 0) + 1
+        await sio.enter_room(sid, f"transcript:{meeting_id}", namespace=NAMESPACE)
+        await sio.emit('live_started', {'meeting_id': meeting_id}, room=sid, namespace=NAMESPACE)
+        print(f"🎙️ [LIVE STT] {user['username']} streaming meeting {meeting_id}")
+
+    @sio.on('live_audio', namespace=NAMESPACE)
+    async def on_live_audio(sid, data):
+        stream = live_streams.get(sid)
+        if not stream or not isinstance(data, (bytes, bytearray)):
+            return
+        stream.buffer.extend(data)
+
+        # STT không theo kịp (hoặc client gửi dồn): bỏ audio cũ nhất, giữ buffer <= MAX_BUFFER_BYTES
+        overflow = len(stream.buffer) - MAX_BUFFER_BYTES
+        overflow += overflow % 2  # giữ buffer thẳng hàng theo sample 16-bit
+        if overflow > 0:
+            del stream.buffer[:overflow]
+            stream.buffer_start += overflow
+            if not stream.lagging:
+                stream.lagging = True
+                print(f"⚠️ [LIVE STT] {stream.meeting_id}: transcription is falling behind, dropping audio")
+                await sio.emit('live_error', {
+                    'message': 'Live transcription is falling behind, some audio was skipped',
+                }, room=sid, namespace=NAMESPACE)
+
+        # Đủ một cửa sổ và không có lượt transcribe nào đang chạy -> chạy nền
+        if len(stream.buffer) >= LIVE_WINDOW_SECONDS * BYTES_PER_SECOND and (stream.task is None or stream.task.done()):
+            stream.task = asyncio.create_task(process(sid, stream))
+
+    @sio.on('live_stop', namespace=NAMESPACE)
+    async def on_live_stop(sid, data=None):
+        meeting_id = live_streams[sid].meeting_id if sid in live_streams else None
+        await finish(sid)
+        if meeting_id:
+            await sio.emit('live_stopped', {'meeting_id': meeting_id}, room=sid, namespace=NAMESPACE)
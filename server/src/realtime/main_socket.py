@@ -3,6 +3,7 @@
 import socketio
 from src.realtime.signaling import register_signaling_handlers
 from src.realtime.file_transfer import register_file_transfer_handlers
+from src.realtime.live_transcription import register_live_transcription_handlers
 
 # Khởi tạo Socket.IO Server
 sio = socketio.AsyncServer(
@@ -17,6 +18,7 @@ socket_app = socketio.ASGIApp(sio)
 # Đăng ký tất cả các handlers
 register_signaling_handlers(sio, {}) # Tạm thời bỏ qua current_users
 register_file_transfer_handlers(sio)
+register_live_transcription_handlers(sio) # Namespace '/transcription'
 
 def get_socketio_app():
     """Trả về ASGI app của Socket.IO."""
@@ -1,7 +1,6 @@
 # src/realtime/signaling.py
 
 from socketio import AsyncServer
-from flask import request # Giả định sử dụng request object cho sid
 from typing import Dict, Any
 
 # Giả sử chúng ta có một đối tượng AsyncServer được truyền vào
@@ -0,0 +1,134 @@
+# src/repositories/analysis_job_repository.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_
+from src.models.analysis_job import AnalysisJob, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+from src.repositories.base_repository import BaseRepository
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+from uuid import uuid4
+
+class AnalysisJobRepository(BaseRepository):
+    def __init__(self, db: Session):
+        super().__init__(db, AnalysisJob) # Khởi tạo BaseRepository với AnalysisJob Model
+
+    def enqueue(self, meeting_id: str, recording_checksum: Optional[str] = None, max_attempts: int = 3) -> AnalysisJob:
+        """
+        Thêm một job phân tích mới vào hàng đợi.
+        Raise ValueError nếu đã có job đang chạy cho cùng (meeting, checksum) (vi phạm UNIQUE active_key).
+        """
+        return self.create({
+            "id": str(uuid4()),
+            "meeting_id": meeting_id,
+            "recording_checksum": recording_checksum,
+            "active_key": f"{meeting_id}:{recording_checksum}",
+            "status": JOB_QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_after": datetime.utcnow(),
+        })
+
+    def get_active(self, meeting_id: str, recording_checksum: Optional[str]) -> Optional[AnalysisJob]:
+        """Lấy job đang queued/running cho cùng cuộc họp và cùng file ghi hình."""
+        return self.db.query(AnalysisJob)\
+                   .filter(AnalysisJob.active_key == f"{meeting_id}:{recording_checksum}")\
+                   .first()
+
+    def get_latest_succeeded(self, meeting_id: str, recording_checksum: Optional[str]) -> Optional[AnalysisJob]:
+        """Lấy job đã hoàn thành gần nhất cho cùng cuộc họp và cùng file ghi hình."""
+        return self.db.query(AnalysisJob)\
+                   .filter(AnalysisJob.meeting_id == meeting_id,
+                           AnalysisJob.recording_checksum == recording_checksum,
+                           AnalysisJob.status == JOB_SUCCEEDED)\
+                   .order_by(AnalysisJob.finished_at.desc())\
+                   .first()
+
+    def get_latest_for_meeting(self, meeting_id: str) -> Optional[AnalysisJob]:
+        """Lấy job gần nhất của một cuộc họp."""
+        return self.db.query(AnalysisJob)\
+                   .filter(AnalysisJob.meeting_id == meeting_id)\
+                   .order_by(AnalysisJob.created_at.desc())\
+                   .first()
+
+    def claim_next(self, worker_id: str, lease_seconds: int) -> Optional[AnalysisJob]:
+        """
+        Lấy (claim) job kế tiếp đã đến hạn chạy.
+        Job 'running' có lease quá hạn (worker chết giữa chừng) cũng được lấy lại.
+        Dùng FOR UPDATE SKIP LOCKED để nhiều worker không lấy trùng job (PostgreSQL).
+        """
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=lease_seconds)
+
+        job = self.db.query(AnalysisJob)\
+                  .filter(or_(
+                      and_(AnalysisJob.status == JOB_QUEUED, AnalysisJob.run_after <= now),
+                      and_(AnalysisJob.status == JOB_RUNNING, AnalysisJob.locked_at < stale_before),
+                  ))\
+                  .order_by(AnalysisJob.run_after)\
+                  .with_for_update(skip_locked=True)\
+                  .first()
+
+        if not job:
+            self.db.rollback() # Nhả transaction đang mở
+            return None
+
+        job.status = JOB_RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def renew_lease(self, job_id: str, worker_id: str) -> bool:
+        """
+        Heartbeat: gia hạn lease (locked_at = now) cho job đang chạy.
+        Trả về False nếu worker không còn giữ job (lease đã bị worker khác lấy lại).
+        """
+        updated = self.db.query(AnalysisJob)\
+                      .filter(AnalysisJob.id == job_id,
+                              AnalysisJob.status == JOB_RUNNING,
+                              AnalysisJob.locked_by == worker_id)\
+                      .update({AnalysisJob.locked_at: datetime.utcnow()}, synchronize_session=False)
+        self.db.commit()
+        return updated == 1
+
+    def lock_if_owned(self, job: AnalysisJob, worker_id: str) -> bool:
+        """
+        Khóa dòng job (FOR UPDATE) và kiểm tra worker vẫn giữ lease trước khi ghi kết quả.
+        Khóa được giữ đến khi transaction hiện tại commit/rollback.
+        """
+        self.db.refresh(job, with_for_update=True)
+        return job.status == JOB_RUNNING and job.locked_by == worker_id
+
+    def mark_succeeded(self, job: AnalysisJob, result: Optional[Dict[str, Any]] = None) -> AnalysisJob:
+        """Đánh dấu job hoàn thành (commit cùng mọi thay đổi đang chờ trong transaction, ví dụ kết quả của job)."""
+        job.status = JOB_SUCCEEDED
+        job.active_key = None
+        job.result = result
+        job.last_error = None
+        job.locked_by = None
+        job.locked_at = None
+        job.finished_at = datetime.utcnow()
+        self.db.commit()
+        return job
+
+    def mark_failed(self, job: AnalysisJob, error: str, retry_delay_seconds: Optional[float]) -> AnalysisJob:
+        """
+        Ghi nhận lỗi. Nếu còn lượt và retry_delay_seconds không phải None thì đưa lại vào hàng đợi
+        sau khoảng backoff, ngược lại đánh dấu failed vĩnh viễn.
+        """
+        job.last_error = error
+        job.locked_by = None
+        job.locked_at = None
+
+        if retry_delay_seconds is not None and job.attempts < job.max_attempts:
+            job.status = JOB_QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=retry_delay_seconds)
+        else:
+            job.status = JOB_FAILED
+            job.active_key = None
+            job.finished_at = datetime.utcnow()
+
+        self.db.commit()
+        return job
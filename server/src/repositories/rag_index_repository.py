@@ -0,0 +1,119 @@
+# src/repositories/rag_index_repository.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.models.rag_index import RagIndexQueueItem, RAG_ENTITY_MEETING, RAG_ENTITY_TASK, RAG_OP_UPSERT
+from src.models.meeting import Meeting
+from src.models.task import Task
+from src.repositories.base_repository import BaseRepository
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+
+def upsert_queue_rows_stmt(rows: List[Dict[str, Any]]):
+    """
+    INSERT ... ON CONFLICT cho outbox: entity đã có trong hàng đợi thì chỉ cập nhật op/project/enqueued_at
+    (nhiều thay đổi liên tiếp của cùng entity -> index một lần).
+    stale_project_ids được cộng dồn để không mất project cũ khi entity bị chuyển nhiều lần trước khi drain.
+    """
+    rows = [{"stale_project_ids": None, **row} for row in rows]
+    stmt = pg_insert(RagIndexQueueItem).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[RagIndexQueueItem.entity_type, RagIndexQueueItem.entity_id],
+        set_={
+            "op": stmt.excluded.op,
+            "project_id": stmt.excluded.project_id,
+            "enqueued_at": stmt.excluded.enqueued_at,
+            "stale_project_ids": func.nullif(
+                func.concat_ws(",", RagIndexQueueItem.stale_project_ids, stmt.excluded.stale_project_ids), ""
+            ),
+        }
+    )
+
+
+class RagIndexRepository(BaseRepository):
+    def __init__(self, db: Session):
+        super().__init__(db, RagIndexQueueItem) # Khởi tạo BaseRepository với RagIndexQueueItem Model
+
+    def claim_batch(self, limit: int, lease_seconds: int) -> List[Dict[str, Any]]:
+        """
+        Lấy tối đa `limit` thay đổi chưa bị worker khác giữ (FOR UPDATE SKIP LOCKED) và đặt lease.
+        Trả về dict (không giữ object) vì phần index chạy lâu, ngoài transaction.
+        """
+        now = datetime.utcnow()
+        items = self.db.query(RagIndexQueueItem)\
+                    .filter(or_(RagIndexQueueItem.locked_until.is_(None), RagIndexQueueItem.locked_until <= now))\
+                    .order_by(RagIndexQueueItem.enqueued_at)\
+                    .limit(limit)\
+                    .with_for_update(skip_locked=True)\
+                    .all()
+        if not items:
+            self.db.rollback() # Nhả transaction đang mở
+            return []
+
+        claimed = []
+        for item in items:
+            item.locked_until = now + timedelta(seconds=lease_seconds)
+            claimed.append({
+                "entity_type": item.entity_type,
+                "entity_id": item.entity_id,
+                "project_id": item.project_id,
+                "stale_project_ids": [pid for pid in (item.stale_project_ids or "").split(",")
+                                      if pid and pid != item.project_id],
+                "op": item.op,
+                "enqueued_at": item.enqueued_at,
+                "attempts": item.attempts,
+            })
+        self.db.commit()
+        return claimed
+
+    def _key_filter(self, item: Dict[str, Any]):
+        return and_(RagIndexQueueItem.entity_type == item["entity_type"],
+                    RagIndexQueueItem.entity_id == item["entity_id"])
+
+    def complete(self, items: List[Dict[str, Any]]):
+        """
+        Xóa các thay đổi đã index. Entity bị thay đổi tiếp trong lúc index (enqueued_at mới hơn)
+        được giữ lại và nhả lease để lượt sau index lại.
+        """
+        for item in items:
+            deleted = self.db.query(RagIndexQueueItem)\
+                          .filter(self._key_filter(item), RagIndexQueueItem.enqueued_at == item["enqueued_at"])\
+                          .delete(synchronize_session=False)
+            if not deleted:
+                self.db.query(RagIndexQueueItem)\
+                    .filter(self._key_filter(item))\
+                    .update({"locked_until": None}, synchronize_session=False)
+        self.db.commit()
+
+    def fail(self, items: List[Dict[str, Any]], error: str, retry_delay_seconds: float):
+        """Ghi nhận lỗi, thử lại sau `retry_delay_seconds`."""
+        retry_at = datetime.utcnow() + timedelta(seconds=retry_delay_seconds)
+        for item in items:
+            self.db.query(RagIndexQueueItem)\
+                .filter(self._key_filter(item))\
+                .update({
+                    "attempts": RagIndexQueueItem.attempts + 1,
+                    "last_error": error,
+                    "locked_until": retry_at,
+                }, synchronize_session=False)
+        self.db.commit()
+
+    def enqueue_all(self) -> int:
+        """Đưa mọi meeting đã có biên bản/transcript và mọi task vào hàng đợi (index lại toàn bộ)."""
+        now = datetime.utcnow()
+        rows = [
+            {"entity_type": RAG_ENTITY_MEETING, "entity_id": meeting_id, "project_id": project_id,
+             "op": RAG_OP_UPSERT, "enqueued_at": now}
+            for meeting_id, project_id in self.db.query(Meeting.id, Meeting.project_id)
+                                                 .filter(or_(Meeting.summary.isnot(None), Meeting.transcript.isnot(None)))
+        ] + [
+            {"entity_type": RAG_ENTITY_TASK, "entity_id": task_id, "project_id": project_id,
+             "op": RAG_OP_UPSERT, "enqueued_at": now}
+            for task_id, project_id in self.db.query(Task.id, Task.project_id)
+        ]
+        for start in range(0, len(rows), 1000):
+            self.db.execute(upsert_queue_rows_stmt(rows[start:start + 1000]))
+        self.db.commit()
+        return len(rows)
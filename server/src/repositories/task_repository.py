@@ -22,6 +22,24 @@ class TaskRepository(BaseRepository):
         
         return query.all()
 
+    def get_tasks_by_assignee(self, user_id: str) -> List[Task]:
+        """Lấy danh sách Tasks được giao cho một User."""
+        return self.db.query(Task)\
+                   .filter(Task.assignee_id == user_id)\
+                   .options(joinedload(Task.assignee), joinedload(Task.author))\
+                   .all()
+
+    def search_tasks(self, keyword: str, project_ids: List[str], limit: int = 20) -> List[Task]:
+        """Tìm Tasks theo tiêu đề / mô tả trong các Project cho trước."""
+        if not project_ids:
+            return []
+        pattern = f"%{keyword}%"
+        return self.db.query(Task)\
+                   .filter(Task.project_id.in_(project_ids))\
+                   .filter(Task.title.ilike(pattern) | Task.description.ilike(pattern))\
+                   .limit(limit)\
+                   .all()
+
     def update_task_field(self, task_id: str, update_data: Dict[str, Any]) -> Optional[Task]:
         """Cập nhật các trường cụ thể của Task theo ID."""
         task = self.get_by_id(task_id)
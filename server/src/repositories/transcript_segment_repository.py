@@ -0,0 +1,86 @@
+# src/repositories/transcript_segment_repository.py
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, func
+from src.models.transcript_segment import TranscriptSegment, SEGMENT_SOURCE_STT
+from src.repositories.base_repository import BaseRepository
+from typing import List, Optional, Dict, Any, Iterator
+
+class TranscriptSegmentRepository(BaseRepository):
+    def __init__(self, db: Session):
+        super().__init__(db, TranscriptSegment) # Khởi tạo BaseRepository với TranscriptSegment Model
+
+    def bulk_insert(self, meeting_id: str, segments: List[Dict[str, Any]], source: str = SEGMENT_SOURCE_STT,
+                    commit: bool = True) -> int:
+        """
+        Thêm nhiều segment trong một câu lệnh (executemany), không load lại object.
+        Mỗi segment: {start_ms, end_ms, text, speaker?}
+        commit=False: để caller commit cùng các thay đổi khác trong một transaction.
+        """
+        rows = [
+            {
+                "meeting_id": meeting_id,
+                "start_ms": int(seg.get("start_ms") or 0),
+                "end_ms": int(seg.get("end_ms") or 0),
+                "speaker": seg.get("speaker"),
+                "text": seg["text"],
+                "source": source,
+            }
+            for seg in segments if seg.get("text")
+        ]
+        if rows:
+            self.db.execute(insert(TranscriptSegment), rows)
+            if commit:
+                self.db.commit()
+        return len(rows)
+
+    def replace_for_meeting(self, meeting_id: str, segments: List[Dict[str, Any]], source: str = SEGMENT_SOURCE_STT,
+                            commit: bool = True) -> int:
+        """Xóa toàn bộ segment cũ của cuộc họp và ghi bộ segment mới."""
+        self.db.query(TranscriptSegment)\
+            .filter(TranscriptSegment.meeting_id == meeting_id)\
+            .delete(synchronize_session=False)
+        inserted = self.bulk_insert(meeting_id, segments, source, commit=False)
+        if commit:
+            self.db.commit()
+        return inserted
+
+    def get_range(self, meeting_id: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                  skip: int = 0, limit: int = 200) -> List[TranscriptSegment]:
+        """Lấy các segment giao với khoảng [start_ms, end_ms), có phân trang, theo thứ tự thời gian."""
+        query = self._range_query(meeting_id, start_ms, end_ms)
+        return query.order_by(TranscriptSegment.start_ms, TranscriptSegment.id)\
+                    .offset(skip)\
+                    .limit(limit)\
+                    .all()
+
+    def count_range(self, meeting_id: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> int:
+        return self._range_query(meeting_id, start_ms, end_ms)\
+                   .with_entities(func.count(TranscriptSegment.id))\
+                   .scalar()
+
+    def _range_query(self, meeting_id: str, start_ms: Optional[int], end_ms: Optional[int]):
+        query = self.db.query(TranscriptSegment).filter(TranscriptSegment.meeting_id == meeting_id)
+        if start_ms is not None:
+            query = query.filter(TranscriptSegment.end_ms >= start_ms)
+        if end_ms is not None:
+            query = query.filter(TranscriptSegment.start_ms < end_ms)
+        return query
+
+    def has_segments(self, meeting_id: str) -> bool:
+        return self.db.query(TranscriptSegment.id)\
+                   .filter(TranscriptSegment.meeting_id == meeting_id)\
+                   .first() is not None
+
+    def iter_lines(self, meeting_id: str, batch_size: int = 1000) -> Iterator[str]:
+        """Duyệt transcript theo từng dòng "speaker: text" (đọc theo batch, không load hết một lần)."""
+        query = self.db.query(TranscriptSegment.speaker, TranscriptSegment.text)\
+                    .filter(TranscriptSegment.meeting_id == meeting_id)\
+                    .order_by(TranscriptSegment.start_ms, TranscriptSegment.id)\
+                    .yield_per(batch_size)
+        for speaker, text in query:
+            yield f"{speaker}: {text}" if speaker else text
+
+    def get_full_text(self, meeting_id: str) -> str:
+        """Ghép transcript đầy đủ từ các segment."""
+        return "\n".join(self.iter_lines(meeting_id))
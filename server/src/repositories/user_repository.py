@@ -21,4 +21,12 @@ class UserRepository(BaseRepository):
         """Lấy danh sách Users theo danh sách IDs."""
         return self.db.query(User).filter(User.id.in_(user_ids)).all()
         
+    def search_users(self, keyword: str, limit: int = 20) -> List[User]:
+        """Tìm Users theo tên, username hoặc email (không phân biệt hoa thường)."""
+        pattern = f"%{keyword}%"
+        return self.db.query(User)\
+                   .filter(User.name.ilike(pattern) | User.username.ilike(pattern) | User.email.ilike(pattern))\
+                   .limit(limit)\
+                   .all()
+
     # Các hàm CRUD cơ bản (create, get_by_id,...) được thừa kế từ BaseRepository
\ No newline at end of file
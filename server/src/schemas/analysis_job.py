@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+# --- Output Schemas ---
+
+class AnalysisJobOut(BaseModel):
+    """Schema đầu ra cho trạng thái job phân tích AI của cuộc họp."""
+    id: str
+    meeting_id: str
+    status: str # queued | running | succeeded | failed
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    last_error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None # MoM + action items
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
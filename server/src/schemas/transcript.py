@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+# --- Output Schemas ---
+
+class TranscriptSegmentOut(BaseModel):
+    """Schema đầu ra cho một đoạn transcript."""
+    id: int
+    start_ms: int
+    end_ms: int
+    speaker: Optional[str] = None
+    text: str
+    source: str
+
+    class Config:
+        from_attributes = True
+
+class TranscriptPage(BaseModel):
+    """Một trang transcript (phân trang / seek theo thời gian)."""
+    meeting_id: str
+    total: int
+    skip: int
+    limit: int
+    items: List[TranscriptSegmentOut]
+
+class TranscriptText(BaseModel):
+    """Transcript đầy đủ dạng văn bản."""
+    meeting_id: str
+    text: str
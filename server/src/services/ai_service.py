@@ -10,6 +10,8 @@ from fastapi import HTTPException, status
 from src.schemas import task as task_schemas
 from src.repositories.meeting_repository import MeetingRepository
 from src.repositories.task_repository import TaskRepository
+from src.repositories.transcript_segment_repository import TranscriptSegmentRepository
+from src.models.transcript_segment import SEGMENT_SOURCE_MANUAL
 
 # Import SDK mới
 from google import genai
@@ -19,6 +21,7 @@ class AIService:
     def __init__(self, db: Session):
         self.meeting_repo = MeetingRepository(db)
         self.task_repo = TaskRepository(db)
+        self.segment_repo = TranscriptSegmentRepository(db)
         
         # Khởi tạo Client thật
         api_key = os.getenv("GOOGLE_API_KEY")
@@ -85,7 +88,12 @@ class AIService:
             db_task = self.task_repo.create(new_task_data)
             created_tasks.append(task_schemas.TaskOut.model_validate(db_task))
 
-        # Update meeting transcript
+        # Lưu transcript dạng segment (mỗi dòng một segment, không có timestamp) + bản ghép để tương thích
+        self.segment_repo.replace_for_meeting(
+            meeting_id,
+            [{"text": line.strip()} for line in transcript.splitlines() if line.strip()],
+            source=SEGMENT_SOURCE_MANUAL
+        )
         self.meeting_repo.update_meeting_data(meeting_id, {"transcript": transcript}) 
         
         return created_tasks
@@ -0,0 +1,65 @@
+# src/services/analysis_job_service.py
+
+import os
+from sqlalchemy.orm import Session
+from typing import Tuple
+from src.models.analysis_job import AnalysisJob
+from src.repositories.analysis_job_repository import AnalysisJobRepository
+from src.services.meeting_service import MeetingService, recording_file_path, recording_checksum
+from fastapi import HTTPException, status
+
+# Số lần thử tối đa cho mỗi job phân tích
+ANALYSIS_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_MAX_ATTEMPTS", "3"))
+
+# Kết quả của enqueue_analysis
+ENQUEUE_QUEUED = 'queued'      # tạo job mới
+ENQUEUE_ATTACHED = 'attached'  # gắn vào job đang chạy cho cùng file ghi hình
+ENQUEUE_REUSED = 'reused'      # dùng lại kết quả đã phân tích cho cùng file ghi hình
+
+class AnalysisJobService:
+    def __init__(self, db: Session):
+        self.repo = AnalysisJobRepository(db)
+        self.meeting_service = MeetingService(db)
+
+    def enqueue_analysis(self, meeting_id: str, user_id: str, force: bool = False) -> Tuple[AnalysisJob, str]:
+        """
+        Đưa cuộc họp vào hàng đợi phân tích AI (worker sẽ xử lý), theo kiểu single-flight
+        với key = (meeting_id, checksum file ghi hình):
+        - Đang có job queued/running cho cùng key -> trả về job đó (attached).
+        - Đã có kết quả cho cùng key và force=False -> trả về job cũ (reused).
+        - Ngược lại tạo job mới (queued).
+        Chỉ thành viên của project chứa cuộc họp mới được yêu cầu phân tích.
+        """
+        meeting = self.meeting_service.get_meeting_for_member(meeting_id, user_id)
+        if not meeting.recording_url:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Meeting has no recording to analyze")
+
+        path = recording_file_path(meeting_id)
+        checksum = recording_checksum(path) if os.path.isfile(path) else None
+
+        active = self.repo.get_active(meeting_id, checksum)
+        if active:
+            return active, ENQUEUE_ATTACHED
+
+        if not force:
+            done = self.repo.get_latest_succeeded(meeting_id, checksum)
+            if done:
+                return done, ENQUEUE_REUSED
+
+        try:
+            return self.repo.enqueue(meeting_id, checksum, max_attempts=ANALYSIS_MAX_ATTEMPTS), ENQUEUE_QUEUED
+        except ValueError:
+            # Request khác vừa tạo job cho cùng key (UNIQUE active_key) -> gắn vào job đó
+            active = self.repo.get_active(meeting_id, checksum)
+            if active:
+                return active, ENQUEUE_ATTACHED
+            raise
+
+    def get_analysis_status(self, meeting_id: str, user_id: str) -> AnalysisJob:
+        """Lấy trạng thái job phân tích gần nhất của cuộc họp (chỉ thành viên project, kết quả chứa MoM)."""
+        self.meeting_service.get_meeting_for_member(meeting_id, user_id)
+
+        job = self.repo.get_latest_for_meeting(meeting_id)
+        if not job:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No analysis has been requested for this meeting")
+        return job
@@ -1,5 +1,10 @@
 # src/services/meeting_service.py
 
+import os
+import hashlib
+import shutil
+import threading
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from src.schemas import meeting as meeting_schemas
 from src.models.meeting import Meeting # Giả định Model Meeting đã được tạo
@@ -9,6 +14,82 @@ from uuid import uuid4
 from typing import List, Optional
 from fastapi import HTTPException, status
 
+# Thư mục lưu file ghi hình cuộc họp: KHÔNG nằm trong /static (mount công khai),
+# chỉ tải được qua GET /api/v1/meetings/{id}/recording (kiểm tra thành viên project)
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "storage/recordings")
+LEGACY_RECORDINGS_DIR = "static/recordings"
+API_PUBLIC_URL = os.getenv("API_PUBLIC_URL", "http://localhost:8000")
+API_PREFIX = "/api/v1"  # main.py mount api_router tại /api, src/api thêm /v1
+
+
+def recording_file_path(meeting_id: str) -> str:
+    """Đường dẫn file ghi hình (.webm) của một cuộc họp."""
+    return os.path.join(RECORDINGS_DIR, f"{meeting_id}.webm")
+
+
+def recording_url(meeting_id: str) -> str:
+    """URL stream file ghi hình (cần token: header Authorization hoặc ?access_token=)."""
+    return f"{API_PUBLIC_URL}{API_PREFIX}/meetings/{meeting_id}/recording"
+
+
+def migrate_legacy_recordings(db: Session) -> int:
+    """
+    Chuyển file ghi hình cũ từ static/recordings sang RECORDINGS_DIR và đổi recording_url
+    (trước đây là link /static/... tải được không cần đăng nhập). Trả về số file đã chuyển.
+    """
+    moved = 0
+    legacy_files = os.listdir(LEGACY_RECORDINGS_DIR) if os.path.isdir(LEGACY_RECORDINGS_DIR) else []
+    if legacy_files:
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    for name in legacy_files:
+        meeting_id, ext = os.path.splitext(name)
+        if ext != ".webm":
+            continue
+        target = recording_file_path(meeting_id)
+        if not os.path.exists(target):
+            shutil.move(os.path.join(LEGACY_RECORDINGS_DIR, name), target)
+        else:
+            os.remove(os.path.join(LEGACY_RECORDINGS_DIR, name))
+        moved += 1
+
+    # Link /static cũ và link thiếu /v1 (/api/meetings/...) do bản trước ghi -> link stream đúng
+    stale = db.query(Meeting).filter(or_(
+        Meeting.recording_url.like("%/static/recordings/%"),
+        Meeting.recording_url.like("%/api/meetings/%/recording"),
+    )).all()
+    for meeting in stale:
+        meeting.recording_url = recording_url(meeting.id)
+    db.commit()
+    return moved
+
+
+# Cache checksum theo (path, inode, size, mtime_ns): file đổi (upload lại dùng os.replace) -> key đổi
+_checksum_cache: dict = {}
+_checksum_lock = threading.Lock()
+_CHECKSUM_CACHE_MAX = 1024
+
+
+def recording_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 của file ghi hình (đọc theo chunk, không nạp cả file vào RAM)."""
+    st = os.stat(path)
+    key = (path, st.st_ino, st.st_size, st.st_mtime_ns)
+    with _checksum_lock:
+        if key in _checksum_cache:
+            return _checksum_cache[key]
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    with _checksum_lock:
+        if len(_checksum_cache) >= _CHECKSUM_CACHE_MAX:
+            _checksum_cache.clear()
+        _checksum_cache[key] = digest
+    return digest
+
+
 class MeetingService:
     def __init__(self, db: Session):
         self.repo = MeetingRepository(db)
@@ -38,4 +119,24 @@ class MeetingService:
 
         return self.repo.get_meetings_by_project(project_id)
 
+    def get_meeting_for_member(self, meeting_id: str, user_id: str) -> Meeting:
+        """Lấy cuộc họp, chỉ cho phép thành viên của project chứa cuộc họp."""
+        meeting = self.repo.get_by_id(meeting_id)
+        if not meeting:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Meeting not found.")
+
+        project = self.project_repo.get_by_id(meeting.project_id)
+        if not project or user_id not in [m.id for m in project.members]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied to this meeting.")
+        return meeting
+
+    def get_recording_path(self, meeting_id: str, user_id: str) -> str:
+        """Kiểm tra quyền (thành viên project) và trả về đường dẫn file ghi hình của cuộc họp."""
+        self.get_meeting_for_member(meeting_id, user_id)
+
+        path = recording_file_path(meeting_id)
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recording not found.")
+        return path
+
     # Các hàm nghiệp vụ khác...
\ No newline at end of file
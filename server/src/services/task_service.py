@@ -43,6 +43,15 @@ class TaskService:
             
         return self.repo.get_tasks_by_project(project_id, status_filter)
 
+    def get_tasks_by_assignee(self, user_id: str) -> List[Task]:
+        """Truy vấn các Tasks được giao cho User."""
+        return self.repo.get_tasks_by_assignee(user_id)
+
+    def search_tasks(self, keyword: str, user_id: str, limit: int = 20) -> List[Task]:
+        """Tìm Tasks theo từ khóa, chỉ trong các Project mà User là thành viên."""
+        projects = self.project_repo.get_all_projects_where_user_is_member(user_id)
+        return self.repo.search_tasks(keyword, [p.id for p in projects], limit)
+
     def update_task_status(self, task_id: str, new_status: str, user_id: str) -> Optional[Task]:
         """Cập nhật trạng thái Task (cho Kanban kéo thả)."""
         task = self.repo.get_by_id(task_id)
@@ -0,0 +1,37 @@
+# src/services/transcript_service.py
+
+from sqlalchemy.orm import Session
+from src.schemas import transcript as transcript_schemas
+from src.repositories.transcript_segment_repository import TranscriptSegmentRepository
+from src.services.meeting_service import MeetingService
+from typing import Optional
+
+class TranscriptService:
+    def __init__(self, db: Session):
+        self.repo = TranscriptSegmentRepository(db)
+        self.meeting_service = MeetingService(db)
+
+    def get_segments(self, meeting_id: str, user_id: str, start_ms: Optional[int] = None,
+                     end_ms: Optional[int] = None, skip: int = 0, limit: int = 200) -> transcript_schemas.TranscriptPage:
+        """Lấy transcript theo trang và/hoặc khoảng thời gian (seek-to-time)."""
+        self.meeting_service.get_meeting_for_member(meeting_id, user_id)
+
+        items = self.repo.get_range(meeting_id, start_ms, end_ms, skip, limit)
+        total = self.repo.count_range(meeting_id, start_ms, end_ms)
+        return transcript_schemas.TranscriptPage(
+            meeting_id=meeting_id,
+            total=total,
+            skip=skip,
+            limit=limit,
+            items=[transcript_schemas.TranscriptSegmentOut.model_validate(s) for s in items],
+        )
+
+    def get_full_text(self, meeting_id: str, user_id: str) -> transcript_schemas.TranscriptText:
+        """Ghép transcript đầy đủ từ các segment (fallback về cột Meeting.transcript cho dữ liệu cũ)."""
+        meeting = self.meeting_service.get_meeting_for_member(meeting_id, user_id)
+
+        if self.repo.has_segments(meeting_id):
+            text = self.repo.get_full_text(meeting_id)
+        else:
+            text = meeting.transcript or ""
+        return transcript_schemas.TranscriptText(meeting_id=meeting_id, text=text)
@@ -0,0 +1,293 @@
+# src/workers/analysis_worker.py
+
+import asyncio
+import os
+import signal
+import socket
+import threading
+import traceback
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from src.core.database import SessionLocal
+from src.models.meeting import Meeting
+from src.models.analysis_job import AnalysisJob
+from src.models.live_transcript import LiveTranscriptSession, LIVE_COMPLETE
+from src.repositories.analysis_job_repository import AnalysisJobRepository
+from src.repositories.transcript_segment_repository import TranscriptSegmentRepository
+from src.core.rag_indexer import RagIndexer, RAG_INDEX_ENABLED
+from src.services.meeting_service import recording_file_path
+
+# --- Cấu hình Worker (qua biến môi trường) ---
+ANALYSIS_WORKER_CONCURRENCY = int(os.getenv("ANALYSIS_WORKER_CONCURRENCY", "2"))
+ANALYSIS_POLL_INTERVAL = float(os.getenv("ANALYSIS_POLL_INTERVAL", "2.0"))          # giây
+ANALYSIS_JOB_LEASE_SECONDS = int(os.getenv("ANALYSIS_JOB_LEASE_SECONDS", "1800"))   # 30 phút
+ANALYSIS_JOB_HEARTBEAT_SECONDS = float(os.getenv("ANALYSIS_JOB_HEARTBEAT_SECONDS", "60"))  # chu kỳ gia hạn lease
+ANALYSIS_RETRY_BASE_SECONDS = float(os.getenv("ANALYSIS_RETRY_BASE_SECONDS", "30"))
+ANALYSIS_RETRY_MAX_SECONDS = float(os.getenv("ANALYSIS_RETRY_MAX_SECONDS", "900"))
+AGENT_CHECKPOINT_PRUNE_INTERVAL = float(os.getenv("AGENT_CHECKPOINT_PRUNE_INTERVAL", "3600"))  # giây
+RAG_INDEX_INTERVAL = float(os.getenv("RAG_INDEX_INTERVAL", "5"))  # giây chờ khi outbox RAG trống
+
+
+class NonRetryableJobError(Exception):
+    """Lỗi không nên thử lại (ví dụ: thiếu file ghi hình)."""
+
+
+class LeaseLostError(Exception):
+    """Worker không còn giữ lease của job (worker khác đã lấy lại), không được ghi kết quả."""
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff: base * 2^(attempts-1), có giới hạn trên."""
+    return min(ANALYSIS_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), ANALYSIS_RETRY_MAX_SECONDS)
+
+
+class AnalysisWorker:
+    """
+    Worker xử lý hàng đợi phân tích AI, chạy tách biệt với API server.
+    Các slot là coroutine trên cùng một event loop (agent chạy async), mỗi slot có Session DB riêng;
+    số slot = concurrency, nên một process xử lý được nhiều cuộc họp cùng lúc mà không tốn thêm thread.
+    """
+
+    def __init__(self, concurrency: int = ANALYSIS_WORKER_CONCURRENCY,
+                 poll_interval: float = ANALYSIS_POLL_INTERVAL):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        # Id của process; mỗi slot claim job với id riêng "<worker_id>:<slot>" (kiểm tra lease phân biệt được slot)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._agent = None
+        self._agent_lock = threading.Lock()
+        self._indexer = RagIndexer()
+
+    # ==================== AGENT ====================
+
+    def _get_agent(self):
+        """Khởi tạo MeetingToTaskAgent một lần cho cả process (lazy)."""
+        with self._agent_lock:
+            if self._agent is None:
+                from AI.src.agents.meeting_to_task.agent import MeetingToTaskAgent
+                from src.core.agent_checkpointer import DatabaseCheckpointSaver
+                # Checkpoint lưu trong DB: review đang chờ không mất khi restart, RAM không tăng theo số cuộc họp
+                self._agent = MeetingToTaskAgent(checkpointer=DatabaseCheckpointSaver())
+            return self._agent
+
+    # ==================== JOB PROCESSING ====================
+
+    def _prepare(self, db: Session, job: AnalysisJob) -> dict:
+        """Đọc dữ liệu cuộc họp của job -> tham số cho agent.arun()."""
+        meeting = db.query(Meeting).filter(Meeting.id == job.meeting_id).first()
+        if not meeting or not meeting.recording_url:
+            raise NonRetryableJobError("No recording URL found.")
+
+        audio_path = recording_file_path(meeting.id)
+        if not os.path.exists(audio_path):
+            raise NonRetryableJobError(f"File not found at {audio_path}")
+
+        participants = [
+            {"userId": u.id, "username": u.username, "email": u.email}
+            for u in (meeting.attendees or [])
+        ]
+        metadata = {
+            "title": meeting.title,
+            "id": meeting.id,
+            "project_id": meeting.project_id,
+            "projectId": meeting.project_id,
+            "date": str(meeting.start_date),
+            "participants": participants,
+        }
+
+        # Transcript đã được transcribe trực tiếp trong lúc họp -> bỏ qua STT
+        live_session = db.query(LiveTranscriptSession)\
+                         .filter(LiveTranscriptSession.meeting_id == meeting.id)\
+                         .first()
+        live_transcript = None
+        if live_session and live_session.status == LIVE_COMPLETE:
+            live_transcript = TranscriptSegmentRepository(db).get_full_text(meeting.id) or None
+
+        return {
+            "audio_file_path": audio_path,
+            "meeting_metadata": metadata,
+            "thread_id": meeting.id,
+            "transcript": live_transcript,
+        }
+
+    def _save_result(self, db: Session, job: AnalysisJob, inputs: dict, result: dict, owner: str) -> dict:
+        """
+        Lưu transcript segments, transcript, MoM vào Meeting và đánh dấu job succeeded
+        trong một transaction, khi đang giữ khóa dòng job và worker vẫn còn lease.
+        """
+        if not result:
+            raise RuntimeError("AI returned no results.")
+
+        meeting_id = inputs["thread_id"]
+        segments = None
+        if not inputs["transcript"]:
+            # Segment có timestamp lấy từ transcript cache (STT vừa chạy trong agent -> cache hit).
+            # Tính trước khi khóa job: cache miss có thể chạy lại STT, không được giữ FOR UPDATE (chặn heartbeat)
+            from AI.src.agents.meeting_to_task.tools import transcribe_audio_segments
+            segments = transcribe_audio_segments(inputs["audio_file_path"], provider=self._get_agent().stt_provider,
+                                                 transcript=result.get("transcript"))
+
+        output = {
+            "mom": result.get("mom", ""),
+            "action_items": result.get("action_items", []),
+            "reflection_path": result.get("reflection_path", []),
+        }
+
+        # Khóa dòng job: lease hết hạn và bị worker khác lấy lại thì bỏ kết quả của lượt này
+        repo = AnalysisJobRepository(db)
+        if not repo.lock_if_owned(job, owner):
+            db.rollback()
+            raise LeaseLostError(f"Lease of job {job.id} was taken over by {job.locked_by}")
+
+        try:
+            if segments:
+                TranscriptSegmentRepository(db).replace_for_meeting(meeting_id, segments, commit=False)
+            elif segments is not None:
+                # Không có segment (STT lỗi) thì giữ nguyên segment cũ, không xóa
+                print(f"⚠️ [AI WORKER] Meeting {meeting_id}: không có transcript segment, giữ dữ liệu cũ")
+
+            meeting = db.query(Meeting).filter(Meeting.id == meeting_id).first()
+            # Meeting.transcript chỉ là bản ghép sẵn để tương thích với API cũ
+            meeting.transcript = result.get("transcript", "")
+            meeting.summary = result.get("mom", "") # Minutes of Meeting
+            # Commit một lần: segment + meeting + trạng thái job, khóa job được giữ tới lúc này
+            repo.mark_succeeded(job, output)
+        except Exception:
+            db.rollback()
+            raise
+        return output
+
+    async def _process_one(self, db: Session, owner: str) -> bool:
+        """
+        Claim và xử lý một job. Trả về False nếu hàng đợi trống.
+        Thao tác DB chạy trong thread (tuần tự, cùng một Session); agent chạy async trên event loop.
+        """
+        repo = AnalysisJobRepository(db)
+        job = await asyncio.to_thread(repo.claim_next, owner, ANALYSIS_JOB_LEASE_SECONDS)
+        if not job:
+            return False
+
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, owner))
+        try:
+            inputs = await asyncio.to_thread(self._prepare, db, job)
+            print(f"🤖 [AI WORKER] Processing meeting {inputs['thread_id']} (job {job.id}, attempt {job.attempts})")
+            result, _ = await self._get_agent().arun(**inputs)
+            output = await asyncio.to_thread(self._save_result, db, job, inputs, result, owner)
+            print(f"✅ [AI WORKER] Job {job.id} succeeded (reflection: {', '.join(output['reflection_path']) or '-'})")
+        except LeaseLostError as e:
+            print(f"⚠️ [AI WORKER] {e}, result discarded")
+        except NonRetryableJobError as e:
+            if await asyncio.to_thread(self._fail, db, repo, job, owner, str(e), None):
+                print(f"❌ [AI WORKER] Job {job.id} failed: {e}")
+        except Exception as e:
+            traceback.print_exc()
+            if await asyncio.to_thread(self._fail, db, repo, job, owner, f"{type(e).__name__}: {e}", retry_delay(job.attempts)):
+                print(f"⚠️ [AI WORKER] Job {job.id} error (attempt {job.attempts}/{job.max_attempts}) -> {job.status}")
+        finally:
+            heartbeat.cancel()
+        return True
+
+    def _fail(self, db: Session, repo: AnalysisJobRepository, job: AnalysisJob, owner: str,
+              error: str, retry_delay_seconds: Optional[float]) -> bool:
+        """Ghi nhận lỗi nếu worker vẫn giữ lease (không ghi đè trạng thái của lượt chạy khác)."""
+        db.rollback()
+        if not repo.lock_if_owned(job, owner):
+            db.rollback()
+            print(f"⚠️ [AI WORKER] Job {job.id} lease lost, error not recorded")
+            return False
+        repo.mark_failed(job, error, retry_delay_seconds=retry_delay_seconds)
+        return True
+
+    def _renew_lease(self, job_id: str, owner: str) -> bool:
+        # Session riêng: Session của slot đang được dùng trong thread khác
+        db = SessionLocal()
+        try:
+            return AnalysisJobRepository(db).renew_lease(job_id, owner)
+        finally:
+            db.close()
+
+    async def _heartbeat(self, job_id: str, owner: str):
+        """Gia hạn lease định kỳ trong lúc job chạy (STT + LLM có thể lâu hơn ANALYSIS_JOB_LEASE_SECONDS)."""
+        while True:
+            await asyncio.sleep(ANALYSIS_JOB_HEARTBEAT_SECONDS)
+            try:
+                if not await asyncio.to_thread(self._renew_lease, job_id, owner):
+                    print(f"⚠️ [AI WORKER] Job {job_id}: lease lost, stopping heartbeat")
+                    return
+            except Exception as e:
+                print(f"❌ [AI WORKER] Job {job_id} heartbeat error: {e}")
+
+    async def _slot_loop(self, slot: int):
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                had_job = await self._process_one(db, f"{self.worker_id}:{slot}")
+            except Exception as e:
+                print(f"❌ [AI WORKER] Slot {slot} error: {e}")
+                had_job = False
+            finally:
+                await asyncio.to_thread(db.close)
+
+            if not had_job:
+                await asyncio.sleep(self.poll_interval)
+
+    async def _prune_loop(self):
+        """Định kỳ xóa checkpoint của các review bị bỏ dở (quá TTL)."""
+        while not self._stop.is_set():
+            try:
+                removed = await asyncio.to_thread(self._get_agent().memory.prune)
+                if removed["threads"] or removed["blobs"]:
+                    print(f"🧹 [AI WORKER] Pruned {removed['threads']} expired agent threads, {removed['blobs']} blobs")
+            except Exception as e:
+                print(f"❌ [AI WORKER] Checkpoint prune error: {e}")
+            waited = 0.0
+            while waited < AGENT_CHECKPOINT_PRUNE_INTERVAL and not self._stop.is_set():
+                await asyncio.sleep(self.poll_interval)
+                waited += self.poll_interval
+
+    def _drain_rag_index(self) -> int:
+        db = SessionLocal()
+        try:
+            return self._indexer.drain_once(db)
+        finally:
+            db.close()
+
+    async def _index_loop(self):
+        """Drain outbox thay đổi Meeting/Task -> index vào collection knowledge của project."""
+        while not self._stop.is_set():
+            try:
+                claimed = await asyncio.to_thread(self._drain_rag_index)
+            except Exception as e:
+                print(f"❌ [AI WORKER] RAG index error: {e}")
+                claimed = 0
+            # Batch đầy -> còn việc, drain tiếp ngay
+            if claimed < self._indexer.batch_size:
+                await asyncio.sleep(RAG_INDEX_INTERVAL)
+
+    async def _run_slots(self):
+        loop = asyncio.get_running_loop()
+        try:
+            # Ctrl+C: ngừng nhận job mới, chờ các job đang chạy xong
+            loop.add_signal_handler(signal.SIGINT, self.stop)
+        except (NotImplementedError, RuntimeError):
+            pass
+        loops = [self._prune_loop(), *[self._slot_loop(i) for i in range(self.concurrency)]]
+        if RAG_INDEX_ENABLED:
+            loops.append(self._index_loop())
+        await asyncio.gather(*loops)
+
+    # ==================== PUBLIC METHODS ====================
+
+    def run_forever(self):
+        """Chạy các slot worker trên một event loop cho đến khi stop() được gọi (hoặc Ctrl+C)."""
+        print(f"🚀 AI analysis worker {self.worker_id} started (concurrency={self.concurrency})")
+        asyncio.run(self._run_slots())
+        print("⏹️ Worker stopped")
+
+    def stop(self):
+        if not self._stop.is_set():
+            print("⏹️ Stopping worker, waiting for running jobs...")
+        self._stop.set()
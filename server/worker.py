@@ -0,0 +1,38 @@
+import argparse
+import signal
+
+# --- Database ---
+from src.core.database import create_db_tables, SessionLocal
+from src.core.rag_indexer import register_rag_index_listeners
+from src.repositories.rag_index_repository import RagIndexRepository
+
+# --- Worker ---
+from src.workers.analysis_worker import AnalysisWorker, ANALYSIS_WORKER_CONCURRENCY, ANALYSIS_POLL_INTERVAL
+
+
+# --- Run worker (tách biệt với API server) ---
+# python worker.py --concurrency 4
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JiraMeet AI analysis worker")
+    parser.add_argument("--concurrency", type=int, default=ANALYSIS_WORKER_CONCURRENCY,
+                        help="Số job phân tích chạy song song")
+    parser.add_argument("--poll-interval", type=float, default=ANALYSIS_POLL_INTERVAL,
+                        help="Số giây chờ khi hàng đợi trống")
+    parser.add_argument("--reindex-knowledge", action="store_true",
+                        help="Đưa mọi meeting/task vào hàng đợi index RAG trước khi chạy")
+    args = parser.parse_args()
+
+    create_db_tables()
+    # Thay đổi Meeting/Task do worker ghi (biên bản, transcript) cũng được index
+    register_rag_index_listeners()
+
+    if args.reindex_knowledge:
+        db = SessionLocal()
+        try:
+            print(f"🔎 Queued {RagIndexRepository(db).enqueue_all()} meetings/tasks for RAG indexing")
+        finally:
+            db.close()
+
+    worker = AnalysisWorker(concurrency=args.concurrency, poll_interval=args.poll_interval)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    worker.run_forever()